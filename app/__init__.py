@@ -1,5 +1,10 @@
+import time
+
+_import_started = time.perf_counter()
+
 from flask import Flask
 from flask_login import LoginManager
+from werkzeug.routing import BaseConverter
 from config import config
 import logging
 from logging.handlers import RotatingFileHandler
@@ -9,7 +14,18 @@ from dotenv import load_dotenv
 # Cargar variables de entorno al iniciar
 load_dotenv()
 
-from app.models import db, User
+from app.models import db, User, parse_id
+
+# Tiempo de importación de Flask, extensiones y modelos (sin SDKs de IA: se importan al primer uso)
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+
+class IdConverter(BaseConverter):
+    """<id:project_id>: solo UUIDs (cualquier otro valor es 404 sin consultar la BD); entrega str canónico"""
+    regex = r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}"
+
+    def to_python(self, value: str) -> str:
+        return parse_id(value)
 
 
 def create_app(config_name: str = None) -> Flask:
@@ -20,8 +36,12 @@ def create_app(config_name: str = None) -> Flask:
     if config_name is None:
         config_name = os.getenv("FLASK_ENV", "development")
     
+    started = time.perf_counter()
+    timings = {"import": IMPORT_SECONDS}
+    
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.url_map.converters["id"] = IdConverter
     # Ajustar engine options según el tipo de base de datos
     db_uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
     engine_opts = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
@@ -37,7 +57,9 @@ def create_app(config_name: str = None) -> Flask:
     # Log de configuración de base de datos
     app.logger.info(f"🔌 Conectando a base de datos: {os.getenv('DB_HOST', 'localhost')}")
     
-    # Inicializar extensiones
+    # Inicializar extensiones (la réplica de lectura se registra como bind antes del engine)
+    from app.services import db_routing
+    db_routing.init_app(app)
     db.init_app(app)
     
     # Configurar Login Manager
@@ -46,29 +68,82 @@ def create_app(config_name: str = None) -> Flask:
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Por favor, inicia sesión para acceder a esta página."
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(user_id)
+    # Identidad cacheada (id, email, rol); la fila completa de User se carga solo si se usa
+    from app.services.user_cache import user_cache, load_identity
+    user_cache.max_entries = app.config["USER_CACHE_MAX_ENTRIES"]
+    user_cache.ttl_seconds = app.config["USER_CACHE_TTL_SECONDS"]
+    login_manager.user_loader(load_identity)
+    
+    # Assets precompilados (CSS/JS/fuentes con hash de contenido)
+    from app.assets import init_assets
+    init_assets(app)
+    
+    # Cache de fragmentos renderizados (plan de negocio, tarjetas del dashboard)
+    from app.services.fragment_cache import fragment_cache, cached_fragment
+    fragment_cache.max_bytes = app.config["FRAGMENT_CACHE_MAX_BYTES"]
+    app.add_template_global(cached_fragment)
+    
+    timings["extensions"] = time.perf_counter() - started
     
     # Crear contexto de aplicación y base de datos
     with app.app_context():
         # Importar modelos para que SQLAlchemy los registre
         from app import models
         
-        # Crear tablas
-        db.create_all()
+        # Crear tablas (solo desarrollo/tests; en producción el esquema viene de migrations/)
+        if app.config["DB_CREATE_ALL"]:
+            phase = time.perf_counter()
+            db.create_all()
+            timings["create_all"] = time.perf_counter() - phase
+        # Búsqueda full-text: tabla FTS5 en SQLite (en Postgres la crea migrations/006)
+        from app.services import search
+        search.init_app(app)
+        # Formas de consulta para revisar índices (QUERY_STATS_ENABLED)
+        from app.services import query_stats
+        query_stats.init_app(app)
         
         # Registrar blueprints (rutas)
+        phase = time.perf_counter()
         from app.routes import auth_bp, dashboard_bp, project_bp, chat_bp
         
         app.register_blueprint(auth_bp)
         app.register_blueprint(dashboard_bp)
         app.register_blueprint(project_bp)
         app.register_blueprint(chat_bp)
+        timings["blueprints"] = time.perf_counter() - phase
     
     # Configurar logging
     setup_logging(app)
     
+    timings["create_app"] = time.perf_counter() - started
+    app.extensions["startup_timings"] = timings
+    app.logger.info(
+        "[STARTUP] " + ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items())
+        + ("" if app.config["DB_CREATE_ALL"] else " (create_all omitido: DB_CREATE_ALL=false)")
+    )
+    
+    # CLI de migraciones: flask db upgrade | status | stamp | new
+    from app.services.migrations import db_cli
+    app.cli.add_command(db_cli)
+    # Purga GDPR de cuentas con eliminación programada: flask gdpr sweep
+    from app.services.gdpr import gdpr_cli
+    app.cli.add_command(gdpr_cli)
+    # Rollups de analítica de administración: flask analytics refresh [--full]
+    from app.services.analytics import analytics_cli
+    app.cli.add_command(analytics_cli)
+    # Índice de búsqueda: flask search reindex
+    from app.services.search import search_cli
+    app.cli.add_command(search_cli)
+    # Revisión de índices a partir de las consultas capturadas: flask indexes report
+    from app.services.query_stats import indexes_cli
+    app.cli.add_command(indexes_cli)
+    # Datos sintéticos para pruebas de escala: flask data generate --users N --seed S
+    from app.services.synthetic_data import data_cli
+    app.cli.add_command(data_cli)
+    # Re-evaluación por lotes de planes con otra versión de prompt/modelo: flask rescore run | status | promote
+    from app.services.rescoring import rescore_cli
+    app.cli.add_command(rescore_cli)
+    
     @app.shell_context_processor
     def make_shell_context():
         return {"db": db, "User": User}
@@ -78,6 +153,11 @@ def create_app(config_name: str = None) -> Flask:
 
 def setup_logging(app: Flask) -> None:
     """Configurar sistema de logs con rotación"""
+    # En pruebas no se escribe en logs/ del árbol del repositorio
+    if app.testing:
+        app.logger.setLevel(logging.INFO)
+        return
+    
     if not os.path.exists("logs"):
         os.mkdir("logs")
     
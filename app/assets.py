@@ -0,0 +1,82 @@
+"""
+Assets estáticos precompilados (CSS de Tailwind, JS, fuentes)
+scripts/build_assets.mjs genera app/static/dist/ con nombres por hash de contenido
+y un manifest.json {ruta fuente: ruta con hash}; aquí se resuelven esas rutas.
+"""
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+import os
+
+from flask import Flask, current_app, request, url_for
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Los archivos con hash nunca cambian de contenido: cache de un año sin revalidar
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_manifest: Optional[Dict[str, str]] = None
+_manifest_version: Optional[str] = None
+_warned_missing = False
+
+
+def _load_manifest(app: Flask) -> Dict[str, str]:
+    path = os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        global _warned_missing
+        if not _warned_missing:
+            _warned_missing = True
+            logger.warning("[ASSETS] Sin app/static/dist/manifest.json: se usa Tailwind CDN (ejecuta npm run build)")
+        return {}
+
+
+def manifest() -> Dict[str, str]:
+    """Manifest vigente (en debug se relee en cada request para reflejar rebuilds)"""
+    global _manifest, _manifest_version
+    if _manifest is None or current_app.debug:
+        _manifest = _load_manifest(current_app)
+        _manifest_version = None
+    return _manifest
+
+
+def manifest_version() -> str:
+    """Huella del manifest: cambia con cada build de assets aunque las plantillas no cambien"""
+    global _manifest_version
+    current = manifest()
+    if _manifest_version is None:
+        _manifest_version = hashlib.blake2b(
+            json.dumps(current, sort_keys=True).encode("utf-8"), digest_size=8
+        ).hexdigest()
+    return _manifest_version
+
+
+def assets_built() -> bool:
+    """¿Existe el bundle CSS compilado?"""
+    return "css/app.css" in manifest()
+
+
+def asset_url(name: str) -> str:
+    """URL con hash de contenido si el asset está en el manifest; si no, la ruta estática original"""
+    hashed = manifest().get(name)
+    if hashed:
+        return url_for("static", filename=f"{DIST_DIR}/{hashed}")
+    return url_for("static", filename=name)
+
+
+def init_assets(app: Flask) -> None:
+    """Registrar helpers de plantillas y cabeceras de cache para app/static/dist"""
+    app.add_template_global(asset_url)
+    app.add_template_global(assets_built)
+    dist_prefix = f"{app.static_url_path}/{DIST_DIR}/"
+
+    @app.after_request
+    def cache_hashed_assets(response):
+        if request.path.startswith(dist_prefix) and response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
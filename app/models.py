@@ -1,17 +1,71 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID as PG_UUID
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import LargeBinary, TypeDecorator
 import bcrypt
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import os
+import time
 import uuid
 
 db = SQLAlchemy()
 
 
+class GUID(TypeDecorator):
+    """
+    Clave UUID compacta: uuid nativo en Postgres y BLOB de 16 bytes en SQLite (en lugar de
+    VARCHAR(36)). En Python los ids siguen siendo str canónicos ("xxxxxxxx-xxxx-...").
+    Un valor que no es UUID lanza ValueError antes de llegar a la BD: validar la entrada del
+    usuario con parse_id().
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(PG_UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        return str(value) if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+def new_id() -> str:
+    """
+    UUIDv7 (RFC 9562): 48 bits de timestamp en ms + 74 aleatorios. Los ids nuevos son
+    crecientes en el tiempo y las inserciones caen al final del índice de la clave primaria
+    en lugar de en páginas aleatorias (como con uuid4).
+    """
+    millis = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = ((millis & 0xFFFF_FFFF_FFFF) << 80) | (0x7 << 76) | ((rand >> 62) & 0xFFF) << 64 \
+        | (0b10 << 62) | (rand & 0x3FFF_FFFF_FFFF_FFFF)
+    return str(uuid.UUID(int=value))
+
+
+def parse_id(value) -> Optional[str]:
+    """Id canónico de una entrada externa (URL, JSON) o None si no es un UUID"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
 class User(UserMixin, db.Model):
     """Modelo de usuario con validación de RUT único"""
     __tablename__ = "users"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID, primary_key=True, default=new_id)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     rut = db.Column(db.String(12), unique=True, nullable=False, index=True)
@@ -28,7 +82,7 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Password Recovery
-    reset_token = db.Column(db.String(255), unique=True, nullable=True, index=True)
+    reset_token = db.Column(db.String(255), nullable=True)
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
     
     # GDPR/LPD Compliance
@@ -42,6 +96,15 @@ class User(UserMixin, db.Model):
     projects = db.relationship("Project", back_populates="user", cascade="all, delete-orphan")
     audit_logs = db.relationship("AuditLog", back_populates="user", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Mismo nombre que en migrations/001: cuentas vencidas para la purga GDPR
+        db.Index("idx_users_scheduled_deletion", "scheduled_deletion"),
+        # Parcial: solo las pocas cuentas con recuperación de contraseña en curso
+        db.Index("idx_users_reset_token", "reset_token", unique=True,
+                 postgresql_where=db.text("reset_token IS NOT NULL"),
+                 sqlite_where=db.text("reset_token IS NOT NULL")),
+    )
+    
     def set_password(self, password: str) -> None:
         """Hashear password con bcrypt usando work factor 12 (requisito de seguridad)"""
         hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=12))
@@ -112,24 +175,32 @@ class Project(db.Model):
     """Modelo de proyecto de negocio"""
     __tablename__ = "projects"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False, index=True)
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    user_id = db.Column(GUID, db.ForeignKey("users.id"), nullable=False)  # índice: idx_user_created
     title = db.Column(db.String(255), nullable=False)
     raw_idea = db.Column(db.Text, nullable=False)
     variability_score = db.Column(db.Float, default=0.0)  # 0-100: Grado de ambigüedad
+    # Decisión de evaluate_ambiguity; la reutilizan las ideas casi duplicadas (NULL en proyectos previos)
+    requires_clarification = db.Column(db.Boolean)
     status = db.Column(db.Enum("ambiguous", "ready", "in_analysis", "completed", name="project_status"), 
                        default="ambiguous")
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Búsqueda full-text (Postgres): título, idea y plan; lo mantiene app/services/search.py.
+    # Diferida: no se carga con el proyecto. En SQLite la búsqueda usa la tabla FTS5 projects_fts
+    search_vector = deferred(db.Column(db.Text().with_variant(TSVECTOR(), "postgresql")))
     
     # Relaciones
     user = db.relationship("User", back_populates="projects")
     business_plan = db.relationship("BusinessPlan", back_populates="project", uselist=False, 
                                     cascade="all, delete-orphan")
     chat_sessions = db.relationship("ChatSession", back_populates="project", cascade="all, delete-orphan")
+    plan_evaluations = db.relationship("PlanEvaluation", back_populates="project", cascade="all, delete-orphan")
     
     __table_args__ = (
         db.Index("idx_user_created", "user_id", "created_at"),
+        db.Index("idx_projects_updated", "updated_at"),  # refresco incremental de analítica
+        db.Index("idx_projects_search", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
     )
     
     def __repr__(self) -> str:
@@ -140,8 +211,21 @@ class BusinessPlan(db.Model):
     """Modelo de plan de negocio generado por IA"""
     __tablename__ = "business_plans"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    project_id = db.Column(db.String(36), db.ForeignKey("projects.id"), nullable=False, unique=True)
+    # Columnas de los 9 pilares (mismo orden que IncubatorAI.PILLAR_FIELDS)
+    PILLAR_FIELDS = (
+        "problem_statement",
+        "value_proposition",
+        "target_market",
+        "revenue_model",
+        "cost_analysis",
+        "technical_feasibility",
+        "risks_analysis",
+        "scalability_potential",
+        "validation_strategy",
+    )
+    
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    project_id = db.Column(GUID, db.ForeignKey("projects.id"), nullable=False, unique=True)
     
     # Los 9 Pilares de Viabilidad
     problem_statement = db.Column(db.Text)  # Problema Real
@@ -158,11 +242,64 @@ class BusinessPlan(db.Model):
     overall_assessment = db.Column(db.Text)  # Evaluación general
     viability_score = db.Column(db.Float)  # 0-100: Puntuación de viabilidad
     recommendation = db.Column(db.Enum("viable", "needs_pivot", "not_viable", name="recommendation_status"))
+    # Versión (IncubatorAI.scoring_version) del plan promovido por flask rescore; NULL = generado en vivo
+    scoring_version = db.Column(db.String(80))
+    
+    # Regeneración incremental por pilar
+    pillar_scores = db.Column(db.JSON)  # {campo_pilar: 0-100}
+    pillar_sources = db.Column(db.JSON)  # {campo_pilar: [ids de ChatMessage que lo alimentaron]}
     
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     project = db.relationship("Project", back_populates="business_plan")
     
+    __table_args__ = (
+        # Refresco incremental de analítica: filas modificadas y escaneo por día
+        db.Index("idx_business_plans_updated", "updated_at"),
+        db.Index("idx_business_plans_generated", "generated_at"),
+    )
+    
+    def to_plan_dict(self) -> Dict:
+        """Plan vigente en el formato que consume IncubatorAI.regenerate_pillars"""
+        plan = {field: getattr(self, field) or "" for field in self.PILLAR_FIELDS}
+        plan.update(
+            overall_assessment=self.overall_assessment or "",
+            viability_score=self.viability_score or 0,
+            recommendation=self.recommendation,
+            pillar_scores=dict(self.pillar_scores or {}),
+        )
+        return plan
+    
+    def apply_plan(self, plan: Dict, fields: List[str] = None, source_message_ids: List[str] = None) -> None:
+        """
+        Volcar un plan generado por IA sobre las columnas.
+        fields=None aplica el plan completo; si no, solo los pilares indicados
+        (el resto se conserva). source_message_ids registra los turnos que alimentaron cada pilar.
+        """
+        full_plan = fields is None
+        fields = list(self.PILLAR_FIELDS) if full_plan else fields
+        scores = {} if full_plan else dict(self.pillar_scores or {})
+        sources = {} if full_plan else dict(self.pillar_sources or {})
+        new_scores = plan.get("pillar_scores") or {}
+        
+        for field in fields:
+            setattr(self, field, plan.get(field, ""))
+            if field in new_scores:
+                scores[field] = new_scores[field]
+            if source_message_ids:
+                sources[field] = sorted(set(sources.get(field, [])) | set(source_message_ids))
+        
+        self.pillar_scores = scores
+        self.pillar_sources = sources
+        if full_plan or plan.get("overall_assessment"):
+            self.overall_assessment = plan.get("overall_assessment", "")
+        self.viability_score = plan.get("viability_score", 0)
+        self.recommendation = plan.get("recommendation", "not_viable")
+        self.updated_at = datetime.utcnow()
+        # Generado o regenerado en vivo: ya no corresponde a una versión promovida (flask rescore promote)
+        self.scoring_version = None
+    
     def __repr__(self) -> str:
         return f"<BusinessPlan {self.project_id} ({self.recommendation})>"
 
@@ -171,14 +308,15 @@ class ChatSession(db.Model):
     """Modelo de sesión de chat independiente por proyecto"""
     __tablename__ = "chat_sessions"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    project_id = db.Column(db.String(36), db.ForeignKey("projects.id"), nullable=False, index=True)
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    project_id = db.Column(GUID, db.ForeignKey("projects.id"), nullable=False)  # índices: __table_args__
     # message_count almacena solo mensajes de usuario (rol "user")
     message_count = db.Column(db.Integer, default=0)
     is_locked = db.Column(db.Boolean, default=False)  # Bloqueado al alcanzar límite
     session_type = db.Column(db.Enum("clarification", "analysis", "pivot", name="session_type"), 
                              default="clarification")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relaciones
     project = db.relationship("Project", back_populates="chat_sessions")
@@ -186,6 +324,11 @@ class ChatSession(db.Model):
     
     __table_args__ = (
         db.Index("idx_project_created", "project_id", "created_at"),
+        # Sesión de clarificación/análisis del proyecto (filter_by project_id + session_type)
+        db.Index("idx_chat_sessions_project_type", "project_id", "session_type"),
+        # Refresco incremental de analítica: filas modificadas y escaneo por día
+        db.Index("idx_chat_sessions_updated", "updated_at"),
+        db.Index("idx_chat_sessions_created", "created_at"),
     )
     
     def user_messages_count(self) -> int:
@@ -208,8 +351,8 @@ class ChatMessage(db.Model):
     """Modelo de mensajes en sesión de chat"""
     __tablename__ = "chat_messages"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = db.Column(db.String(36), db.ForeignKey("chat_sessions.id"), nullable=False, index=True)
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    session_id = db.Column(GUID, db.ForeignKey("chat_sessions.id"), nullable=False)
     role = db.Column(db.Enum("user", "assistant", name="message_role"), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -218,6 +361,10 @@ class ChatMessage(db.Model):
     
     __table_args__ = (
         db.Index("idx_session_created", "session_id", "created_at"),
+        # Conteo de turnos del usuario por sesión (límite de mensajes): parcial, sin las
+        # respuestas del asistente
+        db.Index("idx_chat_messages_user_turns", "session_id",
+                 postgresql_where=db.text("role = 'user'"), sqlite_where=db.text("role = 'user'")),
     )
     
     def __repr__(self) -> str:
@@ -228,8 +375,8 @@ class AuditLog(db.Model):
     """Modelo para auditoría y cumplimiento GDPR/LPD"""
     __tablename__ = "audit_logs"
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False, index=True)
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    user_id = db.Column(GUID, db.ForeignKey("users.id"), nullable=False)  # índice: idx_user_action
     action = db.Column(db.String(255), nullable=False)  # create_project, generate_plan, etc.
     resource_type = db.Column(db.String(50), nullable=False)  # project, business_plan, etc.
     resource_id = db.Column(db.String(36))
@@ -246,3 +393,87 @@ class AuditLog(db.Model):
     
     def __repr__(self) -> str:
         return f"<AuditLog {self.action} by {self.user_id}>"
+
+
+class AnalyticsDaily(db.Model):
+    """
+    Rollup diario de analítica de administración (app/services/analytics.py).
+    Una fila por (día, métrica, bucket): el dashboard suma pocas filas por día en lugar de
+    agrupar proyectos, planes y sesiones completos en cada lectura.
+    """
+    __tablename__ = "analytics_daily"
+    
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(40), primary_key=True)
+    bucket = db.Column(db.String(40), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<AnalyticsDaily {self.day} {self.metric}:{self.bucket}={self.value}>"
+
+
+class AnalyticsRefresh(db.Model):
+    """Registro de cada refresco de analytics_daily (su started_at es la marca del siguiente incremental)"""
+    __tablename__ = "analytics_refreshes"
+    
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    started_at = db.Column(db.DateTime, nullable=False, index=True)
+    is_full = db.Column(db.Boolean, default=False, nullable=False)
+    days_refreshed = db.Column(db.Integer, default=0)
+    rows_scanned = db.Column(db.Integer, default=0)
+    duration_ms = db.Column(db.Integer)
+    
+    def __repr__(self) -> str:
+        return f"<AnalyticsRefresh {self.started_at} ({self.days_refreshed} días)>"
+
+
+class PlanEvaluation(db.Model):
+    """
+    Re-evaluación de un proyecto con una versión de prompt/modelo (app/services/rescoring.py).
+    Se guarda aparte del plan vigente: business_plans solo cambia al promover la versión.
+    """
+    __tablename__ = "plan_evaluations"
+    
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    project_id = db.Column(GUID, db.ForeignKey("projects.id"), nullable=False, index=True)
+    version = db.Column(db.String(80), nullable=False)  # IncubatorAI.scoring_version
+    model = db.Column(db.String(64), nullable=False)
+    viability_score = db.Column(db.Float)
+    recommendation = db.Column(db.String(20))
+    pillar_scores = db.Column(db.JSON)
+    plan = db.Column(db.JSON)  # plan validado completo (formato de IncubatorAI)
+    previous_score = db.Column(db.Float)  # viability_score vigente al evaluar (deriva entre versiones)
+    error = db.Column(db.Text)  # evaluación fallida (flask rescore run --retry-failed)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    project = db.relationship("Project", back_populates="plan_evaluations")
+    
+    __table_args__ = (
+        # Una evaluación por proyecto y versión; recorre una versión ordenada por proyecto
+        db.UniqueConstraint("version", "project_id", name="uq_plan_evaluations_version_project"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<PlanEvaluation {self.project_id} {self.version} ({self.viability_score})>"
+
+
+class RescoreRun(db.Model):
+    """Checkpoint de una re-evaluación por lotes: una fila por versión, retomable"""
+    __tablename__ = "rescore_runs"
+    
+    id = db.Column(GUID, primary_key=True, default=new_id)
+    version = db.Column(db.String(80), nullable=False, unique=True)
+    model = db.Column(db.String(64), nullable=False)
+    mode = db.Column(db.String(10), nullable=False)  # sync | batch
+    status = db.Column(db.String(20), nullable=False, default="running")  # running | completed | promoted
+    cursor = db.Column(GUID)  # último proyecto enviado a evaluar (keyset por id)
+    pending_jobs = db.Column(db.JSON)  # [{"name": job de la Batch API, "ids": [project_id, ...]}]
+    evaluated = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    promoted_at = db.Column(db.DateTime)
+    
+    def __repr__(self) -> str:
+        return f"<RescoreRun {self.version} {self.status} ({self.evaluated} evaluados)>"
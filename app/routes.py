@@ -1,12 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, abort
+from flask import Response, send_file, stream_with_context
+from flask import session as http_session
 from flask_login import login_user, logout_user, login_required, current_user
 from sqlalchemy.exc import IntegrityError
+from werkzeug.http import is_resource_modified
 from datetime import datetime, timedelta
 import logging
 import re
 
-from app.models import db, User, Project, BusinessPlan, ChatSession, ChatMessage, AuditLog
-from app.services.ai_service import IncubatorAI
+from app.models import db, User, Project, BusinessPlan, ChatSession, ChatMessage, AuditLog, parse_id
+from app.services.ai_service import IncubatorAI, Deadline, DeadlineExceeded
+from app.services import analytics, db_routing, gdpr, idea_index, question_ranker, search, single_flight
+from app.services.fragment_cache import page_etag
 
 logger = logging.getLogger(__name__)
 
@@ -241,18 +246,64 @@ def reset_password(token):
 @login_required
 def dashboard():
     """Dashboard principal del usuario"""
-    projects = Project.query.filter_by(user_id=current_user.id).order_by(
+    projects = db_routing.reader().query(Project).filter_by(user_id=current_user.id).order_by(
         Project.created_at.desc()
     ).all()
     
     # Sin límite diario de creación
     can_create = True
     
-    return render_template(
+    last_modified = max((p.updated_at or p.created_at for p in projects), default=current_user.created_at)
+    etag = page_etag(current_user.id, current_user.email, current_user.role, can_create,
+                     *((p.id, p.updated_at) for p in projects))
+    return _conditional_page(etag, last_modified, lambda: render_template(
         "dashboard/index.html",
         projects=projects,
         can_create_project=can_create
-    )
+    ))
+
+
+@dashboard_bp.route("/search")
+@login_required
+def search_projects():
+    """Búsqueda full-text en los proyectos y planes del usuario (?q=...; ?format=json)"""
+    query = request.args.get("q", "").strip()
+    hits = search.search_projects(current_user.id, query, session=db_routing.reader()) if query else []
+    if request.args.get("format") == "json":
+        return jsonify({"query": query, "results": [
+            {"project_id": hit.project_id, "rank": hit.rank, "title": str(hit.title), "snippet": str(hit.snippet)}
+            for hit in hits
+        ]})
+    return render_template("dashboard/search.html", query=query, hits=hits)
+
+
+@dashboard_bp.route("/admin/ai-health")
+@login_required
+def ai_health():
+    """Métricas de modelos Gemini (circuit breaker y uso de RPM), solo administradores"""
+    if current_user.role != "admin":
+        return jsonify({"error": "No autorizado"}), 403
+    return jsonify({"models": IncubatorAI.health_snapshot()})
+
+
+@dashboard_bp.route("/admin/analytics")
+@login_required
+def admin_analytics():
+    """Analítica agregada (embudo, recomendaciones, viabilidad, mensajes por sesión); admin y seller"""
+    as_json = request.args.get("format") == "json"
+    if current_user.role not in ("admin", "seller"):
+        if as_json:
+            return jsonify({"error": "No autorizado"}), 403
+        abort(403)
+    days = min(max(request.args.get("days", current_app.config["ANALYTICS_DEFAULT_DAYS"], type=int), 1), 365)
+    try:
+        analytics.ensure_fresh()
+    except TimeoutError:
+        logger.warning("[ANALYTICS] Refresco en curso en otro worker: se muestran los rollups vigentes")
+    data = analytics.summary(days)
+    if as_json:
+        return jsonify(data)
+    return render_template("dashboard/analytics.html", data=data)
 
 
 # ==================== PROYECTOS ====================
@@ -278,10 +329,28 @@ def create_project():
         )
         
         try:
-            # Evaluar ambigüedad con IA
-            ai = IncubatorAI(current_app.config["GEMINI_API_KEY"])
-            variability_score, requires_clarification = ai.evaluate_ambiguity(raw_idea)
+            # Ideas casi idénticas ya analizadas: reutilizar la evaluación (solo puntajes, nunca contenido)
+            duplicate = None
+            if current_app.config["IDEA_DEDUP_ENABLED"]:
+                duplicate = idea_index.find_near_duplicate(
+                    raw_idea,
+                    threshold=current_app.config["IDEA_DEDUP_THRESHOLD"],
+                    max_age_seconds=current_app.config["IDEA_INDEX_MAX_AGE"]
+                )
+            
+            # Sin decisión guardada (proyectos previos a la columna) no hay nada que reutilizar
+            if duplicate and duplicate[0].requires_clarification is not None:
+                similar_project, similarity = duplicate
+                variability_score = similar_project.variability_score
+                requires_clarification = similar_project.requires_clarification
+                logger.info(f"Idea casi duplicada de {similar_project.id} (similitud {similarity:.2f}): "
+                            f"se omite evaluate_ambiguity")
+            else:
+                # Evaluar ambigüedad con IA
+                ai = _ai_client()
+                variability_score, requires_clarification = ai.evaluate_ambiguity(raw_idea)
             project.variability_score = variability_score
+            project.requires_clarification = bool(requires_clarification)
             
             db.session.add(project)
             db.session.flush()
@@ -296,6 +365,7 @@ def create_project():
             )
             db.session.add(audit)
             db.session.commit()
+            idea_index.index_project(project)
             
             flash(f"Proyecto '{title}' creado exitosamente", "success")
             
@@ -313,26 +383,55 @@ def create_project():
     return render_template("project/create.html")
 
 
-@project_bp.route("/<project_id>")
+@project_bp.route("/<id:project_id>")
 @login_required
 def view_project(project_id):
     """Ver detalles del proyecto"""
-    project = Project.query.get_or_404(project_id)
+    project = db_routing.reader().get(Project, project_id)
+    if project is None:
+        abort(404)
     
     # Verificar que el proyecto pertenezca al usuario
     if project.user_id != current_user.id:
         flash("No tienes acceso a este proyecto", "error")
         return redirect(url_for("dashboard.dashboard"))
     
-    return render_template(
+    bp = project.business_plan
+    plan_version = (bp.updated_at or bp.generated_at) if bp else None
+    last_modified = max(filter(None, (project.updated_at, project.created_at, plan_version)))
+    etag = page_etag(current_user.email, current_user.role, project.id, project.updated_at, plan_version)
+    return _conditional_page(etag, last_modified, lambda: render_template(
         "project/view.html",
         project=project
-    )
+    ))
+
+
+def _conditional_page(etag: str, last_modified: datetime, render):
+    """
+    Respuesta con ETag/Last-Modified: si el navegador (o nginx) ya tiene la versión vigente
+    responde 304 sin renderizar. Con mensajes flash pendientes se renderiza siempre
+    (la página no es reproducible a partir de los datos).
+    """
+    if http_session.get("_flashes"):
+        return render()
+
+    response = current_app.response_class()
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Privado (datos del usuario) y siempre revalidado
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+    response.set_data(render())
+    response.mimetype = "text/html"
+    return response
 
 
 # ==================== CHAT Y IA ====================
 
-@chat_bp.route("/clarification/<project_id>")
+@chat_bp.route("/clarification/<id:project_id>")
 @login_required
 def clarification_chat(project_id):
     """Sesión de chat para clarificación de ambigüedad"""
@@ -349,20 +448,16 @@ def clarification_chat(project_id):
     ).first()
     
     if not session:
-        # Generar preguntas de clarificación
-        ai = IncubatorAI(current_app.config["GEMINI_API_KEY"])
-        raw_questions = ai.generate_clarification_questions(
-            project.raw_idea,
-            num_questions=current_app.config["AI_AMBIGUITY_QUESTIONS"]
-        )
-        seen = set()
-        questions = []
-        for q in raw_questions:
-            nq = re.sub(r"\W+", " ", (q or "").strip().lower()).strip()
-            if not nq or nq in seen:
-                continue
-            seen.add(nq)
-            questions.append(q)
+        # Generar preguntas de clarificación: ranking local del banco, LLM solo si la cobertura es baja
+        num_questions = current_app.config["AI_AMBIGUITY_QUESTIONS"]
+        questions = question_ranker.select_questions(project.raw_idea, num_questions=num_questions)
+        if questions is None:
+            ai = _ai_client()
+            raw_questions = ai.generate_clarification_questions(
+                project.raw_idea,
+                num_questions=num_questions
+            )
+            questions = question_ranker.dedupe_questions(raw_questions)
         
         session = ChatSession(
             project_id=project_id,
@@ -382,7 +477,7 @@ def clarification_chat(project_id):
         
         db.session.commit()
     
-    messages = ChatMessage.query.filter_by(session_id=session.id).order_by(
+    messages = db_routing.reader().query(ChatMessage).filter_by(session_id=session.id).order_by(
         ChatMessage.created_at.asc()
     ).all()
     
@@ -394,7 +489,7 @@ def clarification_chat(project_id):
     )
 
 
-@chat_bp.route("/analysis/<project_id>")
+@chat_bp.route("/analysis/<id:project_id>")
 @login_required
 def analysis_chat(project_id):
     """Sesión de análisis y generación de plan de negocio"""
@@ -418,7 +513,7 @@ def analysis_chat(project_id):
         db.session.add(session)
         db.session.commit()
     
-    messages = ChatMessage.query.filter_by(session_id=session.id).order_by(
+    messages = db_routing.reader().query(ChatMessage).filter_by(session_id=session.id).order_by(
         ChatMessage.created_at.asc()
     ).all()
     
@@ -434,10 +529,12 @@ def analysis_chat(project_id):
 @login_required
 def send_message():
     """Endpoint AJAX para enviar mensajes"""
-    session_id = request.json.get("session_id")
+    session_id = parse_id(request.json.get("session_id"))
     message_text = request.json.get("message", "").strip()
     
     # Validar sesión
+    if session_id is None:
+        abort(404)
     session = ChatSession.query.get_or_404(session_id)
     project = Project.query.get_or_404(session.project_id)
     
@@ -470,16 +567,20 @@ def send_message():
     
     # Generar respuesta de IA
     try:
-        ai = IncubatorAI(current_app.config["GEMINI_API_KEY"])
+        ai = _ai_client()
         
         # Construir contexto de conversación
+        session_msgs = ChatMessage.query.filter_by(session_id=session_id).order_by(
+            ChatMessage.created_at.asc()
+        ).all()
         conversation_context = "\n".join([
             f"{msg.role.upper()}: {msg.content}"
-            for msg in ChatMessage.query.filter_by(session_id=session_id).all()
+            for msg in session_msgs
         ])
+        user_msg_ids = [msg.id for msg in session_msgs if msg.role == "user"]
 
         # Identificar preguntas ya hechas (para evitar repeticiones)
-        assistant_msgs = ChatMessage.query.filter_by(session_id=session_id, role="assistant").order_by(ChatMessage.created_at.asc()).all()
+        assistant_msgs = [msg for msg in session_msgs if msg.role == "assistant"]
         asked_questions = []
         for msg in assistant_msgs:
             content = (msg.content or "").strip()
@@ -503,34 +604,23 @@ def send_message():
                 and context_signal
             )
 
+            updated_pillars = []
             if ready_for_plan and not plan_already_exists:
-                plan = ai.generate_business_plan(
-                    project.raw_idea,
-                    clarifications=conversation_context
-                )
-                # Guardar/actualizar plan
-                bp = project.business_plan or BusinessPlan(project_id=project.id)
-                bp.problem_statement = plan.get("problem_statement", "")
-                bp.value_proposition = plan.get("value_proposition", "")
-                bp.target_market = plan.get("target_market", "")
-                bp.revenue_model = plan.get("revenue_model", "")
-                bp.cost_analysis = plan.get("cost_analysis", "")
-                bp.technical_feasibility = plan.get("technical_feasibility", "")
-                bp.risks_analysis = plan.get("risks_analysis", "")
-                bp.scalability_potential = plan.get("scalability_potential", "")
-                bp.validation_strategy = plan.get("validation_strategy", "")
-                bp.overall_assessment = plan.get("overall_assessment", "")
-                bp.viability_score = plan.get("viability_score", 0)
-                bp.recommendation = plan.get("recommendation", "not_viable")
-                db.session.add(bp)
-                db.session.commit()
+                _create_plan_once(ai, project, conversation_context, user_msg_ids)
                 plan_already_exists = True
+            elif plan_already_exists:
+                # Plan existente: recalcular solo los pilares que tocan los mensajes nuevos
+                updated_pillars = _refresh_plan_pillars(ai, project, conversation_context, session_msgs)
 
             if plan_already_exists:
                 bp = project.business_plan
                 score = bp.viability_score or 0
                 semaforo = "🟢" if score >= 80 else "🟡" if score >= 60 else "🔴"
-                ai_response = (
+                updated_note = ""
+                if updated_pillars:
+                    names = [IncubatorAI.PILLARS[IncubatorAI.PILLAR_FIELDS.index(f)] for f in updated_pillars]
+                    updated_note = f"Pilares actualizados con tu respuesta: {', '.join(names)}. "
+                ai_response = updated_note + (
                     f"Análisis 9 pilares → Problema: {bp.problem_statement}. "
                     f"Propuesta: {bp.value_proposition}. Mercado: {bp.target_market}. "
                     f"Ingresos: {bp.revenue_model}. Costos: {bp.cost_analysis}. "
@@ -548,42 +638,16 @@ def send_message():
                     max_questions=MAX_QUESTIONS
                 )
                 is_question = ai_response.strip().endswith("?") and len(ai_response.strip()) <= 200
-                if is_question:
-                    norm_set = {re.sub(r"\W+", " ", q.lower()).strip() for q in asked_questions}
-                    candidate_norm = re.sub(r"\W+", " ", ai_response.strip().lower()).strip()
-                    if candidate_norm in norm_set:
-                        for bank_q in ai.QUESTIONS_BANK:
-                            bnorm = re.sub(r"\W+", " ", bank_q.strip().lower()).strip()
-                            if bnorm and bnorm not in norm_set:
-                                ai_response = bank_q
-                                break
+                if is_question and question_ranker.is_duplicate(ai_response, asked_questions):
+                    ai_response = question_ranker.next_unasked_question(project.raw_idea, asked_questions) or ai_response
         else:
-            # Análisis completo
-            plan = ai.generate_business_plan(
-                project.raw_idea,
-                clarifications=conversation_context
-            )
-            # Por ahora, guardar el plan
+            # Análisis completo (solo la primera vez; luego regeneración incremental por pilar)
             if not project.business_plan:
-                bp = BusinessPlan(
-                    project_id=project.id,
-                    problem_statement=plan.get("problem_statement", ""),
-                    value_proposition=plan.get("value_proposition", ""),
-                    target_market=plan.get("target_market", ""),
-                    revenue_model=plan.get("revenue_model", ""),
-                    cost_analysis=plan.get("cost_analysis", ""),
-                    technical_feasibility=plan.get("technical_feasibility", ""),
-                    risks_analysis=plan.get("risks_analysis", ""),
-                    scalability_potential=plan.get("scalability_potential", ""),
-                    validation_strategy=plan.get("validation_strategy", ""),
-                    overall_assessment=plan.get("overall_assessment", ""),
-                    viability_score=plan.get("viability_score", 0),
-                    recommendation=plan.get("recommendation", "not_viable")
-                )
-                db.session.add(bp)
-                db.session.commit()
+                _create_plan_once(ai, project, conversation_context, user_msg_ids)
+            else:
+                _refresh_plan_pillars(ai, project, conversation_context, session_msgs)
             
-            ai_response = plan.get("overall_assessment", "Plan generado exitosamente")
+            ai_response = project.business_plan.overall_assessment or "Plan generado exitosamente"
         
         # Guardar respuesta de IA
         ai_message = ChatMessage(
@@ -621,6 +685,20 @@ Podrás elegir el horario que mejor se adapte a tu disponibilidad. ¡Te esperamo
             "max_messages": current_app.config["MAX_CHAT_MESSAGES"]
         })
     
+    except (DeadlineExceeded, TimeoutError):
+        # Presupuesto agotado (o la misma operación sigue en curso en otro request): el mensaje del usuario ya está guardado y se considerará en el próximo turno
+        db.session.rollback()
+        logger.warning(f"[DEADLINE] Sesión {session_id}: respuesta degradada por tiempo agotado")
+        return jsonify({
+            "success": True,
+            "degraded": True,
+            "response": "El análisis está tardando más de lo habitual. Tu mensaje quedó registrado; "
+                        "vuelve a intentarlo en unos minutos para ver el resultado.",
+            "locked": session.is_locked,
+            "message_count": session.message_count,
+            "max_messages": current_app.config["MAX_CHAT_MESSAGES"]
+        })
+    
     except Exception as e:
         logger.error(f"Error generating AI response: {e}")
         return jsonify({
@@ -628,6 +706,100 @@ Podrás elegir el horario que mejor se adapte a tu disponibilidad. ¡Te esperamo
         }), 500
 
 
+def _ai_client() -> IncubatorAI:
+    """Cliente de IA con el presupuesto de tiempo del request (AI_REQUEST_BUDGET_SECONDS)"""
+    return IncubatorAI(
+        current_app.config["GEMINI_API_KEY"],
+        deadline=Deadline(current_app.config["AI_REQUEST_BUDGET_SECONDS"])
+    )
+
+
+def _generate_plan(ai: IncubatorAI, raw_idea: str, conversation_context: str) -> dict:
+    """Generar el plan completo con el motor configurado (AI_PLAN_ENGINE)"""
+    if current_app.config.get("AI_PLAN_ENGINE") == "parallel":
+        return ai.generate_business_plan_parallel(raw_idea, clarifications=conversation_context)
+    return ai.generate_business_plan(raw_idea, clarifications=conversation_context)
+
+
+def _ai_timeout(ai: IncubatorAI):
+    """Tiempo restante del request para esperar operaciones en curso (None = sin límite)"""
+    return ai.deadline.remaining() if ai.deadline else None
+
+
+def _create_plan_once(ai: IncubatorAI, project: Project, conversation_context: str,
+                      user_msg_ids: list) -> None:
+    """
+    Generar y guardar el plan completo una sola vez aunque lleguen requests concurrentes
+    (doble click, varias pestañas, varios workers): el resto espera el resultado.
+    """
+    def create():
+        # Otro request/worker pudo crear el plan mientras se esperaba el lock
+        if BusinessPlan.query.filter_by(project_id=project.id).first():
+            return
+        plan = _generate_plan(ai, project.raw_idea, conversation_context)
+        bp = BusinessPlan(project_id=project.id)
+        bp.apply_plan(plan, source_message_ids=user_msg_ids)
+        db.session.add(bp)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Carrera residual con un worker sin lock (p.ej. SQLite): conservar el plan ya guardado
+            db.session.rollback()
+            logger.warning(f"Plan de {project.id} ya creado por otro request")
+
+    single_flight.do(
+        project.id, "business_plan",
+        single_flight.input_hash(project.raw_idea, conversation_context),
+        create, timeout=_ai_timeout(ai)
+    )
+    db.session.expire(project, ["business_plan"])
+
+
+def _refresh_plan_pillars(ai: IncubatorAI, project: Project, conversation_context: str,
+                          session_msgs: list) -> list:
+    """
+    Regenerar solo los pilares afectados por mensajes del usuario posteriores
+    a la última actualización del plan. Retorna los campos actualizados.
+    """
+    user_msgs = [msg for msg in session_msgs if msg.role == "user"]
+
+    def refresh():
+        bp = project.business_plan
+        db.session.refresh(bp)  # updated_at vigente tras esperar a un request concurrente
+        last_update = bp.updated_at or bp.generated_at or datetime.min
+        new_msgs = [msg for msg in user_msgs if msg.created_at and msg.created_at > last_update]
+        if not new_msgs:
+            return []
+        
+        new_information = "\n".join(msg.content for msg in new_msgs)
+        affected = ai.detect_affected_pillars(new_information)
+        if not affected:
+            return []
+        
+        update = ai.regenerate_pillars(
+            project.raw_idea,
+            bp.to_plan_dict(),
+            affected,
+            clarifications=conversation_context,
+            new_information=new_information
+        )
+        if not update["updated_fields"]:
+            return []
+        
+        bp.apply_plan(update, fields=update["updated_fields"], source_message_ids=[msg.id for msg in new_msgs])
+        db.session.commit()
+        logger.info(f"Plan {bp.id}: pilares regenerados {update['updated_fields']}")
+        return update["updated_fields"]
+
+    updated = single_flight.do(
+        project.id, "refresh_pillars",
+        single_flight.input_hash(*(msg.id for msg in user_msgs)),
+        refresh, timeout=_ai_timeout(ai)
+    )
+    db.session.refresh(project.business_plan)
+    return updated
+
+
 # ==================== ERRORES ====================
 
 @auth_bp.errorhandler(404)
@@ -688,6 +860,81 @@ def delete_account():
     return render_template("dashboard/delete_account.html")
 
 
+def _audit_export() -> None:
+    """Registrar la solicitud de exportación antes de empezar a generarla"""
+    db.session.add(AuditLog(
+        user_id=current_user.id,
+        action="data_export_requested",
+        resource_type="user",
+        resource_id=current_user.id,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get("User-Agent")
+    ))
+    db.session.commit()
+
+
+@dashboard_bp.route("/export")
+@login_required
+def export_data():
+    """Exportación de datos personales (derecho de acceso) en streaming: ?format=zip|ndjson"""
+    fmt = request.args.get("format", "zip")
+    if fmt not in gdpr.EXPORT_FORMATS:
+        abort(400)
+    _audit_export()
+    generator, mimetype = gdpr.EXPORT_FORMATS[fmt]
+    filename = f"preincubadora_datos_{datetime.utcnow():%Y%m%d}.{fmt}"
+    logger.info(f"[GDPR] Exportación {fmt} en streaming para {current_user.id}")
+    return Response(
+        stream_with_context(generator(current_user.id)),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            # nginx entrega los chunks a medida que llegan (sin bufferizar la exportación)
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@dashboard_bp.route("/export/jobs", methods=["POST"])
+@login_required
+def start_export_job():
+    """Exportación en segundo plano (historiales grandes): el zip queda disponible para descargar"""
+    _audit_export()
+    job_id = gdpr.start_export_job(current_user.id)
+    return jsonify({
+        "job_id": job_id,
+        "status": "running",
+        "status_url": url_for("dashboard.export_job_status", job_id=job_id),
+    }), 202
+
+
+@dashboard_bp.route("/export/jobs/<job_id>")
+@login_required
+def export_job_status(job_id):
+    """Estado del job; cuando está listo incluye la URL de descarga"""
+    status = gdpr.export_job_status(current_user.id, job_id)
+    if status is None:
+        abort(404)
+    payload = {"job_id": job_id, "status": status}
+    if status == "ready":
+        payload["download_url"] = url_for("dashboard.download_export", job_id=job_id)
+    return jsonify(payload)
+
+
+@dashboard_bp.route("/export/jobs/<job_id>/download")
+@login_required
+def download_export(job_id):
+    """Descarga del zip generado por el job (solo su dueño)"""
+    path = gdpr.export_job_path(current_user.id, job_id)
+    if path is None:
+        abort(404)
+    response = send_file(path, mimetype="application/zip", as_attachment=True,
+                         download_name=f"preincubadora_datos_{datetime.utcnow():%Y%m%d}.zip")
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @auth_bp.route("/cancel-deletion", methods=["POST"])
 @login_required
 def cancel_deletion():
@@ -1,32 +1,424 @@
-# Preferir la nueva librería oficial google.genai; fallback a google.generativeai si no está disponible
-try:
-    from google import genai as google_genai
-    _USE_GOOGLE_GENAI = True
-except Exception:
-    import google.generativeai as google_generativeai
-    _USE_GOOGLE_GENAI = False
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+import hashlib
 import json
 import logging
+import os
 import re
+import threading
+import time
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
+# SDK de Gemini importado en el primer uso: importar google.genai cuesta cientos de ms
+# y la mayoría de procesos (CLI, workers que solo sirven páginas) nunca llaman al LLM
+_sdk_lock = threading.Lock()
+_sdk_module = None
+_USE_GOOGLE_GENAI: Optional[bool] = None
+
+
+def _gemini_sdk():
+    """Preferir la nueva librería oficial google.genai; fallback a google.generativeai si no está disponible"""
+    global _sdk_module, _USE_GOOGLE_GENAI
+    if _sdk_module is None:
+        with _sdk_lock:
+            if _sdk_module is None:
+                started = time.perf_counter()
+                try:
+                    from google import genai as module
+                    use_google_genai = True
+                except Exception:
+                    import google.generativeai as module
+                    use_google_genai = False
+                _USE_GOOGLE_GENAI = use_google_genai
+                _sdk_module = module
+                logger.info(f"[AI] SDK {module.__name__} importado en {(time.perf_counter() - started) * 1000:.0f}ms")
+    return _sdk_module
+
+
+def _use_google_genai() -> bool:
+    _gemini_sdk()
+    return _USE_GOOGLE_GENAI
+
+
+class DeadlineExceeded(Exception):
+    """El presupuesto de tiempo del request se agotó antes de obtener respuesta del modelo"""
+
+
+class QuotaExceeded(Exception):
+    """El modelo respondió 429: queda en pausa en el tracker de cuota y se puede reintentar más tarde"""
+
+
+class Deadline:
+    """
+    Presupuesto de tiempo de un request (reloj monotónico).
+    Se crea en la ruta y viaja con IncubatorAI hasta cada llamada al modelo,
+    de modo que un modelo colgado no consuma el timeout completo del worker.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def share(self, attempts_left: int) -> float:
+        """Porción del tiempo restante para el próximo intento (reparto equitativo)"""
+        return self.remaining() / max(1, attempts_left)
+
+
+class _ContextCacheRegistry:
+    """
+    Registro (por proceso) de handles de Gemini context caching.
+    Un mismo prefijo estático (SYSTEM_PROMPT) se sube una sola vez por modelo y se
+    reutiliza mientras el TTL siga vigente. Si el backend rechaza el cache (p.ej. prefijo
+    bajo el mínimo de tokens), el modelo queda marcado y se usa system_instruction.
+    Errores transitorios (red, 5xx, 429) solo pausan el intento con backoff exponencial.
+    """
+
+    RETRY_BASE_SECONDS = 30.0
+    RETRY_MAX_SECONDS = 900.0
+    # Tope de la subida del prefijo: no debe consumir el tiempo de la generación
+    CREATE_TIMEOUT_SECONDS = 10.0
+    # Rechazos definitivos: modelo sin context caching o prefijo bajo el mínimo de tokens
+    UNSUPPORTED_MARKERS = ("INVALID_ARGUMENT", "NOT_FOUND", "not supported", "min_total_token_count")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handles: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._unsupported = set()
+        self._retry: Dict[Tuple[str, str], Tuple[int, float]] = {}  # key → (fallos seguidos, reintentar desde)
+
+    @classmethod
+    def is_unsupported_error(cls, error: Exception) -> bool:
+        """¿El backend rechazó el cache de forma definitiva (400/404) y no por un error transitorio?"""
+        if getattr(error, "code", None) in (400, 404):
+            return True
+        message = str(error)
+        return any(marker in message for marker in cls.UNSUPPORTED_MARKERS)
+
+    def get_or_create(self, client, model_name: str, system_instruction: str, ttl_seconds: int,
+                      timeout: float = None) -> Optional[str]:
+        """Handle del cache para el prefijo; timeout = tiempo del intento en curso (tope CREATE_TIMEOUT_SECONDS)"""
+        digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16]
+        key = (model_name, digest)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._unsupported or self._retry.get(key, (0, 0.0))[1] > now:
+                return None
+            handle = self._handles.get(key)
+            # Margen de 60s para no usar un handle a punto de expirar
+            if handle and handle[1] - 60 > now:
+                return handle[0]
+        try:
+            cached = client.caches.create(
+                model=model_name,
+                config={
+                    "system_instruction": system_instruction,
+                    "ttl": f"{ttl_seconds}s",
+                    "display_name": f"preincubadora-system-{digest}",
+                    "http_options": {"timeout": int(min(timeout or self.CREATE_TIMEOUT_SECONDS,
+                                                        self.CREATE_TIMEOUT_SECONDS) * 1000)},  # milisegundos
+                },
+            )
+        except Exception as e:
+            with self._lock:
+                if self.is_unsupported_error(e):
+                    logger.info(f"[CACHE] Context caching no disponible para {model_name}: {e}")
+                    self._unsupported.add(key)
+                else:
+                    failures = self._retry.get(key, (0, 0.0))[0] + 1
+                    delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** (failures - 1))
+                    self._retry[key] = (failures, now + delay)
+                    logger.warning(f"[CACHE] Error transitorio al cachear el prefijo de {model_name}: {e} "
+                                   f"(reintento en {delay:.0f}s)")
+            return None
+        with self._lock:
+            self._retry.pop(key, None)
+            self._handles[key] = (cached.name, now + ttl_seconds)
+        logger.info(f"[CACHE] Prefijo de sistema cacheado para {model_name}: {cached.name}")
+        return cached.name
+
+
+_context_cache = _ContextCacheRegistry()
+
+
+class _ModelQuotaTracker:
+    """
+    Contador (por proceso) de requests por modelo en una ventana deslizante de 60s.
+    Permite elegir el primer modelo de la lista con holgura de RPM y dejar en pausa
+    los modelos que devolvieron 429 durante un cool-down.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[str, List[float]] = {}
+        self._exhausted_until: Dict[str, float] = {}
+
+    def _prune(self, model_name: str, now: float) -> List[float]:
+        window = [t for t in self._requests.get(model_name, []) if now - t < self.WINDOW_SECONDS]
+        self._requests[model_name] = window
+        return window
+
+    def record(self, model_name: str) -> None:
+        with self._lock:
+            self._requests.setdefault(model_name, []).append(time.monotonic())
+
+    def has_headroom(self, model_name: str, rpm_limit: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._exhausted_until.get(model_name, 0) > now:
+                return False
+            return len(self._prune(model_name, now)) < rpm_limit
+
+    def acquire(self, candidates: List[str], rpm_limits: Dict[str, int]) -> Optional[str]:
+        """Reservar un request en el primer modelo con holgura (None si ninguno la tiene)."""
+        now = time.monotonic()
+        with self._lock:
+            for model_name in candidates:
+                if self._exhausted_until.get(model_name, 0) > now:
+                    continue
+                window = self._prune(model_name, now)
+                if len(window) < rpm_limits.get(model_name, 1):
+                    window.append(now)
+                    return model_name
+        return None
+
+    def mark_exhausted(self, model_name: str, cooldown_seconds: float = WINDOW_SECONDS) -> None:
+        with self._lock:
+            self._exhausted_until[model_name] = time.monotonic() + cooldown_seconds
+
+    def snapshot(self) -> Dict[str, int]:
+        """Requests por modelo en la ventana actual"""
+        now = time.monotonic()
+        with self._lock:
+            return {model_name: len(self._prune(model_name, now)) for model_name in list(self._requests)}
+
+
+_quota_tracker = _ModelQuotaTracker()
+
+
+class _ModelCircuitBreaker:
+    """
+    Circuit breaker (por proceso) para cada modelo: closed → open → half-open → closed.
+    Tras FAILURE_THRESHOLD errores consecutivos (timeouts, 5xx, etc.) el modelo queda
+    abierto durante un cool-down y el tráfico salta directamente al siguiente modelo.
+    Vencido el cool-down pasa a half-open: un health check en segundo plano (o, si no
+    hay probe activo, un único request de prueba) decide si vuelve a closed o se reabre
+    con un cool-down duplicado (hasta MAX_COOLDOWN_SECONDS).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", 3))
+    COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN", 60))
+    MAX_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_MAX_COOLDOWN", 600))
+    # Intervalo del health check en segundo plano; 0 = deshabilitado (el primer request hace de prueba)
+    PROBE_INTERVAL_SECONDS = float(os.getenv("GEMINI_BREAKER_PROBE_INTERVAL", 15))
+    # Un request de prueba sin resultado tras este tiempo libera el half-open para otro intento
+    # (también cuando el health check lleva ese tiempo esperando al modelo)
+    TRIAL_TIMEOUT_SECONDS = 30.0
+    # Timeout de cada llamada del health check (menor que TRIAL_TIMEOUT_SECONDS)
+    PROBE_TIMEOUT_SECONDS = 10.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict] = {}
+        self._probe = None
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_generation = 0
+        self._probe_call_started = 0.0  # inicio de la llamada del health check en curso (0 = ninguna)
+
+    def _entry(self, model_name: str) -> Dict:
+        entry = self._models.get(model_name)
+        if entry is None:
+            entry = {
+                "state": self.CLOSED,
+                "consecutive_failures": 0,
+                "cooldown": self.COOLDOWN_SECONDS,
+                "opened_at": 0.0,
+                "trial_started": 0.0,
+                "successes": 0,
+                "failures": 0,
+                "rejected": 0,
+                "trips": 0,
+                "last_error": None,
+            }
+            self._models[model_name] = entry
+        return entry
+
+    def _refresh(self, entry: Dict, now: float) -> None:
+        if entry["state"] == self.OPEN and now - entry["opened_at"] >= entry["cooldown"]:
+            entry["state"] = self.HALF_OPEN
+            entry["trial_started"] = 0.0
+
+    def allow(self, model_name: str) -> bool:
+        """¿Puede un request de usuario ir a este modelo?"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(model_name)
+            self._refresh(entry, now)
+            if entry["state"] == self.CLOSED:
+                return True
+            if entry["state"] == self.HALF_OPEN and (not self._probing() or self._probe_stalled(now)):
+                if now - entry["trial_started"] >= self.TRIAL_TIMEOUT_SECONDS:
+                    entry["trial_started"] = now
+                    return True
+            entry["rejected"] += 1
+            return False
+
+    def record_success(self, model_name: str) -> None:
+        with self._lock:
+            entry = self._entry(model_name)
+            if entry["state"] != self.CLOSED:
+                logger.info(f"[BREAKER] {model_name} recuperado: closed")
+            entry.update(state=self.CLOSED, consecutive_failures=0, cooldown=self.COOLDOWN_SECONDS)
+            entry["successes"] += 1
+
+    def record_failure(self, model_name: str, error: Exception) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(model_name)
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            entry["last_error"] = str(error)[:200]
+            if entry["state"] == self.HALF_OPEN:
+                # La prueba falló: reabrir con cool-down exponencial
+                entry["cooldown"] = min(entry["cooldown"] * 2, self.MAX_COOLDOWN_SECONDS)
+            elif entry["state"] == self.OPEN or entry["consecutive_failures"] < self.FAILURE_THRESHOLD:
+                return
+            entry.update(state=self.OPEN, opened_at=now)
+            entry["trips"] += 1
+        logger.warning(f"[BREAKER] {model_name} abierto por {entry['cooldown']:.0f}s: {entry['last_error']}")
+
+    def _probing(self) -> bool:
+        return self._probe_thread is not None and self._probe_thread.is_alive()
+
+    def _probe_stalled(self, now: float) -> bool:
+        """¿El health check lleva más de TRIAL_TIMEOUT_SECONDS esperando a un modelo?"""
+        return self._probe_call_started > 0 and now - self._probe_call_started >= self.TRIAL_TIMEOUT_SECONDS
+
+    def start_probe(self, probe) -> None:
+        """
+        Iniciar (una vez por proceso) el health check de modelos en half-open.
+        probe(model_name) debe lanzar excepción si el modelo sigue sin responder.
+        Si el hilo anterior quedó colgado en una llamada se reemplaza por uno nuevo;
+        el colgado descarta su resultado y termina cuando la llamada vuelva.
+        """
+        if self.PROBE_INTERVAL_SECONDS <= 0:
+            return
+        with self._lock:
+            self._probe = probe
+            if self._probing():
+                if not self._probe_stalled(time.monotonic()):
+                    return
+                logger.warning("[BREAKER] Health check colgado, se inicia uno nuevo")
+            self._probe_generation += 1
+            self._probe_call_started = 0.0
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, args=(self._probe_generation,), name="gemini-breaker-probe", daemon=True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self, generation: int) -> None:
+        while True:
+            time.sleep(self.PROBE_INTERVAL_SECONDS)
+            now = time.monotonic()
+            with self._lock:
+                if generation != self._probe_generation:
+                    return
+                for entry in self._models.values():
+                    self._refresh(entry, now)
+                pending = [name for name, entry in self._models.items() if entry["state"] == self.HALF_OPEN]
+            for model_name in pending:
+                with self._lock:
+                    self._probe_call_started = time.monotonic()
+                error = None
+                try:
+                    self._probe(model_name)
+                except Exception as e:
+                    error = e
+                with self._lock:
+                    if generation != self._probe_generation:
+                        return
+                    self._probe_call_started = 0.0
+                if error is not None:
+                    logger.info(f"[BREAKER] Health check fallido para {model_name}")
+                    self.record_failure(model_name, error)
+                else:
+                    self.record_success(model_name)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estado de cada modelo para métricas"""
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for model_name, entry in self._models.items():
+                self._refresh(entry, now)
+                retry_in = entry["opened_at"] + entry["cooldown"] - now if entry["state"] == self.OPEN else 0.0
+                result[model_name] = {
+                    "state": entry["state"],
+                    "consecutive_failures": entry["consecutive_failures"],
+                    "successes": entry["successes"],
+                    "failures": entry["failures"],
+                    "rejected": entry["rejected"],
+                    "trips": entry["trips"],
+                    "retry_in_seconds": round(max(0.0, retry_in), 1),
+                    "last_error": entry["last_error"],
+                }
+            return result
+
+
+_circuit_breaker = _ModelCircuitBreaker()
+
 
 class _GenaiModelWrapper:
     """Wrapper para unificar interfaz generate_content entre google.genai y generativeai."""
-    def __init__(self, client, model_name: str):
+    def __init__(self, client, model_name: str, context_cache_ttl: int = 0):
         self._client = client
         self._model_name = model_name
+        self._context_cache_ttl = context_cache_ttl
 
-    def generate_content(self, prompt: str):
-        # API de google.genai: client.models.generate_content(model=..., contents=[...])
+    def generate_content(self, prompt: str, system_instruction: str = None, response_schema: Dict = None,
+                         timeout: float = None):
+        # API de google.genai: client.models.generate_content(model=..., contents=[...], config=...)
+        config = {}
+        if timeout:
+            config["http_options"] = {"timeout": int(timeout * 1000)}  # milisegundos
+        if response_schema:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = response_schema
+        if system_instruction:
+            cached_name = None
+            if self._context_cache_ttl > 0:
+                cached_name = _context_cache.get_or_create(
+                    self._client, self._model_name, system_instruction, self._context_cache_ttl, timeout=timeout
+                )
+            if cached_name:
+                config["cached_content"] = cached_name
+            else:
+                config["system_instruction"] = system_instruction
         return self._client.models.generate_content(
             model=self._model_name,
-            contents=[{"role": "user", "parts": [{"text": prompt}]}]
+            contents=[{"role": "user", "parts": [{"text": prompt}]}],
+            config=config or None
         )
 
 
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Regex de palabras clave: palabra completa con plural opcional, o raíz si termina en *"""
+    parts = [
+        re.escape(keyword[:-1]) if keyword.endswith("*") else re.escape(keyword) + r"(?:s|es)?\b"
+        for keyword in keywords
+    ]
+    return re.compile(r"\b(?:" + "|".join(parts) + ")")
+
+
 class IncubatorAI:
     """
     Servicio de IA para evaluación de ideas de negocio.
@@ -64,6 +456,18 @@ class IncubatorAI:
         "gemma-3-1b-it",          # ⭐ RPM: 30, TPM: 15K (último recurso)
     ]
     
+    # Límite de requests por minuto del free tier (ver comentarios de MODEL_PRIORITY)
+    MODEL_RPM_LIMITS = {
+        "gemini-2.5-flash": 5,
+        "gemini-3-flash": 5,
+        "gemini-2.5-flash-lite": 10,
+        "gemma-3-27b-it": 30,
+        "gemma-3-12b-it": 30,
+        "gemma-3-4b-it": 30,
+        "gemma-3-2b-it": 30,
+        "gemma-3-1b-it": 30,
+    }
+    
     # Los 9 Pilares de Viabilidad
     PILLARS = [
         "Problema Real",
@@ -77,6 +481,93 @@ class IncubatorAI:
         "Validación"
     ]
     
+    # Campos de BusinessPlan correspondientes a cada pilar (mismo orden que PILLARS)
+    PILLAR_FIELDS = [
+        "problem_statement",
+        "value_proposition",
+        "target_market",
+        "revenue_model",
+        "cost_analysis",
+        "technical_feasibility",
+        "risks_analysis",
+        "scalability_potential",
+        "validation_strategy",
+    ]
+
+    RECOMMENDATIONS = ("viable", "needs_pivot", "not_viable")
+
+    # Palabras clave (sin tildes, en minúsculas) que indican qué pilares toca una clarificación.
+    # Se comparan por palabra completa (admitiendo plural): "venta" no coincide con "ventaja".
+    # Con "*" final son raíces y coinciden con cualquier palabra que empiece así ("cobr*": cobrar, cobro).
+    PILLAR_KEYWORDS = {
+        "problem_statement": ["problema", "dolor", "frustra*", "necesidad", "pierden", "sufren", "resuelve"],
+        "value_proposition": ["diferencia*", "ventaja", "propuesta", "valor", "unico", "unica", "beneficio"],
+        "target_market": ["cliente", "mercado", "segmento", "nicho", "publico", "usuario", "ciudad",
+                          "region", "pais", "tamano", "empresa", "canal"],
+        "revenue_model": ["precio", "cobr*", "suscrip*", "ingreso", "comision", "margen", "venta",
+                          "pago", "tarifa", "monetiz*", "ticket"],
+        "cost_analysis": ["costo", "coste", "gasto", "inversion", "precio", "margen", "proveedor",
+                          "sueldo", "arriendo", "capital", "presupuesto", "equilibrio", "flujo de caja"],
+        "technical_feasibility": ["tecnolog*", "app", "plataforma", "software", "desarroll*", "tecnic*",
+                                  "integraci*", "web", "equipo", "infraestructura", "capacidad",
+                                  "calidad", "postventa", "soporte", "devolucion", "operativ*"],
+        "risks_analysis": ["riesgo", "regula*", "legal", "permiso", "compet*", "amenaza", "normativ*",
+                           "datos sensibles", "proteg*"],
+        "scalability_potential": ["escal*", "crecer", "crecimiento", "expandir", "expansion",
+                                  "internacional", "franquicia", "replicar"],
+        "validation_strategy": ["valid*", "piloto", "encuesta", "prueba", "mvp", "entrevista",
+                                "experimento", "pre-venta", "preventa", "lista de espera", "kpi", "medir"],
+    }
+    _PILLAR_PATTERNS = {field: _keyword_pattern(keywords) for field, keywords in PILLAR_KEYWORDS.items()}
+
+    # Umbrales de recomendación sobre viability_score (0-100)
+    VIABLE_THRESHOLD = 70
+    PIVOT_THRESHOLD = 40
+
+    # Esquemas de salida estructurada (subconjunto OpenAPI aceptado por response_schema)
+    BUSINESS_PLAN_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {
+            **{field: {"type": "STRING"} for field in PILLAR_FIELDS},
+            "overall_assessment": {"type": "STRING"},
+            "viability_score": {"type": "NUMBER"},
+            "pillar_scores": {
+                "type": "OBJECT",
+                "properties": {field: {"type": "NUMBER"} for field in PILLAR_FIELDS},
+            },
+            "recommendation": {"type": "STRING", "enum": list(RECOMMENDATIONS)},
+            "pivot_suggestions": {"type": "ARRAY", "items": {"type": "STRING"}},
+        },
+        "required": PILLAR_FIELDS + ["overall_assessment", "viability_score", "recommendation"],
+        # Score y recomendación primero: si la respuesta se trunca, lo que se pierde es texto reparable
+        "propertyOrdering": ["viability_score", "recommendation"] + PILLAR_FIELDS
+                            + ["pillar_scores", "overall_assessment", "pivot_suggestions"],
+    }
+
+    PIVOT_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {
+            "analysis": {"type": "STRING"},
+            "pivots": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "title": {"type": "STRING"},
+                        "description": {"type": "STRING"},
+                        "key_changes": {"type": "ARRAY", "items": {"type": "STRING"}},
+                        "improved_score_estimate": {"type": "NUMBER"},
+                    },
+                    "required": ["title", "description"],
+                },
+            },
+        },
+        "required": ["analysis", "pivots"],
+    }
+
+    # Mínimo de pilares presentes para reparar un plan en vez de descartarlo
+    MIN_PILLARS_FOR_REPAIR = 6
+
     SYSTEM_PROMPT = """## 1.0 Prompt de Sistema: Arquitectura Lógica de Consultoría
 
 ### 1.1 Identidad y Rol Estratégico
@@ -154,20 +645,165 @@ En el mensaje número 8 detén preguntas y entrega el análisis final con esta e
         "¿Qué datos sensibles manejas y cómo los protegerás?",
     ]
     
-    def __init__(self, api_key: str):
-        """Inicializar cliente de Gemini con sistema de fallback"""
+    # Bloques estáticos de instrucciones (precalculados una sola vez a nivel de clase,
+    # para que el armado de cada prompt solo interpole las partes dinámicas)
+    _CLARIFICATION_FLOW = """INSTRUCCIONES DE FLUJO:
+ - Mensajes 1-3: aplica triaje, formula máximo 3 Golden Questions, no entregues blueprint.
+ - Mensajes 4-7: profundiza en los 9 Pilares con preguntas o mini-resúmenes breves.
+ - Mensaje 8: deja de preguntar y entrega el Business Blueprint en el formato indicado (JSON compacto).
+ - Mensajes 9-10: CTA según semáforo; en 10 entrega link genérico de agendamiento y corta el chat."""
+
+    _CLARIFICATION_PROGRESS_RULES = """- Mientras no alcances el mínimo de preguntas, prioriza hacer preguntas nuevas, concretas (<=20 palabras) y sin redundancia.
+- Al llegar al mínimo o si ya tienes contexto suficiente, mezcla micro-insights sobre los pilares cubiertos (2-3 frases) y solo pide el siguiente dato crítico faltante.
+- No sigas preguntando si ya alcanzaste el máximo o si ya tienes señal suficiente: entrega el blueprint de 9 pilares cuanto antes, sin esperar al mensaje 10."""
+
+    _CLARIFICATION_TASK = """TAREA:
+    - Responde en español con lenguaje simple y bloques cortos.
+    - Si faltan datos y no alcanzaste el mínimo: devuelve SOLO una pregunta nueva, clara, específica y corta (<= 20 palabras).
+    - Si ya cubriste el mínimo o detectas suficiente señal: devuelve un mini-resumen (2-4 frases) de los pilares ya claros y pide solo el dato crítico faltante.
+    - Si ya tienes contexto suficiente (antes del mensaje 10): entrega el análisis ejecutivo con los 9 pilares (texto corrido, no JSON) y un semáforo (🟢/🟡/🔴).
+    - Tono clarificador: ayudamos a decidir, no a emprender.
+    - No uses formato markdown, viñetas ni código. Respuesta directa.
+    - Si ya tienes datos suficientes antes del mensaje 8, entrega el blueprint en texto claro (no envíes JSON al usuario).
+    - Si user_turn >= 9: entrega CTA acorde al semáforo (si no hay semáforo previo, asume amarilla) y en 10 agrega "Agenda aquí: https://calendar.app.google/cuDDtC9Y1tZVDPuD7" y señala que el chat se cierra."""
+
+    _BUSINESS_PLAN_INSTRUCTIONS = """EVALÚA LA IDEA bajo los 9 Pilares y responde en JSON VÁLIDO con esta estructura exacta:
+{
+  "viability_score": <número 0-100>,
+  "recommendation": "viable|needs_pivot|not_viable",
+  "problem_statement": "Descripción del problema que la idea resuelve",
+  "value_proposition": "Propuesta de valor diferencial",
+  "target_market": "Descripción del mercado objetivo (TAM, segmento, geografía)",
+  "revenue_model": "Modelo de ingresos y proyección de base revenue",
+  "cost_analysis": "Análisis de costos operativos y de lanzamiento",
+  "technical_feasibility": "Viabilidad técnica y requerimientos",
+  "risks_analysis": "Principales riesgos y mitiga estrategias",
+  "scalability_potential": "Potencial de escalabilidad y crecimiento",
+  "validation_strategy": "Estrategia para validar la idea en mercado",
+  "pillar_scores": {"problem_statement": <0-100>, "...": <0-100 por cada uno de los 9 campos de pilar>},
+  "overall_assessment": "Síntesis ejecutiva de 3-4 párrafos",
+  "pivot_suggestions": ["sugerencia1", "sugerencia2"] si recommendation != "viable"
+}
+
+INSTRUCCIONES CRÍTICAS:
+1. Sé honesto: si la idea no es viable, explícalo claramente.
+2. Proporciona datos y referencias cuando sea posible.
+3. Si recomiendas "needs_pivot", incluye alternativas estratégicas.
+4. La puntuación debe reflejar viabilidad REALISTA, no optimista.
+"""
+
+    _PIVOT_INSTRUCTIONS = """Tu tarea: Proporciona 3 PIVOTES ESTRATÉGICOS alternativos que:
+1. Mantengan la esencia de la idea original
+2. Aborden los pilares fallidos
+3. Sean viables en el contexto actual
+
+Responde en JSON:
+{
+  "analysis": "Análisis de por qué falla la idea original",
+  "pivots": [
+    {
+      "title": "Pivote 1",
+      "description": "Descripción",
+      "key_changes": ["cambio1", "cambio2"],
+      "improved_score_estimate": <número>
+    },
+    {
+      "title": "Pivote 2",
+      "description": "Descripción",
+      "key_changes": ["cambio1", "cambio2"],
+      "improved_score_estimate": <número>
+    },
+    {
+      "title": "Pivote 3",
+      "description": "Descripción",
+      "key_changes": ["cambio1", "cambio2"],
+      "improved_score_estimate": <número>
+    }
+  ]
+}
+"""
+
+    _PILLAR_UPDATE_INSTRUCTIONS = """ACTUALIZA SOLO los pilares indicados usando la nueva información del usuario.
+Mantén coherencia con los pilares vigentes (no los reescribas).
+Responde en JSON VÁLIDO con esta estructura exacta:
+{
+  "pillars": {
+    "<campo_pilar>": {"text": "Análisis actualizado del pilar", "score": <número 0-100>}
+  },
+  "overall_assessment": "Síntesis ejecutiva actualizada (1 párrafo)"
+}
+La puntuación de cada pilar debe ser REALISTA, no optimista.
+"""
+
+    # Prompt de sistema compacto para llamadas cortas por pilar (motor paralelo)
+    _PILLAR_SYSTEM_PROMPT = """Eres un Consultor de Negocios Senior y Analista Crítico de Riesgos.
+Aplica "Realismo Constructivo": tono profesional, analítico y preventivo, nunca destructivo ni excesivamente entusiasta.
+Responde en español. No uses datos del usuario para entrenar modelos públicos."""
+
+    _PILLAR_INSTRUCTIONS = """Analiza SOLO el pilar indicado (máximo 1 párrafo, datos concretos cuando sea posible).
+Responde en JSON VÁLIDO con esta estructura exacta:
+{"text": "Análisis del pilar", "score": <número 0-100>}
+La puntuación debe reflejar viabilidad REALISTA, no optimista.
+"""
+
+    _SYNTHESIS_INSTRUCTIONS = """Con el análisis de los 9 pilares, entrega la síntesis final en JSON VÁLIDO:
+{
+  "overall_assessment": "Síntesis ejecutiva de 3-4 párrafos",
+  "recommendation": "viable|needs_pivot|not_viable",
+  "pivot_suggestions": ["sugerencia1", "sugerencia2"] si recommendation != "viable"
+}
+Sé honesto: si la idea no es viable, explícalo claramente.
+"""
+
+    PILLAR_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {"text": {"type": "STRING"}, "score": {"type": "NUMBER"}},
+        "required": ["text", "score"],
+    }
+
+    SYNTHESIS_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {
+            "overall_assessment": {"type": "STRING"},
+            "recommendation": {"type": "STRING", "enum": list(RECOMMENDATIONS)},
+            "pivot_suggestions": {"type": "ARRAY", "items": {"type": "STRING"}},
+        },
+        "required": ["overall_assessment", "recommendation"],
+    }
+
+    # Espera máxima (segundos) por un modelo con holgura antes de desistir en el motor paralelo
+    HEADROOM_WAIT_SECONDS = 10
+
+    # TTL (segundos) del context caching de Gemini para SYSTEM_PROMPT; 0 = deshabilitado.
+    # Gemini exige un mínimo de tokens por cache: si el prefijo no califica se usa system_instruction.
+    CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", 0))
+
+    # Timeout por llamada cuando no hay Deadline del request (CLI, tareas en segundo plano)
+    CALL_TIMEOUT_SECONDS = float(os.getenv("GEMINI_CALL_TIMEOUT", 60))
+    # Con menos tiempo que esto no se inicia un nuevo intento
+    MIN_ATTEMPT_SECONDS = 2.0
+
+    def __init__(self, api_key: str, deadline: Optional[Deadline] = None):
+        """
+        Inicializar cliente de Gemini con sistema de fallback.
+        deadline: presupuesto de tiempo del request; cada intento (incluidos los
+        fallbacks) recibe su parte del tiempo restante.
+        """
         self.api_key = api_key
+        self.deadline = deadline
         self.current_model_index = 0
 
-        if _USE_GOOGLE_GENAI:
+        sdk = _gemini_sdk()
+        if _use_google_genai():
             # Nueva librería oficial
-            self._client = google_genai.Client(api_key=api_key)
+            self._client = sdk.Client(api_key=api_key)
         else:
             # Librería deprecada, usada como fallback
-            google_generativeai.configure(api_key=api_key)
+            sdk.configure(api_key=api_key)
             self._client = None
 
         self.model = self._initialize_model()
+        _circuit_breaker.start_probe(self._probe_model)
         logger.info(f"[OK] Modelo inicializado: {self.MODEL_PRIORITY[self.current_model_index]}")
     
     @staticmethod
@@ -212,18 +848,66 @@ En el mensaje número 8 detén preguntas y entrega el análisis final con esta e
     
     def _initialize_model(self):
         """Inicializar modelo actual basado en el índice de prioridad"""
-        model_name = self.MODEL_PRIORITY[self.current_model_index]
-        if _USE_GOOGLE_GENAI:
-            return _GenaiModelWrapper(self._client, model_name)
+        return self._build_model(self.MODEL_PRIORITY[self.current_model_index])
+
+    def _build_model(self, model_name: str):
+        """Construir el cliente de un modelo concreto"""
+        if _use_google_genai():
+            return _GenaiModelWrapper(self._client, model_name, context_cache_ttl=self.CONTEXT_CACHE_TTL)
         else:
-            return google_generativeai.GenerativeModel(model_name)
+            return _gemini_sdk().GenerativeModel(model_name)
+
+    @staticmethod
+    def _supports_system_instruction(model_name: str) -> bool:
+        """Gemma (vía Gemini API) y la librería deprecada no aceptan system_instruction."""
+        return _use_google_genai() and not model_name.startswith("gemma")
+
+    @staticmethod
+    def _supports_structured_output(model_name: str) -> bool:
+        """JSON mode (response_mime_type/response_schema) solo está habilitado para Gemini."""
+        return _use_google_genai() and not model_name.startswith("gemma")
+
+    def _call_model(self, prompt: str, system_instruction: str = None, response_schema: Dict = None,
+                    timeout: float = None):
+        """
+        Invocar el modelo actual enviando el bloque estático como system_instruction
+        (o context cache) cuando el backend lo soporta; si no, se antepone al prompt.
+        Con response_schema se solicita salida JSON estructurada si el modelo la soporta.
+        """
+        model_name = self.MODEL_PRIORITY[self.current_model_index]
+        return self._call_named_model(self.model, model_name, prompt, system_instruction, response_schema,
+                                      timeout=timeout)
+
+    def _call_named_model(self, model, model_name: str, prompt: str, system_instruction: str = None,
+                          response_schema: Dict = None, record_usage: bool = True, timeout: float = None):
+        """
+        Invocar un modelo concreto (sin tocar current_model_index; seguro entre hilos).
+        record_usage=False cuando el request ya fue reservado con _quota_tracker.acquire.
+        """
+        if record_usage:
+            _quota_tracker.record(model_name)
+        kwargs = {}
+        if response_schema and self._supports_structured_output(model_name):
+            kwargs["response_schema"] = response_schema
+        if system_instruction and self._supports_system_instruction(model_name):
+            kwargs["system_instruction"] = system_instruction
+        elif system_instruction:
+            prompt = f"{system_instruction}\n\n{prompt}"
+        if timeout:
+            if _use_google_genai():
+                kwargs["timeout"] = timeout
+            else:
+                kwargs["request_options"] = {"timeout": timeout}
+        return model.generate_content(prompt, **kwargs)
 
     @staticmethod
     def _extract_json_payload(text: str):
         """Extrae un payload JSON válido desde texto que pueda contener ruido/markdown.
 
         Soporta objetos y arreglos como raíz. Elimina bloques ```json y ``` si existen,
-        y recorta al primer '{' o '[' hasta el último '}' o ']'.
+        y recorta al primer '{' o '[' hasta el último '}' o ']'. Si el payload está
+        truncado o trae comas colgantes (respuesta cortada), se repara localmente
+        con _repair_json en lugar de descartar la respuesta.
         """
         if not text:
             raise json.JSONDecodeError("Respuesta vacía", text, 0)
@@ -232,6 +916,7 @@ En el mensaje número 8 detén preguntas y entrega el análisis final con esta e
             cleaned = cleaned[7:]
         if cleaned.startswith("```"):
             cleaned = cleaned[3:]
+        cleaned = cleaned.rstrip()
         if cleaned.endswith("```"):
             cleaned = cleaned[:-3]
 
@@ -245,12 +930,170 @@ En el mensaje número 8 detén preguntas y entrega el análisis final con esta e
         end_obj = cleaned.rfind('}')
         end_arr = cleaned.rfind(']')
         ends = [i for i in [end_obj, end_arr] if i != -1 and i >= start]
-        if not ends:
-            raise json.JSONDecodeError("JSON incompleto: falta cierre", cleaned, len(cleaned))
-        end = max(ends) + 1
+        if ends:
+            try:
+                return json.loads(cleaned[start:max(ends) + 1])
+            except json.JSONDecodeError:
+                pass
+
+        repaired = IncubatorAI._repair_json(cleaned[start:])
+        data = json.loads(repaired)
+        logger.warning("[REPAIR] JSON reparado localmente (respuesta truncada o mal formada)")
+        return data
+
+    @staticmethod
+    def _repair_json(payload: str) -> str:
+        """
+        Reparación de un solo paso para JSON casi válido: cierra strings y
+        objetos/arreglos abiertos, descarta claves sin valor y comas colgantes.
+        """
+        stack = []
+        in_string = False
+        escaped = False
+        for ch in payload:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+                continue
+            if ch == '"':
+                in_string = True
+            elif ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch in "}]" and stack:
+                stack.pop()
+
+        repaired = payload
+        if in_string:
+            if escaped:
+                repaired = repaired[:-1]
+            repaired += '"'
+        repaired = repaired.rstrip()
+
+        if stack and stack[-1] == "}":
+            # Clave sin valor al final: `, "clave":` o `, "clave"`
+            repaired = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", repaired)
+        repaired = re.sub(r"[,:]\s*$", "", repaired.rstrip())
+        repaired += "".join(reversed(stack))
+        # Comas colgantes antes de un cierre
+        return re.sub(r",\s*([}\]])", r"\1", repaired)
+
+    def _validate_business_plan(self, data) -> Dict:
+        """
+        Validar un plan contra BUSINESS_PLAN_SCHEMA y normalizar desvíos menores
+        (tipos, score fuera de rango, recomendación con otro formato, pilares faltantes).
 
-        payload = cleaned[start:end]
-        return json.loads(payload)
+        Raises:
+            ValueError: Si el payload está demasiado incompleto para repararlo
+        """
+        if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+            data = data[0]
+        if not isinstance(data, dict):
+            raise ValueError("El plan no es un objeto JSON")
+
+        def as_text(value) -> str:
+            if value is None:
+                return ""
+            if isinstance(value, list):
+                return "\n".join(str(v) for v in value)
+            if isinstance(value, dict):
+                return "\n".join(f"{k}: {v}" for k, v in value.items())
+            return str(value).strip()
+
+        present = [f for f in self.PILLAR_FIELDS if as_text(data.get(f))]
+        if len(present) < self.MIN_PILLARS_FOR_REPAIR:
+            raise ValueError(f"Plan incompleto: solo {len(present)} de {len(self.PILLAR_FIELDS)} pilares")
+
+        plan = {field: as_text(data.get(field)) or "Por definir" for field in self.PILLAR_FIELDS}
+        plan["overall_assessment"] = as_text(data.get("overall_assessment")) or "Por definir"
+
+        if data.get("viability_score") is None:
+            raise ValueError("Plan sin viability_score")
+        match = re.search(r"\d+(?:\.\d+)?", str(data["viability_score"]))
+        if not match:
+            raise ValueError(f"viability_score inválido: {data['viability_score']!r}")
+        plan["viability_score"] = max(0.0, min(100.0, float(match.group())))
+
+        recommendation = re.sub(r"[\s-]+", "_", str(data.get("recommendation", "")).strip().lower())
+        if recommendation not in self.RECOMMENDATIONS:
+            recommendation = self.recommendation_for_score(plan["viability_score"])
+        plan["recommendation"] = recommendation
+
+        raw_scores = data.get("pillar_scores") if isinstance(data.get("pillar_scores"), dict) else {}
+        plan["pillar_scores"] = {
+            field: self._coerce_score(raw_scores.get(field), default=plan["viability_score"])
+            for field in self.PILLAR_FIELDS
+        }
+
+        suggestions = data.get("pivot_suggestions") or []
+        if isinstance(suggestions, str):
+            suggestions = [suggestions]
+        plan["pivot_suggestions"] = [as_text(s) for s in suggestions if as_text(s)]
+        return plan
+
+    @staticmethod
+    def _coerce_score(value, default: float = 0.0) -> float:
+        """Convertir un puntaje (número o texto tipo "72/100") al rango 0-100."""
+        match = re.search(r"\d+(?:\.\d+)?", str(value)) if value is not None else None
+        if not match:
+            return float(default)
+        return max(0.0, min(100.0, float(match.group())))
+
+    @classmethod
+    def recommendation_for_score(cls, score: float) -> str:
+        """Recomendación derivada del viability_score (cuando el modelo no la entrega)."""
+        if score >= cls.VIABLE_THRESHOLD:
+            return "viable"
+        if score >= cls.PIVOT_THRESHOLD:
+            return "needs_pivot"
+        return "not_viable"
+
+    @classmethod
+    def score_from_pillars(cls, pillar_scores: Dict[str, float]) -> float:
+        """viability_score como promedio de los sub-puntajes de los 9 pilares."""
+        scores = [float(pillar_scores[f]) for f in cls.PILLAR_FIELDS if pillar_scores.get(f) is not None]
+        if not scores:
+            return 0.0
+        return round(sum(scores) / len(scores), 1)
+
+    @classmethod
+    def detect_affected_pillars(cls, text: str) -> List[str]:
+        """Detectar (localmente, sin LLM) qué pilares toca un texto de clarificación."""
+        if not text:
+            return []
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+        return [
+            field for field in cls.PILLAR_FIELDS
+            if cls._PILLAR_PATTERNS[field].search(normalized)
+        ]
+
+    @staticmethod
+    def _validate_pivot_session(data) -> Dict:
+        """Validar/normalizar la respuesta de pivotes contra PIVOT_SCHEMA."""
+        if not isinstance(data, dict):
+            raise ValueError("La sesión de pivote no es un objeto JSON")
+        pivots = []
+        for pivot in data.get("pivots") or []:
+            if not isinstance(pivot, dict) or not pivot.get("title"):
+                continue
+            key_changes = pivot.get("key_changes") or []
+            if isinstance(key_changes, str):
+                key_changes = [key_changes]
+            try:
+                estimate = float(pivot.get("improved_score_estimate", 0) or 0)
+            except (TypeError, ValueError):
+                estimate = 0.0
+            pivots.append({
+                "title": str(pivot.get("title", "")).strip(),
+                "description": str(pivot.get("description", "")).strip(),
+                "key_changes": [str(c) for c in key_changes],
+                "improved_score_estimate": max(0.0, min(100.0, estimate)),
+            })
+        return {"analysis": str(data.get("analysis", "")).strip(), "pivots": pivots}
     
     def _try_next_model(self):
         """Cambiar al siguiente modelo en la lista de prioridad"""
@@ -260,34 +1103,168 @@ En el mensaje número 8 detén preguntas y entrega el análisis final con esta e
             logger.warning(f"[FALLBACK] Cambiando a modelo: {self.MODEL_PRIORITY[self.current_model_index]}")
             return True
         else:
-            logger.error("[ERROR] Todos los modelos han excedido su cuota")
+            logger.error("[ERROR] No quedan modelos de respaldo (cuota excedida o circuito abierto)")
             return False
     
-    def _generate_with_fallback(self, prompt: str, max_retries: int = 3) -> str:
+    def _attempt_timeout(self, attempts_left: int) -> float:
+        """Timeout del próximo intento: su parte del Deadline, o CALL_TIMEOUT_SECONDS sin Deadline"""
+        if self.deadline is None:
+            return self.CALL_TIMEOUT_SECONDS
+        if self.deadline.remaining() < self.MIN_ATTEMPT_SECONDS:
+            raise DeadlineExceeded("Se agotó el tiempo disponible para generar la respuesta")
+        return min(self.CALL_TIMEOUT_SECONDS, max(self.MIN_ATTEMPT_SECONDS, self.deadline.share(attempts_left)))
+
+    @staticmethod
+    def _is_timeout_error(error: Exception) -> bool:
+        """¿La llamada se cortó por timeout (y no por una respuesta de error del modelo)?"""
+        if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+            return True
+        message = str(error).lower()
+        return "timeout" in message or "timed out" in message or "deadline" in message
+
+    def _record_model_failure(self, model_name: str, error: Exception, timeout: float) -> None:
         """
-        Generar contenido con fallback automático si se excede cuota.
-        Intenta con el modelo actual, si falla por cuota (429), prueba el siguiente.
+        Contar la falla para el circuit breaker, salvo un timeout de un intento que solo
+        tenía una parte del Deadline: un modelo lento pero sano no debe abrir su circuito.
+        """
+        if timeout < self.CALL_TIMEOUT_SECONDS and self._is_timeout_error(error):
+            logger.info(f"[BREAKER] Timeout de {model_name} con {timeout:.1f}s del Deadline, no cuenta como falla")
+            return
+        _circuit_breaker.record_failure(model_name, error)
+
+    def _generate_with_fallback(
+        self,
+        prompt: str,
+        max_retries: int = 3,
+        system_instruction: str = None,
+        response_schema: Dict = None,
+    ) -> str:
+        """
+        Generar contenido con fallback automático si se excede cuota o el modelo falla.
+        Intenta con el modelo actual; ante un 429 o un error (timeout, 5xx) prueba el siguiente.
+        Los modelos con circuit breaker abierto se saltan sin gastar intentos.
+        Con Deadline, cada intento recibe su parte del tiempo restante; si se agota
+        se lanza DeadlineExceeded.
+        system_instruction: bloque estático (p.ej. SYSTEM_PROMPT) enviado fuera del prompt.
+        response_schema: esquema JSON para salida estructurada (si el modelo lo soporta).
         """
         attempts = 0
+        last_error = None
         while attempts < max_retries:
+            model_name = self.MODEL_PRIORITY[self.current_model_index]
+            if not _circuit_breaker.allow(model_name):
+                logger.info(f"[BREAKER] {model_name} no disponible (circuito abierto), se omite")
+                if not self._try_next_model():
+                    break
+                continue
+            attempts_left = min(max_retries - attempts, len(self.MODEL_PRIORITY) - self.current_model_index)
+            timeout = self._attempt_timeout(attempts_left)
             try:
-                response = self.model.generate_content(prompt)
-                return response.text
+                response = self._call_model(prompt, system_instruction, response_schema, timeout=timeout)
+                text = response.text
             except Exception as e:
                 error_str = str(e)
-                # Error 429 = Cuota excedida
+                last_error = e
+                # Error 429 = Cuota excedida (el modelo está sano, no cuenta para el breaker)
                 if "429" in error_str or "quota" in error_str.lower():
-                    logger.warning(f"[QUOTA] Cuota excedida para {self.MODEL_PRIORITY[self.current_model_index]}")
-                    if not self._try_next_model():
-                        raise Exception("Todos los modelos disponibles han excedido su cuota gratuita")
-                    attempts += 1
+                    logger.warning(f"[QUOTA] Cuota excedida para {model_name}")
+                    _quota_tracker.mark_exhausted(model_name)
                 else:
-                    # Otro tipo de error, no reintentar
-                    logger.error(f"[ERROR] Error al generar contenido: {e}")
-                    raise e
-        
+                    logger.error(f"[ERROR] Error al generar contenido con {model_name}: {e}")
+                    self._record_model_failure(model_name, e, timeout)
+                attempts += 1
+                if not self._try_next_model():
+                    break
+                continue
+            _circuit_breaker.record_success(model_name)
+            return text
+
+        if last_error is None:
+            raise Exception("Todos los modelos disponibles están en pausa (circuit breaker abierto)")
+        if attempts < max_retries:
+            raise Exception(f"Todos los modelos disponibles fallaron o excedieron su cuota: {last_error}")
         raise Exception(f"Falló después de {max_retries} intentos con diferentes modelos")
     
+    def _generate_with_headroom(self, prompt: str, system_instruction: str = None,
+                                response_schema: Dict = None) -> str:
+        """
+        Generar contenido en el primer modelo de MODEL_PRIORITY con holgura de RPM.
+        No modifica el modelo actual de la instancia, por lo que es seguro entre hilos.
+        Un 429 deja el modelo en pausa y se reintenta con el siguiente con holgura;
+        otros errores cuentan para el circuit breaker y también pasan al siguiente modelo.
+        Las llamadas concurrentes comparten el Deadline del request (no se reparte entre hilos).
+        """
+        deadline = time.monotonic() + self.HEADROOM_WAIT_SECONDS
+        if self.deadline is not None:
+            deadline = min(deadline, self.deadline.expires_at)
+        failed = set()
+        last_error = None
+        while True:
+            # Antes de reservar cuota: si el Deadline se agotó, DeadlineExceeded sale sin gastar
+            # un slot de RPM ni contar como falla de un modelo que no se llegó a llamar
+            timeout = self._attempt_timeout(1)
+            model_name = None
+            for candidate in self.MODEL_PRIORITY:
+                if candidate in failed or not _circuit_breaker.allow(candidate):
+                    continue
+                if _quota_tracker.acquire([candidate], self.MODEL_RPM_LIMITS):
+                    model_name = candidate
+                    break
+            if model_name is None:
+                if time.monotonic() >= deadline or len(failed) == len(self.MODEL_PRIORITY):
+                    if last_error is not None:
+                        raise last_error
+                    if self.deadline is not None and self.deadline.remaining() < self.MIN_ATTEMPT_SECONDS:
+                        raise DeadlineExceeded("Se agotó el tiempo esperando cuota disponible")
+                    raise Exception("Ningún modelo tiene cuota disponible en este momento")
+                time.sleep(0.5)
+                continue
+            try:
+                response = self._call_named_model(
+                    self._build_model(model_name), model_name, prompt, system_instruction, response_schema,
+                    record_usage=False, timeout=timeout
+                )
+                text = response.text
+            except Exception as e:
+                error_str = str(e)
+                if "429" in error_str or "quota" in error_str.lower():
+                    logger.warning(f"[QUOTA] Cuota excedida para {model_name} (motor paralelo)")
+                    _quota_tracker.mark_exhausted(model_name)
+                    continue
+                logger.error(f"[ERROR] Error en {model_name} (motor paralelo): {e}")
+                self._record_model_failure(model_name, e, timeout)
+                failed.add(model_name)
+                last_error = e
+                continue
+            _circuit_breaker.record_success(model_name)
+            return text
+
+    def _probe_model(self, model_name: str) -> None:
+        """Health check liviano (1 token de salida) usado por el circuit breaker en half-open"""
+        _quota_tracker.record(model_name)
+        config = {"max_output_tokens": 1}
+        timeout = _ModelCircuitBreaker.PROBE_TIMEOUT_SECONDS
+        if _use_google_genai():
+            config["http_options"] = {"timeout": int(timeout * 1000)}  # milisegundos
+            self._client.models.generate_content(
+                model=model_name, contents=[{"role": "user", "parts": [{"text": "ping"}]}], config=config
+            )
+        else:
+            _gemini_sdk().GenerativeModel(model_name).generate_content(
+                "ping", generation_config=config, request_options={"timeout": timeout}
+            )
+
+    @staticmethod
+    def health_snapshot() -> Dict[str, Dict]:
+        """Métricas de modelos: estado del circuit breaker y requests en la ventana de RPM"""
+        breakers = _circuit_breaker.snapshot()
+        usage = _quota_tracker.snapshot()
+        return {
+            model_name: {**breakers.get(model_name, {"state": _ModelCircuitBreaker.CLOSED}),
+                         "requests_last_minute": usage.get(model_name, 0)}
+            for model_name in IncubatorAI.MODEL_PRIORITY
+        }
+
     def evaluate_ambiguity(self, raw_idea: str) -> Tuple[float, bool]:
         """
         Evaluar el grado de ambigüedad de una idea.
@@ -385,23 +1362,14 @@ Responde SOLO en JSON VÁLIDO (sin markdown, sin texto adicional):
         asked_questions = asked_questions or []
         unique_questions = "\n".join([f"- {q}" for q in asked_questions[-8:]])
 
-        prompt = f"""
-{self.SYSTEM_PROMPT}
-
-NÚMERO DE MENSAJE DEL USUARIO (solo mensajes de rol user): {user_turn}
-INSTRUCCIONES DE FLUJO:
- - Mensajes 1-3: aplica triaje, formula máximo 3 Golden Questions, no entregues blueprint.
- - Mensajes 4-7: profundiza en los 9 Pilares con preguntas o mini-resúmenes breves.
- - Mensaje 8: deja de preguntar y entrega el Business Blueprint en el formato indicado (JSON compacto).
- - Mensajes 9-10: CTA según semáforo; en 10 entrega link genérico de agendamiento y corta el chat.
+        prompt = f"""NÚMERO DE MENSAJE DEL USUARIO (solo mensajes de rol user): {user_turn}
+{self._CLARIFICATION_FLOW}
 
 CONTROL DE PREGUNTAS ÚNICAS Y PROGRESO:
 - Ya hiciste {len(asked_questions)} preguntas. Objetivo: mínimo {min_questions}, máximo {max_questions} preguntas únicas.
 - Preguntas ya hechas (NO repetir ni re-frasear):
 {unique_questions if unique_questions else "- Ninguna aún"}
-- Mientras no alcances el mínimo de preguntas, prioriza hacer preguntas nuevas, concretas (<=20 palabras) y sin redundancia.
-- Al llegar al mínimo o si ya tienes contexto suficiente, mezcla micro-insights sobre los pilares cubiertos (2-3 frases) y solo pide el siguiente dato crítico faltante.
-- No sigas preguntando si ya alcanzaste el máximo o si ya tienes señal suficiente: entrega el blueprint de 9 pilares cuanto antes, sin esperar al mensaje 10.
+{self._CLARIFICATION_PROGRESS_RULES}
 
 CONTEXTO DE CONVERSACIÓN (historial):
 {context}
@@ -409,18 +1377,10 @@ CONTEXTO DE CONVERSACIÓN (historial):
 IDEA ORIGINAL:
 "{raw_idea}"
 
-TAREA:
-    - Responde en español con lenguaje simple y bloques cortos.
-    - Si faltan datos y no alcanzaste el mínimo: devuelve SOLO una pregunta nueva, clara, específica y corta (<= 20 palabras).
-    - Si ya cubriste el mínimo o detectas suficiente señal: devuelve un mini-resumen (2-4 frases) de los pilares ya claros y pide solo el dato crítico faltante.
-    - Si ya tienes contexto suficiente (antes del mensaje 10): entrega el análisis ejecutivo con los 9 pilares (texto corrido, no JSON) y un semáforo (🟢/🟡/🔴).
-    - Tono clarificador: ayudamos a decidir, no a emprender.
-    - No uses formato markdown, viñetas ni código. Respuesta directa.
-    - Si ya tienes datos suficientes antes del mensaje 8, entrega el blueprint en texto claro (no envíes JSON al usuario).
-    - Si user_turn >= 9: entrega CTA acorde al semáforo (si no hay semáforo previo, asume amarilla) y en 10 agrega "Agenda aquí: https://calendar.app.google/cuDDtC9Y1tZVDPuD7" y señala que el chat se cierra.
+{self._CLARIFICATION_TASK}
 """
         try:
-            text = self._generate_with_fallback(prompt)
+            text = self._generate_with_fallback(prompt, system_instruction=self.SYSTEM_PROMPT)
             # Quitar cercos de código si el modelo los añade
             if text.startswith("```"):
                 text = text.strip().strip("`")
@@ -441,62 +1401,325 @@ TAREA:
         Returns:
             Dictionary con análisis completo de viabilidad
         """
-        # Sanitizar ambos inputs
+        prompt = self.business_plan_prompt(raw_idea, clarifications)
+        text = ""
+        try:
+            text = self._generate_with_fallback(
+                prompt,
+                system_instruction=self.SYSTEM_PROMPT,
+                response_schema=self.BUSINESS_PLAN_SCHEMA
+            )
+            return self._validate_business_plan(self._extract_json_payload(text))
+        except DeadlineExceeded:
+            # Sin tiempo no se persiste un plan genérico: la ruta responde en modo degradado
+            raise
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"JSON parsing error: {e}. Response: {text}")
+            return self._create_fallback_plan(raw_idea)
+        except Exception as e:
+            logger.error(f"Error generating business plan: {e}")
+            return self._create_fallback_plan(raw_idea)
+    
+    def business_plan_prompt(self, raw_idea: str, clarifications: str = None) -> str:
+        """Prompt del plan completo con ambos inputs sanitizados (ValueError si hay Prompt Injection)"""
         raw_idea = self.sanitize_input(raw_idea)
         if clarifications:
             clarifications = self.sanitize_input(clarifications)
-        
+
         context = f"IDEA ORIGINAL:\n{raw_idea}"
         if clarifications:
             context += f"\n\nCLARIFICACIONES DEL USUARIO:\n{clarifications}"
-        
-        prompt = f"""{self.SYSTEM_PROMPT}
+        return f"{context}\n\n{self._BUSINESS_PLAN_INSTRUCTIONS}"
 
-{context}
+    # ==================== RE-EVALUACIÓN POR LOTES ====================
 
-EVALÚA LA IDEA bajo los 9 Pilares y responde en JSON VÁLIDO con esta estructura exacta:
-{{
-  "problem_statement": "Descripción del problema que la idea resuelve",
-  "value_proposition": "Propuesta de valor diferencial",
-  "target_market": "Descripción del mercado objetivo (TAM, segmento, geografía)",
-  "revenue_model": "Modelo de ingresos y proyección de base revenue",
-  "cost_analysis": "Análisis de costos operativos y de lanzamiento",
-  "technical_feasibility": "Viabilidad técnica y requerimientos",
-  "risks_analysis": "Principales riesgos y mitiga estrategias",
-  "scalability_potential": "Potencial de escalabilidad y crecimiento",
-  "validation_strategy": "Estrategia para validar la idea en mercado",
-  "overall_assessment": "Síntesis ejecutiva de 3-4 párrafos",
-  "viability_score": <número 0-100>,
-  "recommendation": "viable|needs_pivot|not_viable",
-  "pivot_suggestions": ["sugerencia1", "sugerencia2"] si recommendation != "viable"
-}}
+    # Estados terminales de un job de la Batch API
+    BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED", "JOB_STATE_FAILED",
+                         "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
 
-INSTRUCCIONES CRÍTICAS:
-1. Sé honesto: si la idea no es viable, explícalo claramente.
-2. Proporciona datos y referencias cuando sea posible.
-3. Si recomiendas "needs_pivot", incluye alternativas estratégicas.
-4. La puntuación debe reflejar viabilidad REALISTA, no optimista.
-"""
+    @classmethod
+    def scoring_version(cls, model_name: str) -> str:
+        """
+        Versión de puntaje: modelo + huella de SYSTEM_PROMPT, instrucciones y esquema del plan.
+        Dos viability_score son comparables solo si tienen la misma versión.
+        """
+        fingerprint = hashlib.sha256("\0".join([
+            cls.SYSTEM_PROMPT, cls._BUSINESS_PLAN_INSTRUCTIONS,
+            json.dumps(cls.BUSINESS_PLAN_SCHEMA, sort_keys=True), model_name,
+        ]).encode("utf-8")).hexdigest()
+        return f"{model_name}:{fingerprint[:12]}"
+
+    def acquire_quota(self, model_name: str, rpm_share: float = 1.0) -> bool:
+        """Reservar un request de model_name usando a lo sumo rpm_share de su RPM en este proceso"""
+        limit = max(1, int(self.MODEL_RPM_LIMITS.get(model_name, 1) * rpm_share))
+        return _quota_tracker.acquire([model_name], {model_name: limit}) is not None
+
+    def score_business_plan(self, model_name: str, prompt: str) -> Dict:
+        """
+        Plan completo en un modelo fijo, sin fallback a otros modelos ni plan genérico: en una
+        re-evaluación todos los puntajes de una versión deben salir del mismo modelo.
+        El request ya debe estar reservado con acquire_quota.
+
+        Raises:
+            QuotaExceeded: 429 del modelo (queda en pausa; reintentar después)
+            ValueError: respuesta que no es un plan válido
+        """
         try:
-            text = self._generate_with_fallback(prompt)
-            
-            # Limpiar respuesta de posibles marcas de markdown
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            plan = json.loads(text.strip())
-            return plan
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}. Response: {text}")
-            return self._create_fallback_plan(raw_idea)
+            response = self._call_named_model(
+                self._build_model(model_name), model_name, prompt, self.SYSTEM_PROMPT,
+                self.BUSINESS_PLAN_SCHEMA, record_usage=False, timeout=self.CALL_TIMEOUT_SECONDS
+            )
+            text = response.text
         except Exception as e:
-            logger.error(f"Error generating business plan: {e}")
-            return self._create_fallback_plan(raw_idea)
-    
+            if "429" in str(e) or "quota" in str(e).lower():
+                _quota_tracker.mark_exhausted(model_name)
+                raise QuotaExceeded(str(e)) from e
+            raise
+        return self._validate_business_plan(self._extract_json_payload(text))
+
+    @staticmethod
+    def supports_batch(model_name: str) -> bool:
+        """Batch API de Gemini: solo con google.genai y modelos Gemini (no Gemma)"""
+        return _use_google_genai() and not model_name.startswith("gemma")
+
+    def submit_plan_batch(self, model_name: str, prompts: Dict[str, str], display_name: str) -> str:
+        """
+        Enviar un job de la Batch API con un plan por prompt (clave → prompt); retorna el nombre
+        del job. Los jobs no consumen el RPM de la app y cuestan menos que las llamadas en línea.
+        """
+        requests = [
+            {
+                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "metadata": {"key": key},
+                "config": {
+                    "system_instruction": self.SYSTEM_PROMPT,
+                    "response_mime_type": "application/json",
+                    "response_schema": self.BUSINESS_PLAN_SCHEMA,
+                },
+            }
+            for key, prompt in prompts.items()
+        ]
+        job = self._client.batches.create(model=model_name, src=requests, config={"display_name": display_name})
+        logger.info(f"[BATCH] Job {job.name} enviado a {model_name} ({len(requests)} planes)")
+        return job.name
+
+    def collect_plan_batch(self, job_name: str) -> Optional[Dict[str, object]]:
+        """
+        Resultados de un job: None mientras sigue en curso; al terminar, {clave: plan validado o
+        la excepción de ese plan}. Un job fallido, cancelado o expirado lanza una excepción.
+        """
+        job = self._client.batches.get(name=job_name)
+        state = job.state.name if job.state is not None else "JOB_STATE_UNSPECIFIED"
+        if state not in self.BATCH_DONE_STATES:
+            return None
+        if state not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+            raise Exception(f"Job {job_name} terminó en {state}: {job.error}")
+        results: Dict[str, object] = {}
+        for item in (job.dest.inlined_responses or []) if job.dest else []:
+            key = (item.metadata or {}).get("key")
+            if key is None:
+                continue
+            if item.error is not None or item.response is None:
+                results[key] = Exception(f"Sin respuesta del modelo: {item.error}")
+                continue
+            try:
+                results[key] = self._validate_business_plan(self._extract_json_payload(item.response.text))
+            except (json.JSONDecodeError, ValueError) as e:
+                results[key] = e
+        return results
+
+    def generate_business_plan_parallel(self, raw_idea: str, clarifications: str = None,
+                                        max_workers: int = None) -> Dict:
+        """
+        Motor alternativo: genera los 9 pilares como prompts cortos concurrentes
+        (cada uno en el modelo con holgura de cuota) y luego la síntesis final.
+        Mismo formato de salida que generate_business_plan; si fallan demasiados
+        pilares, recurre al prompt monolítico.
+        """
+        raw_idea = self.sanitize_input(raw_idea)
+        if clarifications:
+            clarifications = self.sanitize_input(clarifications)
+
+        context = f"IDEA ORIGINAL:\n{raw_idea}"
+        if clarifications:
+            context += f"\n\nCLARIFICACIONES DEL USUARIO:\n{clarifications}"
+
+        def run_pillar(index: int):
+            field = self.PILLAR_FIELDS[index]
+            prompt = f"{context}\n\nPILAR A ANALIZAR: {self.PILLARS[index]} ({field})\n\n{self._PILLAR_INSTRUCTIONS}"
+            text = self._generate_with_headroom(
+                prompt,
+                system_instruction=self._PILLAR_SYSTEM_PROMPT,
+                response_schema=self.PILLAR_SCHEMA
+            )
+            data = self._extract_json_payload(text)
+            if isinstance(data, str):
+                data = {"text": data}
+            if not isinstance(data, dict) or not str(data.get("text") or "").strip():
+                raise ValueError(f"Pilar {field} sin texto")
+            return str(data["text"]).strip(), self._coerce_score(data.get("score"), default=0)
+
+        started = time.monotonic()
+        results: Dict[str, Tuple[str, float]] = {}
+        workers = max_workers or len(self.PILLAR_FIELDS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pillar") as executor:
+            futures = {executor.submit(run_pillar, i): field for i, field in enumerate(self.PILLAR_FIELDS)}
+            for future in as_completed(futures):
+                field = futures[future]
+                try:
+                    results[field] = future.result()
+                except Exception as e:
+                    logger.error(f"Error generating pillar {field}: {e}")
+
+        if len(results) < self.MIN_PILLARS_FOR_REPAIR:
+            logger.warning(f"[PARALLEL] Solo {len(results)} pilares generados, usando prompt monolítico")
+            return self.generate_business_plan(raw_idea, clarifications)
+
+        pillar_scores = {field: score for field, (_, score) in results.items()}
+        viability_score = self.score_from_pillars(pillar_scores)
+        plan = {field: results[field][0] if field in results else "Por definir" for field in self.PILLAR_FIELDS}
+
+        # Síntesis al final, sobre los pilares ya generados
+        summary = "\n".join(
+            f"- {self.PILLARS[i]} ({pillar_scores.get(f, 'N/D')}/100): {plan[f][:400]}"
+            for i, f in enumerate(self.PILLAR_FIELDS)
+        )
+        synthesis = {}
+        try:
+            text = self._generate_with_headroom(
+                f"{context}\n\nANÁLISIS POR PILAR:\n{summary}\n\nVIABILIDAD PROMEDIO: {viability_score}/100\n\n"
+                f"{self._SYNTHESIS_INSTRUCTIONS}",
+                system_instruction=self._PILLAR_SYSTEM_PROMPT,
+                response_schema=self.SYNTHESIS_SCHEMA
+            )
+            synthesis = self._extract_json_payload(text)
+        except Exception as e:
+            logger.error(f"Error generating plan synthesis: {e}")
+
+        plan.update(
+            overall_assessment=synthesis.get("overall_assessment") if isinstance(synthesis, dict) else None,
+            recommendation=synthesis.get("recommendation") if isinstance(synthesis, dict) else None,
+            pivot_suggestions=synthesis.get("pivot_suggestions") if isinstance(synthesis, dict) else None,
+            viability_score=viability_score,
+            pillar_scores=pillar_scores,
+        )
+        logger.info(
+            f"[PARALLEL] Plan generado en {time.monotonic() - started:.1f}s "
+            f"({len(results)}/{len(self.PILLAR_FIELDS)} pilares)"
+        )
+        return self._validate_business_plan(plan)
+
+    def regenerate_pillars(
+        self,
+        raw_idea: str,
+        current_plan: Dict,
+        fields: List[str],
+        clarifications: str = None,
+        new_information: str = None,
+    ) -> Dict:
+        """
+        Recalcular solo los pilares indicados, conservando el resto del plan.
+        Incluye sanitización anti-Prompt Injection.
+
+        Args:
+            raw_idea: La idea original presentada
+            current_plan: Plan vigente (columnas de BusinessPlan + pillar_scores)
+            fields: Campos de pilar a regenerar (subconjunto de PILLAR_FIELDS)
+            clarifications: Historial de conversación (opcional)
+            new_information: Mensajes nuevos que motivan la actualización (opcional)
+
+        Returns:
+            Plan parcial: pilares actualizados, pillar_scores combinados, viability_score
+            y recommendation recalculados, overall_assessment y "updated_fields".
+            Si la generación falla, "updated_fields" viene vacío y el plan no cambia.
+        """
+        fields = [f for f in self.PILLAR_FIELDS if f in (fields or [])]
+        base_scores = dict(current_plan.get("pillar_scores") or {})
+        default_score = current_plan.get("viability_score") or 0
+        pillar_scores = {
+            f: self._coerce_score(base_scores.get(f), default=default_score) for f in self.PILLAR_FIELDS
+        }
+        result = {
+            "pillar_scores": pillar_scores,
+            "viability_score": current_plan.get("viability_score") or 0,
+            "recommendation": current_plan.get("recommendation") or "not_viable",
+            "overall_assessment": current_plan.get("overall_assessment") or "",
+            "updated_fields": [],
+        }
+        if not fields:
+            return result
+
+        raw_idea = self.sanitize_input(raw_idea)
+        context = f"IDEA ORIGINAL:\n{raw_idea}"
+        if clarifications:
+            context += f"\n\nCLARIFICACIONES DEL USUARIO:\n{self.sanitize_input(clarifications)}"
+        if new_information:
+            context += f"\n\nINFORMACIÓN NUEVA:\n{self.sanitize_input(new_information)}"
+
+        kept = "\n".join(
+            f"- {f}: {(current_plan.get(f) or '')[:300]}" for f in self.PILLAR_FIELDS if f not in fields
+        )
+        prompt = f"""{context}
+
+PILARES VIGENTES (no modificar):
+{kept or "- Ninguno"}
+
+PILARES A ACTUALIZAR: {", ".join(fields)}
+
+{self._PILLAR_UPDATE_INSTRUCTIONS}"""
+        schema = {
+            "type": "OBJECT",
+            "properties": {
+                "pillars": {
+                    "type": "OBJECT",
+                    "properties": {
+                        f: {
+                            "type": "OBJECT",
+                            "properties": {"text": {"type": "STRING"}, "score": {"type": "NUMBER"}},
+                            "required": ["text", "score"],
+                        }
+                        for f in fields
+                    },
+                    "required": fields,
+                },
+                "overall_assessment": {"type": "STRING"},
+            },
+            "required": ["pillars", "overall_assessment"],
+        }
+
+        text = ""
+        try:
+            text = self._generate_with_fallback(
+                prompt,
+                system_instruction=self.SYSTEM_PROMPT,
+                response_schema=schema
+            )
+            data = self._extract_json_payload(text)
+            pillars = data.get("pillars") if isinstance(data, dict) else None
+            if not isinstance(pillars, dict):
+                raise ValueError("Respuesta sin objeto 'pillars'")
+        except Exception as e:
+            logger.error(f"Error regenerating pillars {fields}: {e}. Response: {text}")
+            return result
+
+        for field in fields:
+            entry = pillars.get(field)
+            if isinstance(entry, str):
+                entry = {"text": entry}
+            if not isinstance(entry, dict) or not str(entry.get("text") or "").strip():
+                continue
+            result[field] = str(entry["text"]).strip()
+            pillar_scores[field] = self._coerce_score(entry.get("score"), default=pillar_scores[field])
+            result["updated_fields"].append(field)
+
+        if result["updated_fields"]:
+            result["viability_score"] = self.score_from_pillars(pillar_scores)
+            result["recommendation"] = self.recommendation_for_score(result["viability_score"])
+            assessment = str(data.get("overall_assessment") or "").strip()
+            if assessment:
+                result["overall_assessment"] = assessment
+        return result
+
     def _create_fallback_plan(self, raw_idea: str) -> Dict:
         """Plan de negocio por defecto en caso de error"""
         return {
@@ -523,55 +1746,19 @@ INSTRUCCIONES CRÍTICAS:
         # Sanitizar input del usuario
         raw_idea = self.sanitize_input(raw_idea)
         
-        prompt = f"""{self.SYSTEM_PROMPT}
-
-IDEA ORIGINAL: "{raw_idea}"
+        prompt = f"""IDEA ORIGINAL: "{raw_idea}"
 
 Esta idea fue calificada como NO VIABLE porque falló en estos pilares:
 {', '.join(failing_pillars)}
 
-Tu tarea: Proporciona 3 PIVOTES ESTRATÉGICOS alternativos que:
-1. Mantengan la esencia de la idea original
-2. Aborden los pilares fallidos
-3. Sean viables en el contexto actual
-
-Responde en JSON:
-{{
-  "analysis": "Análisis de por qué falla la idea original",
-  "pivots": [
-    {{
-      "title": "Pivote 1",
-      "description": "Descripción",
-      "key_changes": ["cambio1", "cambio2"],
-      "improved_score_estimate": <número>
-    }},
-    {{
-      "title": "Pivote 2",
-      "description": "Descripción",
-      "key_changes": ["cambio1", "cambio2"],
-      "improved_score_estimate": <número>
-    }},
-    {{
-      "title": "Pivote 3",
-      "description": "Descripción",
-      "key_changes": ["cambio1", "cambio2"],
-      "improved_score_estimate": <número>
-    }}
-  ]
-}}
-"""
+{self._PIVOT_INSTRUCTIONS}"""
         try:
-            text = self._generate_with_fallback(prompt)
-            
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            pivot_data = json.loads(text.strip())
-            return pivot_data
+            text = self._generate_with_fallback(
+                prompt,
+                system_instruction=self.SYSTEM_PROMPT,
+                response_schema=self.PIVOT_SCHEMA
+            )
+            return self._validate_pivot_session(self._extract_json_payload(text))
         except Exception as e:
             logger.error(f"Error generating pivot session: {e}")
             return {
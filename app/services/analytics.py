@@ -0,0 +1,326 @@
+"""
+Analítica de administración (roles admin y seller) sobre rollups diarios
+Las métricas se leen de analytics_daily (una fila por día, métrica y bucket), no de las
+tablas de proyectos, planes y sesiones. El refresco es incremental: solo recalcula los días
+con filas modificadas (updated_at) desde el refresco anterior, leyendo esas filas en lotes y
+contándolas con NumPy (np.digitize + np.add.at) por día y bucket.
+
+    flask analytics refresh          # incremental (cron cada pocos minutos)
+    flask analytics refresh --full   # recalcula todo (cron diario: también refleja borrados)
+
+Métricas:
+    project_status       proyectos por día de creación y estado actual (embudo)
+    plan_recommendation  planes por día de generación y recomendación
+    viability_score      histograma de viability_score (buckets de 10 puntos)
+    session_messages     sesiones por día de creación y mensajes de usuario (message_count)
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import time
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, not_, select
+
+from app.models import db, Project, BusinessPlan, ChatSession, AnalyticsDaily, AnalyticsRefresh
+from app.services import db_routing, single_flight
+
+logger = logging.getLogger(__name__)
+
+# Orden del embudo: cada etapa cuenta los proyectos que la alcanzaron o la superaron
+PROJECT_STATUSES = ("ambiguous", "ready", "in_analysis", "completed")
+RECOMMENDATIONS = ("viable", "needs_pivot", "not_viable")
+VIABILITY_EDGES = np.arange(0, 101, 10)
+# Filas con updated_at anterior al inicio del refresco previo pero confirmadas después
+REFRESH_OVERLAP = timedelta(minutes=1)
+# Filas por lectura del cursor durante el refresco
+SCAN_BATCH_ROWS = 5000
+LOCK_TIMEOUT_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class _Metric:
+    name: str
+    column: Any
+    labels: Tuple[str, ...]
+    encode: Callable[[np.ndarray], np.ndarray]  # valores → índice de bucket (-1 = no se cuenta)
+
+
+@dataclass(frozen=True)
+class _Source:
+    """Tabla de origen: día del rollup, columna de cambios y métricas que alimenta"""
+    model: Any
+    day_column: Any
+    changed_column: Any
+    metrics: Tuple[_Metric, ...]
+
+
+def _categorical(labels: Sequence[str], missing: str) -> Tuple[Tuple[str, ...], Callable]:
+    """Buckets por valor; NULL o valores desconocidos van al bucket `missing`"""
+    labels = tuple(labels) + (missing,)
+    lookup = {label: i for i, label in enumerate(labels)}
+
+    def encode(values: np.ndarray) -> np.ndarray:
+        return np.fromiter((lookup.get(v, len(labels) - 1) for v in values), dtype=np.int64, count=len(values))
+    return labels, encode
+
+
+def _encode_viability(values: np.ndarray) -> np.ndarray:
+    scores = values.astype(np.float64)  # None → nan
+    codes = np.clip(np.digitize(scores, VIABILITY_EDGES[1:-1]), 0, len(VIABILITY_EDGES) - 2)
+    codes[np.isnan(scores)] = -1
+    return codes
+
+
+def _sources() -> Tuple[_Source, ...]:
+    max_messages = current_app.config["MAX_CHAT_MESSAGES"]
+    status_labels, encode_status = _categorical(PROJECT_STATUSES, "unknown")
+    recommendation_labels, encode_recommendation = _categorical(RECOMMENDATIONS, "none")
+    return (
+        _Source(Project, Project.created_at, Project.updated_at, (
+            _Metric("project_status", Project.status, status_labels, encode_status),
+        )),
+        _Source(BusinessPlan, BusinessPlan.generated_at, BusinessPlan.updated_at, (
+            _Metric("plan_recommendation", BusinessPlan.recommendation, recommendation_labels, encode_recommendation),
+            _Metric("viability_score", BusinessPlan.viability_score,
+                    tuple(str(edge) for edge in VIABILITY_EDGES[:-1]), _encode_viability),
+        )),
+        _Source(ChatSession, ChatSession.created_at, ChatSession.updated_at, (
+            _Metric("session_messages", ChatSession.message_count,
+                    tuple(str(n) for n in range(max_messages + 1)),
+                    lambda values: np.clip(np.nan_to_num(values.astype(np.float64)), 0, max_messages).astype(np.int64)),
+        )),
+    )
+
+
+def _as_date(value: Any) -> date:
+    # func.date() retorna date en Postgres y texto en SQLite
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _day_runs(days: List[date]) -> List[Tuple[date, date]]:
+    """Días agrupados en rangos contiguos [inicio, fin] (un escaneo por rango)"""
+    runs: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def _affected_runs(source: _Source, since: Optional[datetime]) -> List[Tuple[date, date]]:
+    with db.engine.connect() as conn:
+        if since is None:
+            first, last = conn.execute(select(func.min(source.day_column), func.max(source.day_column))).one()
+            return [] if first is None else [(first.date(), last.date())]
+        days = conn.execute(
+            select(func.date(source.day_column)).distinct()
+            .where(source.changed_column >= since, source.day_column.isnot(None))
+        ).scalars()
+        return _day_runs([_as_date(day) for day in days])
+
+
+def _rebuild_run(source: _Source, first: date, last: date) -> int:
+    """Recalcular las métricas de source para los días [first, last]; retorna filas leídas"""
+    n_days = (last - first).days + 1
+    counts = {metric.name: np.zeros((n_days, len(metric.labels)), dtype=np.int64) for metric in source.metrics}
+    start = datetime.combine(first, datetime.min.time())
+    end = datetime.combine(last + timedelta(days=1), datetime.min.time())
+    query = (select(source.day_column, *(metric.column for metric in source.metrics))
+             .where(source.day_column >= start, source.day_column < end))
+    origin = np.datetime64(first, "D")
+    scanned = 0
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=SCAN_BATCH_ROWS).execute(query)
+        for chunk in result.partitions():
+            columns = list(zip(*chunk))
+            day_index = (np.array(columns[0], dtype="datetime64[D]") - origin).astype(np.int64)
+            for i, metric in enumerate(source.metrics):
+                codes = metric.encode(np.array(columns[i + 1], dtype=object))
+                counted = codes >= 0
+                np.add.at(counts[metric.name], (day_index[counted], codes[counted]), 1)
+            scanned += len(chunk)
+
+    rows = []
+    for metric in source.metrics:
+        for day_offset, bucket in zip(*np.nonzero(counts[metric.name])):
+            rows.append({
+                "day": first + timedelta(days=int(day_offset)),
+                "metric": metric.name,
+                "bucket": metric.labels[bucket],
+                "value": int(counts[metric.name][day_offset, bucket]),
+            })
+    table = AnalyticsDaily.__table__
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(
+            table.c.metric.in_([metric.name for metric in source.metrics]),
+            table.c.day >= first, table.c.day <= last,
+        ))
+        if rows:
+            conn.execute(insert(table), rows)
+    return scanned
+
+
+def _prune_outside(source: _Source, runs: List[Tuple[date, date]]) -> None:
+    """Refresco completo: borrar rollups de días que ya no tienen filas de origen"""
+    table = AnalyticsDaily.__table__
+    statement = delete(table).where(table.c.metric.in_([metric.name for metric in source.metrics]))
+    if runs:
+        (first, last), = runs
+        statement = statement.where(not_(table.c.day.between(first, last)))
+    with db.engine.begin() as conn:
+        conn.execute(statement)
+
+
+def last_refresh() -> Optional[AnalyticsRefresh]:
+    return db.session.query(AnalyticsRefresh).order_by(AnalyticsRefresh.started_at.desc()).first()
+
+
+def _refresh(full: bool) -> AnalyticsRefresh:
+    started_at = datetime.utcnow()
+    started = time.monotonic()
+    previous = None if full else last_refresh()
+    since = previous.started_at - REFRESH_OVERLAP if previous else None
+    days_refreshed = scanned = 0
+    for source in _sources():
+        runs = _affected_runs(source, since)
+        for first, last in runs:
+            scanned += _rebuild_run(source, first, last)
+            days_refreshed += (last - first).days + 1
+        if since is None:
+            _prune_outside(source, runs)
+
+    record = AnalyticsRefresh(started_at=started_at, is_full=since is None, days_refreshed=days_refreshed,
+                              rows_scanned=scanned, duration_ms=int((time.monotonic() - started) * 1000))
+    db.session.add(record)
+    db.session.commit()
+    logger.info(f"[ANALYTICS] Refresco {'completo' if record.is_full else 'incremental'}: "
+                f"{days_refreshed} días, {scanned} filas leídas en {record.duration_ms}ms")
+    return record
+
+
+def refresh(full: bool = False) -> AnalyticsRefresh:
+    """
+    Refrescar analytics_daily. Sin refresco previo (o con full) recalcula todo.
+
+    Raises:
+        TimeoutError: si otro refresco no termina dentro de LOCK_TIMEOUT_SECONDS
+    """
+    with single_flight.advisory_lock("analytics", "refresh", LOCK_TIMEOUT_SECONDS):
+        return _refresh(full)
+
+
+def ensure_fresh() -> None:
+    """Refresco incremental si el último tiene más de ANALYTICS_REFRESH_SECONDS (un solo worker lo ejecuta)"""
+    max_age = timedelta(seconds=current_app.config["ANALYTICS_REFRESH_SECONDS"])
+
+    def refresh_if_stale() -> None:
+        # Otro worker pudo refrescar mientras se esperaba el lock
+        previous = last_refresh()
+        if previous is None or datetime.utcnow() - previous.started_at > max_age:
+            _refresh(full=False)
+
+    previous = last_refresh()
+    if previous is None or datetime.utcnow() - previous.started_at > max_age:
+        single_flight.do("analytics", "refresh", "incremental", refresh_if_stale, timeout=LOCK_TIMEOUT_SECONDS)
+
+
+# ==================== LECTURA ====================
+
+def _histogram_stats(labels: Sequence[str], counts: np.ndarray, width: float) -> Dict[str, Optional[float]]:
+    """Media y mediana aproximadas desde el histograma (punto medio de cada bucket)"""
+    total = counts.sum()
+    if not total:
+        return {"mean": None, "median": None}
+    midpoints = np.array([float(label) for label in labels]) + width / 2
+    median_bucket = int(np.searchsorted(np.cumsum(counts), total / 2))
+    return {"mean": round(float((counts * midpoints).sum() / total), 1),
+            "median": round(float(midpoints[median_bucket]), 1)}
+
+
+def summary(days: int) -> Dict[str, Any]:
+    """Métricas de los últimos `days` días (por día de creación/generación) desde los rollups"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    session = db_routing.reader()
+    totals: Dict[str, Dict[str, int]] = {}
+    for metric, bucket, value in session.query(
+        AnalyticsDaily.metric, AnalyticsDaily.bucket, func.sum(AnalyticsDaily.value)
+    ).filter(AnalyticsDaily.day >= since).group_by(AnalyticsDaily.metric, AnalyticsDaily.bucket):
+        totals.setdefault(metric, {})[bucket] = int(value)
+    daily = session.query(AnalyticsDaily.day, func.sum(AnalyticsDaily.value)).filter(
+        AnalyticsDaily.metric == "project_status", AnalyticsDaily.day >= since
+    ).group_by(AnalyticsDaily.day).order_by(AnalyticsDaily.day).all()
+
+    metrics = {metric.name: metric for source in _sources() for metric in source.metrics}
+
+    def vector(name: str) -> np.ndarray:
+        values = totals.get(name, {})
+        return np.array([values.get(label, 0) for label in metrics[name].labels], dtype=np.int64)
+
+    status = vector("project_status")[:len(PROJECT_STATUSES)]
+    reached = np.cumsum(status[::-1])[::-1]  # proyectos en la etapa o más adelante
+    projects_total = int(reached[0]) if len(reached) else 0
+    funnel = [
+        {"stage": stage, "count": int(count), "reached": int(reached[i]),
+         "conversion": round(float(reached[i]) / projects_total, 3) if projects_total else None}
+        for i, (stage, count) in enumerate(zip(PROJECT_STATUSES, status))
+    ]
+
+    recommendation = vector("plan_recommendation")
+    plans_total = int(recommendation.sum())
+    viability = vector("viability_score")
+    messages = vector("session_messages")
+    refreshed = last_refresh()
+    return {
+        "days": days,
+        "since": since.isoformat(),
+        "refreshed_at": refreshed.started_at.isoformat() if refreshed else None,
+        "projects": projects_total,
+        "projects_per_day": [{"day": _as_date(day).isoformat(), "count": int(count)} for day, count in daily],
+        "funnel": funnel,
+        "recommendations": [
+            {"recommendation": label, "count": int(count),
+             "share": round(float(count) / plans_total, 3) if plans_total else None}
+            for label, count in zip(metrics["plan_recommendation"].labels, recommendation)
+        ],
+        "viability_histogram": {
+            "buckets": [{"from": int(label), "count": int(count)}
+                        for label, count in zip(metrics["viability_score"].labels, viability)],
+            **_histogram_stats(metrics["viability_score"].labels, viability, 10),
+        },
+        "messages_per_session": {
+            "buckets": [{"messages": int(label), "count": int(count)}
+                        for label, count in zip(metrics["session_messages"].labels, messages)],
+            "sessions": int(messages.sum()),
+            **_histogram_stats(metrics["session_messages"].labels, messages, 0),
+        },
+    }
+
+
+# ==================== CLI ====================
+
+analytics_cli = AppGroup("analytics", help="Rollups de analítica de administración")
+
+
+@analytics_cli.command("refresh")
+@click.option("--full", is_flag=True, help="Recalcular todos los días (refleja también filas borradas)")
+def refresh_command(full: bool) -> None:
+    """Refrescar analytics_daily"""
+    try:
+        record = refresh(full=full)
+    except TimeoutError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{record.days_refreshed} días, {record.rows_scanned} filas leídas en {record.duration_ms}ms")
+
+
+@analytics_cli.command("summary")
+@click.option("--days", type=int, default=30)
+def summary_command(days: int) -> None:
+    """Imprimir las métricas de los últimos N días (JSON)"""
+    click.echo(json.dumps(summary(days), indent=2, ensure_ascii=False))
@@ -0,0 +1,153 @@
+"""
+Enrutamiento de lecturas a una réplica (DATABASE_REPLICA_URL)
+Las vistas de solo lectura consultan con reader(); las escrituras siguen en db.session.
+Se usa la primaria cuando no hay réplica configurada, cuando el request ya escribió,
+durante DB_STICKY_PRIMARY_SECONDS tras una escritura del mismo usuario (read-after-write
+entre redirect y GET) y cuando el lag de la réplica supera DB_REPLICA_MAX_LAG_SECONDS.
+"""
+from typing import Optional, Union
+import logging
+import threading
+import time
+
+from flask import Flask, current_app, g, has_request_context
+from flask import session as http_session
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, scoped_session
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+STICKY_SESSION_KEY = "_primary_until"
+# Cada cuánto se mide el lag de la réplica (por proceso)
+LAG_CHECK_INTERVAL_SECONDS = 5.0
+
+# En una réplica Postgres: 0 si ya reprodujo todo el WAL recibido (evita falsos positivos
+# con la primaria ociosa); si no, antigüedad de la última transacción reproducida
+_PG_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class _ReplicaLag:
+    """Lag de la réplica medido como máximo cada LAG_CHECK_INTERVAL_SECONDS (None = réplica inaccesible)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._lag: Optional[float] = None
+
+    def get(self) -> Optional[float]:
+        with self._lock:
+            if time.monotonic() - self._checked_at < LAG_CHECK_INTERVAL_SECONDS:
+                return self._lag
+            self._checked_at = time.monotonic()
+        lag = self._measure()
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    @staticmethod
+    def _measure() -> Optional[float]:
+        engine = db.engines[REPLICA_BIND]
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name != "postgresql":
+                    # SQLite u otros (pruebas locales con dos archivos): sin replicación que medir
+                    conn.execute(text("SELECT 1"))
+                    return 0.0
+                return float(conn.execute(_PG_LAG_SQL).scalar() or 0.0)
+        except Exception as e:
+            logger.warning(f"[DB] Réplica inaccesible, lecturas a la primaria: {e}")
+            return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checked_at = 0.0
+            self._lag = None
+
+
+replica_lag = _ReplicaLag()
+
+
+def replica_enabled() -> bool:
+    return REPLICA_BIND in current_app.config.get("SQLALCHEMY_BINDS", {})
+
+
+def mark_write() -> None:
+    """El request escribió: el resto del request y los siguientes del usuario leen de la primaria"""
+    if not has_request_context():
+        return
+    g._db_wrote = True
+    if replica_enabled():
+        http_session[STICKY_SESSION_KEY] = time.time() + current_app.config["DB_STICKY_PRIMARY_SECONDS"]
+
+
+def _use_primary() -> bool:
+    if not replica_enabled() or not has_request_context():
+        return True
+    if g.get("_db_wrote"):
+        return True
+    if http_session.get(STICKY_SESSION_KEY, 0) > time.time():
+        return True
+    lag = replica_lag.get()
+    if lag is None or lag > current_app.config["DB_REPLICA_MAX_LAG_SECONDS"]:
+        if lag is not None:
+            logger.info(f"[DB] Lag de réplica {lag:.1f}s sobre el máximo: lecturas a la primaria")
+        return True
+    return False
+
+
+def reader() -> Union[Session, scoped_session]:
+    """
+    Sesión para consultas de solo lectura del request. Los objetos cargados desde la
+    réplica no deben modificarse (la sesión rechaza flush); para escribir, volver a
+    cargar con db.session.
+    """
+    if _use_primary():
+        return db.session
+    if "_replica_session" not in g:
+        g._replica_session = Session(bind=db.engines[REPLICA_BIND], autoflush=False,
+                                     info={"replica": True})
+    return g._replica_session
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_replica_writes(session, flush_context, instances) -> None:
+    if session.info.get("replica"):
+        raise RuntimeError("La sesión de réplica es de solo lectura")
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    if not session.info.get("replica"):
+        mark_write()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state) -> None:
+    """UPDATE/DELETE/INSERT ejecutados sin pasar por flush (p.ej. db.session.execute(update(...)))"""
+    if not orm_execute_state.is_select and not orm_execute_state.session.info.get("replica"):
+        mark_write()
+
+
+def init_app(app: Flask) -> None:
+    """Registrar la réplica como bind (antes de db.init_app) y el cierre de su sesión"""
+    replica_url = app.config.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[REPLICA_BIND] = replica_url
+        app.config["SQLALCHEMY_BINDS"] = binds
+        app.logger.info("[DB] Réplica de lectura configurada (DATABASE_REPLICA_URL)")
+
+    @app.teardown_appcontext
+    def close_replica_session(exc) -> None:
+        session = g.pop("_replica_session", None)
+        if session is not None:
+            session.close()
@@ -0,0 +1,47 @@
+"""
+Embeddings livianos calculados localmente (sin LLM ni modelos externos)
+Usados por el índice de ideas duplicadas y el ranking del banco de preguntas
+"""
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes y sin puntuación (para comparar pitches)"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9ñ]+", " ", text).strip()
+
+
+def _stable_hash(token: str) -> int:
+    """Hash estable entre procesos (hash() de Python está aleatorizado por proceso)"""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def embed_text(text: str, dim: int = 512) -> np.ndarray:
+    """
+    Embedding liviano: n-gramas de caracteres (3-5) y de palabras (1-2)
+    proyectados con hashing firmado a `dim` dimensiones, tf sublineal y norma L2.
+    """
+    normalized = normalize_text(text)
+    vector = np.zeros(dim, dtype=np.float32)
+    if not normalized:
+        return vector
+
+    words = normalized.split()
+    tokens = list(words)
+    tokens += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+    padded = f" {normalized} "
+    for n in (3, 4, 5):
+        tokens += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+    for token in tokens:
+        h = _stable_hash(token)
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
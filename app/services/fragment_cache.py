@@ -0,0 +1,121 @@
+"""
+Cache de fragmentos HTML renderizados (LRU acotado por bytes)
+Los bloques de un plan o de una tarjeta de proyecto solo se re-renderizan cuando cambia su versión
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+import hashlib
+import logging
+import os
+import threading
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from app.assets import manifest_version
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    """
+    LRU en memoria (por proceso) de fragmentos renderizados.
+    Cada entrada se indexa por (template, id del objeto) y guarda la versión con la que
+    se renderizó (p.ej. updated_at): una versión nueva reemplaza a la anterior, de modo
+    que un objeto nunca ocupa más de una entrada.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, str]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template: str, object_id: Hashable, version: Any) -> Optional[str]:
+        key = (template, object_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, template: str, object_id: Hashable, version: Any, html: str) -> None:
+        key = (template, object_id)
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1].encode("utf-8"))
+            self._entries[key] = (version, html)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.encode("utf-8"))
+
+    def invalidate(self, template: str, object_id: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop((template, object_id), None)
+            if entry is not None:
+                self._bytes -= len(entry[1].encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+fragment_cache = FragmentCache()
+
+
+def cached_fragment(template: str, object_id: Hashable, version: Any, **context) -> Markup:
+    """
+    Global de Jinja: renderizar `template` con `context` o reutilizar el HTML cacheado
+    para (template, object_id) si la versión no cambió.
+    """
+    if not current_app.config.get("FRAGMENT_CACHE_ENABLED", True):
+        return Markup(render_template(template, **context))
+    html = fragment_cache.get(template, object_id, version)
+    if html is None:
+        html = render_template(template, **context)
+        fragment_cache.set(template, object_id, version, html)
+    return Markup(html)
+
+
+_template_version: Optional[str] = None
+
+
+def template_version() -> str:
+    """Huella de las plantillas desplegadas (mtime y tamaño), para que un deploy invalide los ETag"""
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.blake2b(digest_size=8)
+        root = os.path.join(current_app.root_path, "templates")
+        for directory, _, files in sorted(os.walk(root)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(directory, name))
+                digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+        _template_version = digest.hexdigest()
+    return _template_version
+
+
+def page_etag(*parts: Any) -> str:
+    """
+    ETag de una página a partir de las versiones de sus datos.
+    Incluye las plantillas y el manifest de assets: un rebuild solo de CSS/JS cambia los nombres
+    con hash (y borra los anteriores), así que el HTML revalidado no puede responder 304.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(template_version().encode("utf-8"))
+    digest.update(manifest_version().encode("utf-8"))
+    for part in parts:
+        value = part.isoformat() if isinstance(part, datetime) else str(part)
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
@@ -0,0 +1,519 @@
+"""
+Purga GDPR/LPD de cuentas con eliminación programada (User.scheduled_deletion vencido)
+En lugar de User.hard_delete() (el cascade del ORM carga en memoria cada proyecto, sesión,
+mensaje y auditoría antes de borrarlos) se borra con DELETE por conjuntos, de hijos a padres,
+en lotes acotados y transacciones cortas:
+
+    chat_messages → chat_sessions → business_plans → plan_evaluations → projects → audit_logs → users
+
+Reanudable: el orden hijos→padres deja siempre un estado consistente, y la fila de users
+(con scheduled_deletion) es lo último que se borra, así que una ejecución interrumpida
+(error, Ctrl-C, --max-seconds) se retoma en la siguiente sin estado adicional.
+
+    flask gdpr sweep                      # cron diario
+    flask gdpr sweep --dry-run            # cuentas vencidas y filas afectadas
+    flask gdpr sweep --max-seconds 600 --pause 0.2
+
+Exportación (derecho de acceso): perfil, proyectos, planes, sesiones, mensajes y auditoría
+como NDJSON o zip, generados fila a fila desde cursores del servidor (memoria constante).
+Se sirven como respuesta en streaming, como job en segundo plano con archivo descargable o
+desde la CLI:
+
+    flask gdpr export <user_id> --format zip -o export.zip
+    flask gdpr purge-exports              # cron horario: borra zips con más de GDPR_EXPORT_TTL_HOURS
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import io
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import zipfile
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.exc import OperationalError
+
+from app.models import db, User, Project, BusinessPlan, PlanEvaluation, ChatSession, ChatMessage, AuditLog
+from app.services import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Reintentos de un lote que no obtuvo sus locks dentro de lock_timeout (filas en uso)
+MAX_LOCK_RETRIES = 5
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+@dataclass
+class SweepStats:
+    """Progreso de una pasada del sweeper"""
+    users: int = 0
+    rows: Dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+    lock_retries: int = 0
+    elapsed_seconds: float = 0.0
+    remaining_users: int = 0
+    stopped_early: bool = False
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+    def summary(self) -> str:
+        rate = self.total_rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+        tables = ", ".join(f"{table}={count}" for table, count in self.rows.items())
+        return (f"{self.users} usuarios, {self.total_rows} filas ({tables}) en {self.batches} lotes, "
+                f"{self.elapsed_seconds:.1f}s ({rate:.0f} filas/s), reintentos por lock={self.lock_retries}, "
+                f"vencidos pendientes={self.remaining_users}")
+
+
+def _due_filter(cutoff: datetime):
+    return User.scheduled_deletion.isnot(None) & (User.scheduled_deletion <= cutoff)
+
+
+def due_user_ids(cutoff: datetime, limit: int) -> List[str]:
+    """Cuentas vencidas, más antiguas primero (recorre idx_users_scheduled_deletion)"""
+    query = (select(User.id).where(_due_filter(cutoff))
+             .order_by(User.scheduled_deletion, User.id).limit(limit))
+    with db.engine.connect() as conn:
+        return list(conn.execute(query).scalars())
+
+
+def count_due_users(cutoff: datetime) -> int:
+    with db.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(User).where(_due_filter(cutoff))).scalar()
+
+
+def _owned_rows(user_ids: List[str], cutoff: datetime) -> List[Tuple[type, object]]:
+    """
+    (modelo, condición) por tabla en orden de borrado. Las condiciones vuelven a exigir que
+    la cuenta siga vencida: si se cancela la eliminación a mitad de la purga, se detiene.
+    """
+    due = select(User.id).where(User.id.in_(user_ids), _due_filter(cutoff)).correlate(None)
+    projects = select(Project.id).where(Project.user_id.in_(due)).correlate(None)
+    sessions = select(ChatSession.id).where(ChatSession.project_id.in_(projects)).correlate(None)
+    return [
+        (ChatMessage, ChatMessage.session_id.in_(sessions)),
+        (ChatSession, ChatSession.project_id.in_(projects)),
+        (BusinessPlan, BusinessPlan.project_id.in_(projects)),
+        (PlanEvaluation, PlanEvaluation.project_id.in_(projects)),
+        (Project, Project.user_id.in_(due)),
+        (AuditLog, AuditLog.user_id.in_(due)),
+        (User, User.id.in_(due)),
+    ]
+
+
+def _delete_batch(model, condition, batch_size: int, lock_timeout_ms: int) -> int:
+    """Un lote en su propia transacción; en Postgres no espera locks más de lock_timeout_ms"""
+    table = model.__table__
+    batch = select(model.id).where(condition).limit(batch_size).correlate(None)
+    statement = delete(table).where(table.c.id.in_(batch))
+    with db.engine.begin() as conn:
+        if conn.dialect.name == "postgresql" and lock_timeout_ms:
+            conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        return conn.execute(statement).rowcount
+
+
+def _is_lock_timeout(error: OperationalError) -> bool:
+    return getattr(error.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+def purge_users(user_ids: List[str], cutoff: datetime, stats: SweepStats, batch_size: int,
+                pause_seconds: float, lock_timeout_ms: int, deadline: Optional[float] = None) -> bool:
+    """
+    Borrar los datos de user_ids tabla por tabla en lotes de batch_size filas.
+    Retorna False si se alcanzó deadline antes de terminar (se retoma en la próxima pasada).
+    """
+    with db.engine.connect() as conn:
+        project_ids = list(conn.execute(select(Project.id).where(Project.user_id.in_(user_ids))).scalars())
+
+    for model, condition in _owned_rows(user_ids, cutoff):
+        table = model.__tablename__
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            retries = 0
+            while True:
+                try:
+                    deleted = _delete_batch(model, condition, batch_size, lock_timeout_ms)
+                    break
+                except OperationalError as e:
+                    if not _is_lock_timeout(e) or retries >= MAX_LOCK_RETRIES:
+                        raise
+                    retries += 1
+                    stats.lock_retries += 1
+                    backoff = pause_seconds * 2 ** retries + 0.1 * retries
+                    logger.warning(f"[GDPR] Lote de {table} bloqueado, reintento {retries} en {backoff:.1f}s")
+                    time.sleep(backoff)
+            stats.batches += 1
+            stats.rows[table] = stats.rows.get(table, 0) + deleted
+            if deleted:
+                logger.debug(f"[GDPR] {table}: {deleted} filas")
+            if pause_seconds:
+                time.sleep(pause_seconds)
+            if deleted < batch_size:
+                break
+
+    # Caches por proceso (los demás workers las expiran por TTL o al reconstruir el índice)
+    # y la tabla FTS5 de búsqueda en SQLite
+    from app.services import idea_index, search
+    from app.services.user_cache import user_cache
+    idea_index.remove_projects(project_ids)
+    search.remove_projects(project_ids)
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+        # Zips de exportación pendientes de descarga: también son datos de la cuenta borrada
+        remove_user_exports(user_id)
+    return True
+
+
+def sweep(cutoff: Optional[datetime] = None, batch_size: Optional[int] = None,
+          user_batch: Optional[int] = None, pause_seconds: Optional[float] = None,
+          max_seconds: Optional[float] = None) -> SweepStats:
+    """
+    Purgar todas las cuentas con scheduled_deletion <= cutoff (por defecto ahora), de a
+    user_batch cuentas. Una sola pasada a la vez entre procesos (advisory lock).
+
+    Raises:
+        TimeoutError: si otra pasada está en curso
+    """
+    config = current_app.config
+    cutoff = cutoff or datetime.utcnow()
+    batch_size = batch_size or config["GDPR_SWEEP_BATCH_SIZE"]
+    user_batch = user_batch or config["GDPR_SWEEP_USER_BATCH"]
+    pause_seconds = config["GDPR_SWEEP_PAUSE_SECONDS"] if pause_seconds is None else pause_seconds
+    lock_timeout_ms = config["GDPR_SWEEP_LOCK_TIMEOUT_MS"]
+
+    stats = SweepStats()
+    started = time.monotonic()
+    deadline = started + max_seconds if max_seconds else None
+    with single_flight.advisory_lock("gdpr", "sweep", timeout=0):
+        while True:
+            user_ids = due_user_ids(cutoff, user_batch)
+            if not user_ids:
+                break
+            finished = purge_users(user_ids, cutoff, stats, batch_size, pause_seconds, lock_timeout_ms, deadline)
+            if not finished:
+                stats.stopped_early = True
+                break
+            stats.users += len(user_ids)
+            stats.elapsed_seconds = time.monotonic() - started
+            logger.info(f"[GDPR] Progreso: {stats.summary()}")
+
+    stats.elapsed_seconds = time.monotonic() - started
+    stats.remaining_users = count_due_users(cutoff)
+    # El TTL de las exportaciones no depende de que alguien inicie otra
+    expired = purge_expired_exports()
+    if expired:
+        logger.info(f"[GDPR] {expired} exportaciones vencidas borradas")
+    logger.info(f"[GDPR] Purga {'interrumpida por --max-seconds' if stats.stopped_early else 'completa'}: "
+                f"{stats.summary()}")
+    return stats
+
+
+def pending_rows(cutoff: datetime, limit: int = 1000) -> Dict[str, int]:
+    """Filas que borraría la purga de las primeras `limit` cuentas vencidas (dry-run)"""
+    user_ids = due_user_ids(cutoff, limit)
+    if not user_ids:
+        return {}
+    with db.engine.connect() as conn:
+        return {
+            model.__tablename__: conn.execute(select(func.count()).select_from(model).where(condition)).scalar()
+            for model, condition in _owned_rows(user_ids, cutoff)
+        }
+
+
+# ==================== EXPORTACIÓN ====================
+
+EXPORT_FORMAT_VERSION = 1
+# Columnas que no se exportan (credenciales e índices derivados, no datos personales del titular)
+EXPORT_EXCLUDED_COLUMNS = {"password_hash", "reset_token", "reset_token_expiry", "search_vector"}
+# Bytes acumulados del zip antes de entregar un chunk a la respuesta
+ZIP_CHUNK_BYTES = 64 * 1024
+
+
+def _export_queries(user_id: str) -> List[Tuple[str, Any]]:
+    """(sección, SELECT) en orden de exportación; cada uno recorre un índice por usuario/proyecto"""
+    def columns(model):
+        return [c for c in model.__table__.c if c.name not in EXPORT_EXCLUDED_COLUMNS]
+
+    projects = select(Project.id).where(Project.user_id == user_id)
+    sessions = select(ChatSession.id).where(ChatSession.project_id.in_(projects))
+    return [
+        ("user", select(*columns(User)).where(User.id == user_id)),
+        ("projects", select(*columns(Project)).where(Project.user_id == user_id)
+            .order_by(Project.created_at, Project.id)),
+        ("business_plans", select(*columns(BusinessPlan)).where(BusinessPlan.project_id.in_(projects))),
+        ("plan_evaluations", select(*columns(PlanEvaluation)).where(PlanEvaluation.project_id.in_(projects))
+            .order_by(PlanEvaluation.project_id, PlanEvaluation.created_at)),
+        ("chat_sessions", select(*columns(ChatSession)).where(ChatSession.project_id.in_(projects))
+            .order_by(ChatSession.project_id, ChatSession.created_at)),
+        ("chat_messages", select(*columns(ChatMessage)).where(ChatMessage.session_id.in_(sessions))
+            .order_by(ChatMessage.session_id, ChatMessage.created_at, ChatMessage.id)),
+        ("audit_logs", select(*columns(AuditLog)).where(AuditLog.user_id == user_id)
+            .order_by(AuditLog.created_at, AuditLog.id)),
+    ]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_sections(user_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    (sección, fila) de todos los datos del usuario. Cada consulta usa un cursor del servidor
+    (stream_results) y se lee de a GDPR_EXPORT_BATCH_ROWS filas: nunca se materializa el
+    historial completo. La conexión se mantiene mientras dure la exportación.
+    """
+    batch_rows = current_app.config["GDPR_EXPORT_BATCH_ROWS"]
+    with db.engine.connect() as conn:
+        streaming = conn.execution_options(stream_results=True, yield_per=batch_rows)
+        for section, query in _export_queries(user_id):
+            for row in streaming.execute(query).mappings():
+                yield section, dict(row)
+
+
+def iter_ndjson(user_id: str) -> Iterator[bytes]:
+    """Una línea JSON por fila: {"type": sección, "data": {...}}, precedidas de una cabecera"""
+    header = {"type": "export", "data": {"user_id": user_id, "format_version": EXPORT_FORMAT_VERSION,
+                                         "generated_at": datetime.utcnow()}}
+    yield (json.dumps(header, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8")
+    for section, row in export_sections(user_id):
+        line = json.dumps({"type": section, "data": row}, default=_json_default, ensure_ascii=False)
+        yield (line + "\n").encode("utf-8")
+
+
+class _ZipSink(io.RawIOBase):
+    """Destino no posicionable de zipfile: acumula lo escrito hasta que el generador lo entrega"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.pending = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+def iter_zip(user_id: str) -> Iterator[bytes]:
+    """Zip en streaming con un <sección>.ndjson por tabla (entradas ZIP64 con data descriptor)"""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        entry, entry_section = None, None
+        for section, row in export_sections(user_id):
+            if section != entry_section:
+                if entry is not None:
+                    entry.close()
+                entry = archive.open(f"{section}.ndjson", "w", force_zip64=True)
+                entry_section = section
+            entry.write((json.dumps(row, default=_json_default, ensure_ascii=False) + "\n").encode("utf-8"))
+            if sink.pending >= ZIP_CHUNK_BYTES:
+                yield sink.drain()
+        if entry is not None:
+            entry.close()
+        manifest = {"user_id": user_id, "format_version": EXPORT_FORMAT_VERSION,
+                    "generated_at": datetime.utcnow()}
+        archive.writestr("manifest.json", json.dumps(manifest, default=_json_default, indent=2))
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "zip": (iter_zip, "application/zip"),
+}
+
+
+def write_export(user_id: str, fmt: str, fh: BinaryIO) -> int:
+    """Escribir la exportación en un archivo abierto; retorna los bytes escritos"""
+    generator, _ = EXPORT_FORMATS[fmt]
+    written = 0
+    for chunk in generator(user_id):
+        fh.write(chunk)
+        written += len(chunk)
+    return written
+
+
+# ---- Jobs en segundo plano ----
+# El estado vive en el sistema de archivos (GDPR_EXPORT_DIR), compartido por todos los workers:
+# <user_id>_<job_id>.zip.part mientras se genera, .zip al terminar, .failed si falla.
+
+_JOB_ID_ALPHABET = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+_export_slots: Optional[threading.BoundedSemaphore] = None
+_export_slots_lock = threading.Lock()
+
+
+def _job_path(user_id: str, job_id: str, suffix: str = "") -> str:
+    if not job_id or not set(job_id) <= _JOB_ID_ALPHABET:
+        raise ValueError("job_id inválido")
+    return os.path.join(current_app.config["GDPR_EXPORT_DIR"], f"{user_id}_{job_id}.zip{suffix}")
+
+
+def remove_user_exports(user_id: str) -> int:
+    """Borrar los archivos de exportación de un usuario (zip, .part y .failed)"""
+    directory = current_app.config["GDPR_EXPORT_DIR"]
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith(f"{user_id}_"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return removed
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _export_slots
+    with _export_slots_lock:
+        if _export_slots is None:
+            _export_slots = threading.BoundedSemaphore(current_app.config["GDPR_EXPORT_MAX_JOBS"])
+        return _export_slots
+
+
+def _run_export_job(app: Flask, user_id: str, job_id: str) -> None:
+    with app.app_context():
+        final_path = _job_path(user_id, job_id)
+        part_path = _job_path(user_id, job_id, ".part")
+        started = time.monotonic()
+        slots = _slots()
+        try:
+            # En cola: mantener el .part "vivo" para que el estado no pase a failed
+            while not slots.acquire(timeout=current_app.config["GDPR_EXPORT_STALE_SECONDS"] / 4):
+                os.utime(part_path)
+            try:
+                with open(part_path, "wb") as fh:
+                    size = write_export(user_id, "zip", fh)
+            finally:
+                slots.release()
+            os.replace(part_path, final_path)
+            logger.info(f"[GDPR] Exportación {job_id} lista: {size / 1024:.0f} KB en {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"[GDPR] Exportación {job_id} falló: {e}")
+            with open(_job_path(user_id, job_id, ".failed"), "w") as fh:
+                fh.write(type(e).__name__)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+
+def purge_expired_exports() -> int:
+    """Borrar exportaciones con más de GDPR_EXPORT_TTL_HOURS (contienen datos personales)"""
+    directory = current_app.config["GDPR_EXPORT_DIR"]
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - current_app.config["GDPR_EXPORT_TTL_HOURS"] * 3600
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def start_export_job(user_id: str) -> str:
+    """Generar el zip del usuario en un hilo del proceso; retorna el job_id para consultar su estado"""
+    os.makedirs(current_app.config["GDPR_EXPORT_DIR"], exist_ok=True)
+    purge_expired_exports()
+    job_id = secrets.token_urlsafe(16)
+    # Crear el .part ya: el estado es "running" para cualquier worker desde este momento
+    open(_job_path(user_id, job_id, ".part"), "wb").close()
+    app = current_app._get_current_object()
+    threading.Thread(target=_run_export_job, args=(app, user_id, job_id),
+                     name=f"gdpr-export-{job_id[:8]}", daemon=True).start()
+    return job_id
+
+
+def export_job_status(user_id: str, job_id: str) -> Optional[str]:
+    """ready | running | failed | None (inexistente, expirado o de otro usuario)"""
+    try:
+        final_path = _job_path(user_id, job_id)
+    except ValueError:
+        return None
+    if os.path.exists(final_path):
+        return "ready"
+    if os.path.exists(final_path + ".failed"):
+        return "failed"
+    part_path = final_path + ".part"
+    if os.path.exists(part_path):
+        # Un .part sin escrituras recientes quedó de un worker reciclado o terminado
+        stale_after = current_app.config["GDPR_EXPORT_STALE_SECONDS"]
+        return "running" if time.time() - os.path.getmtime(part_path) < stale_after else "failed"
+    return None
+
+
+def export_job_path(user_id: str, job_id: str) -> Optional[str]:
+    """Ruta del zip terminado (None si no está listo)"""
+    return _job_path(user_id, job_id) if export_job_status(user_id, job_id) == "ready" else None
+
+
+# ==================== CLI ====================
+
+gdpr_cli = AppGroup("gdpr", help="Derechos GDPR/LPD (purga de cuentas vencidas, exportación de datos)")
+
+
+@gdpr_cli.command("sweep")
+@click.option("--dry-run", is_flag=True, help="Contar cuentas vencidas y filas sin borrar")
+@click.option("--batch-size", type=int, help="Filas por DELETE (GDPR_SWEEP_BATCH_SIZE)")
+@click.option("--user-batch", type=int, help="Cuentas por ronda (GDPR_SWEEP_USER_BATCH)")
+@click.option("--pause", "pause_seconds", type=float, help="Pausa entre lotes en segundos (GDPR_SWEEP_PAUSE_SECONDS)")
+@click.option("--max-seconds", type=float, help="Detenerse tras este tiempo; la próxima pasada continúa")
+def sweep_command(dry_run: bool, batch_size: Optional[int], user_batch: Optional[int],
+                  pause_seconds: Optional[float], max_seconds: Optional[float]) -> None:
+    """Purgar cuentas con scheduled_deletion vencido"""
+    cutoff = datetime.utcnow()
+    if dry_run:
+        click.echo(f"Cuentas vencidas: {count_due_users(cutoff)}")
+        for table, count in pending_rows(cutoff).items():
+            click.echo(f"  {table:<16} {count}")
+        return
+    try:
+        stats = sweep(cutoff, batch_size, user_batch, pause_seconds, max_seconds)
+    except TimeoutError:
+        raise click.ClickException("Otra purga GDPR está en curso")
+    click.echo(stats.summary())
+    if stats.stopped_early:
+        click.echo("Detenida por --max-seconds; la próxima ejecución continúa donde quedó")
+
+
+
+@gdpr_cli.command("export")
+@click.argument("user_id")
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default="zip")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), required=True, help="Archivo de salida ('-' = stdout)")
+def export_command(user_id: str, fmt: str, output: str) -> None:
+    """Exportar los datos de un usuario (derecho de acceso) sin cargarlos en memoria"""
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f"Usuario {user_id} no existe")
+    started = time.monotonic()
+    if output == "-":
+        size = write_export(user_id, fmt, click.get_binary_stream("stdout"))
+    else:
+        with open(output, "wb") as fh:
+            size = write_export(user_id, fmt, fh)
+    click.echo(f"{size / 1024:.0f} KB en {time.monotonic() - started:.1f}s", err=True)
+
+
+@gdpr_cli.command("purge-exports")
+def purge_exports_command() -> None:
+    """Borrar exportaciones con más de GDPR_EXPORT_TTL_HOURS (programar como cron horario)"""
+    click.echo(f"{purge_expired_exports()} exportaciones vencidas borradas")
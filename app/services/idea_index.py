@@ -0,0 +1,225 @@
+"""
+Índice local de ideas casi duplicadas (embeddings livianos + LSH)
+Evita repetir la evaluación de ambigüedad para pitches prácticamente idénticos
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+from flask import Flask, current_app
+from sqlalchemy import event
+
+from app.models import db, Project
+from app.services.embeddings import embed_text
+
+logger = logging.getLogger(__name__)
+
+
+class IdeaIndex:
+    """
+    Índice vectorial en memoria con búsqueda aproximada (LSH de hiperplanos aleatorios).
+    Soporta inserción y borrado incremental (borrado requerido por el derecho al olvido).
+    """
+
+    def __init__(self, dim: int = 512, n_tables: int = 16, n_bits: int = 8, seed: int = 42):
+        self.dim = dim
+        self.n_tables = n_tables
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables, n_bits, dim)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.int64)
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._row_of: Dict[str, int] = {}
+        self._id_of: Dict[int, str] = {}
+        self._free_rows: List[int] = []
+        self._buckets: List[Dict[int, set]] = [dict() for _ in range(n_tables)]
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _codes(self, vector: np.ndarray) -> np.ndarray:
+        bits = (self._planes @ vector) > 0
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def add(self, item_id: str, text: str) -> None:
+        """Insertar (o reemplazar) una idea en el índice"""
+        vector = embed_text(text, self.dim)
+        if not vector.any():
+            return
+        with self._lock:
+            self.remove(item_id)
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = self._size
+                if row >= self._vectors.shape[0]:
+                    grown = np.zeros((max(64, row * 2), self.dim), dtype=np.float32)
+                    grown[:row] = self._vectors[:row]
+                    self._vectors = grown
+                self._size += 1
+            self._vectors[row] = vector
+            self._row_of[item_id] = row
+            self._id_of[row] = item_id
+            for table, code in enumerate(self._codes(vector)):
+                self._buckets[table].setdefault(int(code), set()).add(item_id)
+
+    def remove(self, item_id: str) -> bool:
+        """Eliminar una idea del índice (no-op si no existe)"""
+        with self._lock:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                return False
+            for table, code in enumerate(self._codes(self._vectors[row])):
+                bucket = self._buckets[table].get(int(code))
+                if bucket is not None:
+                    bucket.discard(item_id)
+                    if not bucket:
+                        del self._buckets[table][int(code)]
+            self._vectors[row] = 0
+            del self._id_of[row]
+            self._free_rows.append(row)
+            return True
+
+    def query(self, text: str, k: int = 5, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Vecinos aproximados más cercanos: [(id, similitud coseno)] ordenados desc."""
+        vector = embed_text(text, self.dim)
+        if not vector.any():
+            return []
+        with self._lock:
+            candidates = set()
+            for table, code in enumerate(self._codes(vector)):
+                candidates |= self._buckets[table].get(int(code), set())
+            if not candidates:
+                return []
+            ids = list(candidates)
+            rows = np.fromiter((self._row_of[i] for i in ids), dtype=np.int64, count=len(ids))
+            similarities = self._vectors[rows] @ vector
+        order = np.argsort(-similarities)[:k]
+        return [(ids[i], float(similarities[i])) for i in order if similarities[i] >= min_similarity]
+
+
+class _IdeaIndexHolder:
+    """
+    Índice por proceso, construido desde la BD en un hilo de fondo y reconstruido periódicamente.
+    Ningún request espera el escaneo: mientras se construye se sirve el índice anterior
+    (o ninguno, y la idea se evalúa con el LLM). Altas y bajas ocurridas durante la
+    construcción se anotan y se aplican al índice nuevo antes de publicarlo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[IdeaIndex] = None
+        self._building = False
+        self._pending: List[Tuple[str, Optional[str]]] = []
+
+    def get(self, max_age_seconds: int = 3600) -> Optional[IdeaIndex]:
+        """Índice vigente (puede estar vencido); si falta o venció, lanza la reconstrucción en segundo plano"""
+        with self._lock:
+            stale = self._index is None or time.monotonic() - self._index.built_at > max_age_seconds
+            if not stale or self._building:
+                return self._index
+            self._building = True
+            self._pending = []
+        if not current_app.config.get("IDEA_INDEX_BACKGROUND_BUILD", True):
+            self._publish(self._load())
+            return self._index
+        app = current_app._get_current_object()
+        threading.Thread(target=self._build, args=(app,), name="idea-index-build", daemon=True).start()
+        return self._index
+
+    def peek(self) -> Optional[IdeaIndex]:
+        """Índice actual sin construirlo (para mantenimiento incremental)"""
+        return self._index
+
+    def add(self, item_id: str, text: str) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append((item_id, text))
+            index = self._index
+        if index is not None:
+            index.add(item_id, text)
+
+    def remove(self, item_id: str) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append((item_id, None))
+            index = self._index
+        if index is not None:
+            index.remove(item_id)
+
+    @staticmethod
+    def _load() -> IdeaIndex:
+        started = time.monotonic()
+        index = IdeaIndex()
+        rows = db.session.query(Project.id, Project.raw_idea).execution_options(yield_per=1000)
+        for project_id, raw_idea in rows:
+            index.add(project_id, raw_idea)
+        index.built_at = time.monotonic()
+        logger.info(f"[INDEX] Índice de ideas construido: {len(index)} proyectos en {index.built_at - started:.2f}s")
+        return index
+
+    def _build(self, app: Flask) -> None:
+        index = None
+        try:
+            with app.app_context():
+                index = self._load()
+        except Exception as e:
+            logger.error(f"[INDEX] Error construyendo el índice de ideas: {e}")
+        finally:
+            self._publish(index)
+
+    def _publish(self, index: Optional[IdeaIndex]) -> None:
+        """Aplicar las altas/bajas anotadas durante la construcción y reemplazar el índice"""
+        with self._lock:
+            if index is not None:
+                for item_id, text in self._pending:
+                    if text is None:
+                        index.remove(item_id)
+                    else:
+                        index.add(item_id, text)
+                self._index = index
+            self._pending = []
+            self._building = False
+
+
+idea_index = _IdeaIndexHolder()
+
+
+def find_near_duplicate(raw_idea: str, threshold: float = 0.9,
+                        max_age_seconds: int = 3600) -> Optional[Tuple[Project, float]]:
+    """
+    Buscar un proyecto ya analizado cuyo pitch sea casi idéntico.
+    Los resultados cuyo proyecto ya no existe (p.ej. borrado en otro worker) se descartan
+    y se eliminan del índice local.
+    """
+    index = idea_index.get(max_age_seconds)
+    if index is None:
+        return None
+    for project_id, similarity in index.query(raw_idea, k=3, min_similarity=threshold):
+        project = db.session.get(Project, project_id)
+        if project is None:
+            index.remove(project_id)
+            continue
+        return project, similarity
+    return None
+
+
+def index_project(project: Project) -> None:
+    """Agregar un proyecto recién creado al índice (o a la construcción en curso)"""
+    idea_index.add(project.id, project.raw_idea)
+
+
+def remove_projects(project_ids: List[str]) -> None:
+    """Eliminar proyectos del índice (borrado GDPR)"""
+    for project_id in project_ids:
+        idea_index.remove(project_id)
+
+
+@event.listens_for(Project, "after_delete")
+def _remove_deleted_project(mapper, connection, target) -> None:
+    """Borrados vía ORM (incluye cascade de User.hard_delete) salen del índice"""
+    remove_projects([target.id])
@@ -0,0 +1,422 @@
+"""
+Runner de migraciones versionadas (migrations/NNN_nombre.sql|.py)
+Reemplaza db.create_all() en producción: aplica las revisiones pendientes en orden,
+registra cada versión en schema_migrations y serializa ejecuciones concurrentes
+(varios contenedores arrancando a la vez) con un advisory lock.
+
+Directivas en archivos .sql (comentarios de cabecera):
+    -- migrate: no-transaction        cada sentencia en autocommit (CREATE INDEX CONCURRENTLY)
+    -- migrate: dialects=postgresql   se omite en otros motores (SQLite en desarrollo)
+
+Revisiones .py: definen upgrade(ctx) y opcionalmente TRANSACTIONAL = False y
+DIALECTS = {"postgresql"}. ctx ofrece execute(), create_index() y backfill().
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DateTime, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import db
+from app.services import single_flight
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "migrations")
+VERSION_TABLE = "schema_migrations"
+# Espera máxima por el lock si otro proceso está migrando
+LOCK_TIMEOUT_SECONDS = 600
+
+_FILENAME = re.compile(r"^(\d{3,})_([A-Za-z0-9_]+)\.(sql|py)$")
+_DIRECTIVE = re.compile(r"^--\s*migrate:\s*(.+?)\s*$", re.MULTILINE)
+
+
+class MigrationError(Exception):
+    """Revisión inválida o fallida; la versión no queda registrada"""
+
+
+@dataclass
+class Revision:
+    """Una revisión del directorio migrations/"""
+    version: str
+    name: str
+    path: str
+    kind: str  # "sql" | "py"
+    transactional: bool = True
+    dialects: Optional[Set[str]] = None
+
+    @property
+    def checksum(self) -> str:
+        with open(self.path, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()[:16]
+
+    def applies_to(self, dialect: str) -> bool:
+        return self.dialects is None or dialect in self.dialects
+
+    def _module(self):
+        spec = importlib.util.spec_from_file_location(f"migration_{self.version}", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not callable(getattr(module, "upgrade", None)):
+            raise MigrationError(f"{self.path}: falta upgrade(ctx)")
+        return module
+
+
+def _parse_directives(revision: Revision, source: str) -> None:
+    for directive in _DIRECTIVE.findall(source):
+        if directive == "no-transaction":
+            revision.transactional = False
+        elif directive.startswith("dialects="):
+            revision.dialects = {d.strip() for d in directive.split("=", 1)[1].split(",") if d.strip()}
+        else:
+            raise MigrationError(f"{revision.path}: directiva desconocida '{directive}'")
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Revision]:
+    """Revisiones ordenadas por versión (error si dos archivos comparten número)"""
+    revisions: Dict[str, Revision] = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name, kind = match.groups()
+        if version in revisions:
+            raise MigrationError(f"Versión duplicada {version}: {revisions[version].path} y {filename}")
+        revision = Revision(version, name, os.path.join(directory, filename), kind)
+        if kind == "sql":
+            with open(revision.path, encoding="utf-8") as fh:
+                _parse_directives(revision, fh.read())
+        else:
+            module = revision._module()
+            revision.transactional = getattr(module, "TRANSACTIONAL", True)
+            dialects = getattr(module, "DIALECTS", None)
+            revision.dialects = set(dialects) if dialects else None
+        revisions[version] = revision
+    return sorted(revisions.values(), key=lambda r: int(r.version))
+
+
+def split_sql(source: str) -> List[str]:
+    """
+    Separar un script en sentencias por ';' respetando comentarios, strings
+    y bloques $tag$...$tag$ (DO / funciones PL/pgSQL)
+    """
+    statements, current = [], []
+    i, length = 0, len(source)
+    while i < length:
+        char = source[i]
+        if source.startswith("--", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end + 1
+            current.append("\n")
+            continue
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char == "'":
+            end = i + 1
+            while end < length:
+                if source[end] == "'" and source.startswith("''", end):
+                    end += 2
+                    continue
+                if source[end] == "'":
+                    break
+                end += 1
+            current.append(source[i:end + 1])
+            i = end + 1
+            continue
+        if char == "$":
+            tag = re.match(r"\$[A-Za-z_]*\$", source[i:])
+            if tag:
+                end = source.find(tag.group(0), i + len(tag.group(0)))
+                end = length if end == -1 else end + len(tag.group(0))
+                current.append(source[i:end])
+                i = end
+                continue
+        if char == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+class MigrationContext:
+    """Operaciones disponibles para revisiones .py"""
+
+    def __init__(self, engine: Engine, connection: Connection, transactional: bool):
+        self.engine = engine
+        self.connection = connection
+        self.transactional = transactional
+        self.dialect = engine.dialect.name
+
+    def execute(self, sql: str, params: Optional[Dict] = None):
+        return self.connection.execute(text(sql), params or {})
+
+    def create_index(self, name: str, table: str, columns: List[str], unique: bool = False,
+                     where: Optional[str] = None) -> None:
+        """
+        Índice sin bloquear escrituras: CREATE INDEX CONCURRENTLY en Postgres (requiere
+        revisión TRANSACTIONAL = False). Un intento previo fallido deja el índice INVALID:
+        se elimina y se vuelve a crear.
+        """
+        concurrently = self.dialect == "postgresql" and not self.transactional
+        if self.dialect == "postgresql" and self.transactional:
+            logger.warning(f"[MIGRATE] {name}: revisión transaccional, índice creado con bloqueo de escritura")
+        if concurrently:
+            invalid = self.execute(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid",
+                {"name": name},
+            ).scalar()
+            if invalid:
+                logger.warning(f"[MIGRATE] Índice {name} INVALID de un intento previo: recreando")
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        statement = (
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}"
+            f"IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        )
+        if where:
+            statement += f" WHERE {where}"
+        started = time.monotonic()
+        self.execute(statement)
+        logger.info(f"[MIGRATE] Índice {name} listo en {time.monotonic() - started:.1f}s")
+
+    def drop_index(self, name: str) -> None:
+        concurrently = self.dialect == "postgresql" and not self.transactional
+        self.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}")
+
+    def backfill(self, table: str, assignments: str, where: str, batch_size: int = 1000,
+                 pause_seconds: float = 0.0, key: str = "id",
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        UPDATE por lotes en transacciones cortas (sin bloquear la tabla completa ni
+        generar una transacción gigante). `where` debe dejar de cumplirse para las filas
+        ya actualizadas, p.ej. assignments="updated_at = generated_at", where="updated_at IS NULL".
+        Solo en revisiones TRANSACTIONAL = False (cada lote confirma por separado).
+        """
+        if self.transactional:
+            raise MigrationError("backfill() requiere una revisión con TRANSACTIONAL = False")
+        statement = text(
+            f"UPDATE {table} SET {assignments} "
+            f"WHERE {key} IN (SELECT {key} FROM {table} WHERE {where} LIMIT :batch_size)"
+        )
+        total = 0
+        while True:
+            with self.engine.begin() as batch:
+                updated = batch.execute(statement, {"batch_size": batch_size}).rowcount
+            total += updated
+            if progress:
+                progress(total)
+            if updated < batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        logger.info(f"[MIGRATE] Backfill {table}: {total} filas")
+        return total
+
+
+# ==================== HISTORIAL ====================
+
+def _ensure_version_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version VARCHAR(32) PRIMARY KEY, "
+            "name VARCHAR(255) NOT NULL, "
+            "checksum VARCHAR(16) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL, "
+            "execution_ms INTEGER)"
+        ))
+
+
+def applied_versions(engine: Engine) -> Dict[str, Dict]:
+    """Versiones registradas {version: fila}"""
+    if not inspect(engine).has_table(VERSION_TABLE):
+        return {}
+    with engine.connect() as conn:
+        # Tipado explícito: SQLite devuelve el TIMESTAMP como texto
+        query = text(f"SELECT version, name, checksum, applied_at, execution_ms FROM {VERSION_TABLE}")
+        rows = conn.execute(query.columns(applied_at=DateTime))
+        return {row.version: dict(row._mapping) for row in rows}
+
+
+def _record(conn: Connection, revision: Revision, execution_ms: Optional[int]) -> None:
+    conn.execute(
+        text(f"INSERT INTO {VERSION_TABLE} (version, name, checksum, applied_at, execution_ms) "
+             "VALUES (:version, :name, :checksum, :applied_at, :execution_ms)"),
+        {"version": revision.version, "name": revision.name, "checksum": revision.checksum,
+         "applied_at": datetime.utcnow(), "execution_ms": execution_ms},
+    )
+
+
+def pending(engine: Engine, revisions: Optional[List[Revision]] = None) -> List[Revision]:
+    applied = applied_versions(engine)
+    dialect = engine.dialect.name
+    return [r for r in (revisions or discover()) if r.version not in applied and r.applies_to(dialect)]
+
+
+def _run(engine: Engine, revision: Revision) -> None:
+    if revision.kind == "sql":
+        with open(revision.path, encoding="utf-8") as fh:
+            statements = split_sql(fh.read())
+
+    if revision.transactional:
+        # DDL transaccional: la revisión y su registro se confirman juntos
+        with engine.begin() as conn:
+            started = time.monotonic()
+            if revision.kind == "sql":
+                for statement in statements:
+                    conn.exec_driver_sql(statement)
+            else:
+                revision._module().upgrade(MigrationContext(engine, conn, transactional=True))
+            _record(conn, revision, int((time.monotonic() - started) * 1000))
+        return
+
+    # Sin transacción: cada sentencia se confirma sola; deben ser idempotentes
+    # (IF NOT EXISTS) porque un fallo a mitad deja la versión sin registrar
+    started = time.monotonic()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if revision.kind == "sql":
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+        else:
+            revision._module().upgrade(MigrationContext(engine, conn, transactional=False))
+    with engine.begin() as conn:
+        _record(conn, revision, int((time.monotonic() - started) * 1000))
+
+
+def upgrade(engine: Optional[Engine] = None, target: Optional[str] = None, dry_run: bool = False) -> List[Revision]:
+    """
+    Aplicar las revisiones pendientes (hasta target inclusive) en orden.
+
+    Raises:
+        MigrationError: base con tablas pero sin historial (usar stamp), o revisión fallida
+        TimeoutError: otro proceso mantiene el lock de migraciones
+    """
+    engine = engine or db.engine
+    revisions = discover()
+    with single_flight.advisory_lock("schema", "migrations", LOCK_TIMEOUT_SECONDS):
+        if not inspect(engine).has_table(VERSION_TABLE) and inspect(engine).has_table("users"):
+            raise MigrationError(
+                "La base ya tiene tablas pero no historial de migraciones: "
+                "marca la versión vigente con `flask db stamp <versión>`"
+            )
+        _ensure_version_table(engine)
+        todo = [r for r in pending(engine, revisions) if target is None or int(r.version) <= int(target)]
+        for revision in todo:
+            if dry_run:
+                logger.info(f"[MIGRATE] (dry-run) {revision.version}_{revision.name}")
+                continue
+            logger.info(f"[MIGRATE] Aplicando {revision.version}_{revision.name}"
+                        f"{'' if revision.transactional else ' (sin transacción)'}")
+            started = time.monotonic()
+            try:
+                _run(engine, revision)
+            except Exception as e:
+                raise MigrationError(f"{revision.version}_{revision.name} falló: {e}") from e
+            logger.info(f"[MIGRATE] {revision.version}_{revision.name} aplicada en {time.monotonic() - started:.2f}s")
+    return todo
+
+
+def stamp(version: str, engine: Optional[Engine] = None) -> List[Revision]:
+    """Registrar como aplicadas (sin ejecutarlas) las revisiones hasta version inclusive"""
+    engine = engine or db.engine
+    revisions = [r for r in discover() if int(r.version) <= int(version)]
+    with single_flight.advisory_lock("schema", "migrations", LOCK_TIMEOUT_SECONDS):
+        _ensure_version_table(engine)
+        applied = applied_versions(engine)
+        stamped = [r for r in revisions if r.version not in applied]
+        with engine.begin() as conn:
+            for revision in stamped:
+                _record(conn, revision, None)
+    return stamped
+
+
+# ==================== CLI ====================
+
+db_cli = AppGroup("db", help="Migraciones de esquema (migrations/)")
+
+
+@db_cli.command("upgrade")
+@click.option("--target", help="Aplicar solo hasta esta versión (inclusive)")
+@click.option("--dry-run", is_flag=True, help="Listar lo que se aplicaría sin ejecutarlo")
+def upgrade_command(target: Optional[str], dry_run: bool) -> None:
+    """Aplicar migraciones pendientes"""
+    try:
+        done = upgrade(target=target, dry_run=dry_run)
+    except (MigrationError, TimeoutError) as e:
+        raise click.ClickException(str(e))
+    if not done:
+        click.echo("Esquema al día")
+    for revision in done:
+        click.echo(f"{'pendiente' if dry_run else 'aplicada'}: {revision.version}_{revision.name}")
+
+
+@db_cli.command("status")
+def status_command() -> None:
+    """Estado de cada revisión (aplicada, pendiente, modificada tras aplicarse, otro motor)"""
+    engine = db.engine
+    applied = applied_versions(engine)
+    for revision in discover():
+        row = applied.get(revision.version)
+        if row:
+            state = "aplicada" if row["checksum"] == revision.checksum or row["execution_ms"] is None else "MODIFICADA"
+            detail = f"{row['applied_at']:%Y-%m-%d %H:%M}"
+            if row["execution_ms"] is not None:
+                detail += f", {row['execution_ms']}ms"
+            else:
+                detail += ", stamp"
+        elif not revision.applies_to(engine.dialect.name):
+            state, detail = "omitida", f"solo {', '.join(sorted(revision.dialects))}"
+        else:
+            state, detail = "pendiente", "sin transacción" if not revision.transactional else ""
+        click.echo(f"{revision.version}  {revision.name:<40} {state:<10} {detail}")
+
+
+@db_cli.command("stamp")
+@click.argument("version")
+def stamp_command(version: str) -> None:
+    """Marcar como aplicadas las revisiones hasta VERSION (bases creadas antes del runner)"""
+    for revision in stamp(version):
+        click.echo(f"marcada: {revision.version}_{revision.name}")
+
+
+@db_cli.command("new")
+@click.argument("name")
+@click.option("--python", "as_python", is_flag=True, help="Revisión .py (backfills, índices concurrentes)")
+@click.option("--no-transaction", is_flag=True, help="Ejecutar fuera de transacción")
+def new_command(name: str, as_python: bool, no_transaction: bool) -> None:
+    """Crear el archivo de la siguiente revisión"""
+    revisions = discover()
+    version = f"{(int(revisions[-1].version) + 1) if revisions else 0:03d}"
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    path = os.path.join(MIGRATIONS_DIR, f"{version}_{slug}.{'py' if as_python else 'sql'}")
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    if as_python:
+        body = (f'"""\nMIGRACIÓN: {name}\nFecha: {today}\n"""\n'
+                f"TRANSACTIONAL = {not no_transaction}\n\n\n"
+                "def upgrade(ctx):\n    pass\n")
+    else:
+        body = (f"-- =====================================================\n-- MIGRACIÓN: {name}\n"
+                f"-- Fecha: {today}\n-- =====================================================\n"
+                + ("-- migrate: no-transaction\n" if no_transaction else "") + "\n")
+    with open(path, "x", encoding="utf-8") as fh:
+        fh.write(body)
+    click.echo(path)
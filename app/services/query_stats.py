@@ -0,0 +1,580 @@
+"""
+Instrumentación de consultas y revisión de índices
+Con QUERY_STATS_ENABLED cada SELECT se agrupa por forma (SQL del driver sin valores) con
+llamadas, tiempo total/máximo y una muestra de parámetros para EXPLAIN. La primera vez que
+aparece una forma se registra también su estructura: tabla, columnas comparadas por igualdad,
+por rango y de ORDER BY, columnas leídas y los valores constantes de columnas Enum/Boolean.
+
+advise() contrasta esas formas con los índices reales de la base y propone:
+  - índices compuestos (igualdad primero, luego rango u orden) para formas sin índice que las cubra
+  - índices parciales cuando una columna de baja cardinalidad se filtra siempre por el mismo valor
+  - INCLUDE (Postgres) con las pocas columnas leídas, para index-only scans
+y marca índices redundantes (prefijo de otro) o de baja selectividad, que solo encarecen escrituras.
+
+Cada proceso vuelca sus formas en QUERY_STATS_DIR (shapes.<pid>.json) cada
+QUERY_STATS_DUMP_SECONDS y al salir; el reporte une los archivos de todos los workers.
+
+    flask indexes report [--explain] [--analyze] [--json]
+    flask indexes reset
+    python scripts/index_bench.py    # antes/después de las propuestas sobre datos sintéticos
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import atexit
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import Boolean, Column, Enum, Table, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Alias, Select, Subquery, functions, operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, UnaryExpression
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+_EXPANDED_IN = re.compile(r"IN \((?:%\(\w+\)s|\?)(?:, (?:%\(\w+\)s|\?))*\)")
+_EQUALITY_OPS = {operators.eq, operators.in_op, operators.is_}
+_RANGE_OPS = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+# Máximo de valores constantes distintos que se recuerdan por columna
+MAX_CONSTANTS = 5
+# Llamadas en las que se vuelven a leer esos valores (todas al principio, luego 1 de cada N)
+CONSTANT_SAMPLE_CALLS = 200
+CONSTANT_SAMPLE_EVERY = 50
+MAX_INCLUDE_COLUMNS = 3
+PG_LOW_DISTINCT = 10
+PG_MOSTLY_NULL = 0.9
+PG_MIN_ROWS = 10000
+LOW_SELECTIVITY = "baja selectividad: pocos valores distintos, encarece escrituras (considerar un índice parcial)"
+
+
+@dataclass
+class QueryShape:
+    """Una forma de consulta y sus estadísticas agregadas"""
+    sql: str
+    params: Any = None
+    table: Optional[str] = None
+    equality: List[str] = field(default_factory=list)
+    ranges: List[str] = field(default_factory=list)
+    order_by: List[str] = field(default_factory=list)
+    selected: List[str] = field(default_factory=list)
+    is_count: bool = False
+    constants: Dict[str, List[Any]] = field(default_factory=dict)
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def merge(self, other: "QueryShape") -> None:
+        self.calls += other.calls
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        for column, values in other.constants.items():
+            _remember(self.constants, column, values)
+
+
+def _remember(constants: Dict[str, List[Any]], column: str, values: List[Any]) -> None:
+    known = constants.setdefault(column, [])
+    for value in values:
+        if value not in known and len(known) < MAX_CONSTANTS:
+            known.append(value)
+
+
+def shape_key(sql: str) -> str:
+    """Listas IN expandidas (un placeholder por elemento) cuentan como la misma forma"""
+    return _EXPANDED_IN.sub("IN (…)", " ".join(sql.split()))
+
+
+# ==================== ESTRUCTURA ====================
+
+def _table_column(element, table_name: str) -> Optional[Column]:
+    element = getattr(element, "element", element) if isinstance(element, UnaryExpression) else element
+    if isinstance(element, Column) and getattr(element.table, "name", None) == table_name:
+        return element
+    return None
+
+
+def _low_cardinality(column: Column) -> bool:
+    return isinstance(column.type, (Enum, Boolean))
+
+
+def describe(statement) -> Optional[Dict[str, Any]]:
+    """Estructura de un SELECT sobre una sola tabla (None para joins y otras sentencias)"""
+    if not isinstance(statement, Select):
+        return None
+    is_count = False
+    froms = statement.get_final_froms()
+    inner = froms[0] if len(froms) == 1 else None
+    while isinstance(inner, (Alias, Subquery)):
+        inner = inner.element
+    if isinstance(inner, Select):
+        # Query.count(): SELECT count(*) FROM (SELECT ... WHERE ...) AS anon_1
+        is_count = all(isinstance(getattr(c, "element", c), functions.count) for c in statement.selected_columns)
+        statement = inner
+        froms = statement.get_final_froms()
+    if len(froms) != 1 or not isinstance(froms[0], Table):
+        return None
+    table = froms[0].name
+    info: Dict[str, Any] = {"table": table, "equality": [], "ranges": [], "order_by": [],
+                            "selected": [], "is_count": is_count, "constants": {}}
+    if statement.whereclause is not None:
+        for node in visitors.iterate(statement.whereclause):
+            if not isinstance(node, BinaryExpression):
+                continue
+            # Columna a cualquier lado (las relaciones lazy generan :param = tabla.columna)
+            column, other = _table_column(node.left, table), node.right
+            if column is None:
+                column, other = _table_column(node.right, table), node.left
+            if column is None:
+                continue
+            if node.operator in _EQUALITY_OPS and column.name not in info["equality"]:
+                info["equality"].append(column.name)
+                value = other.value if isinstance(other, BindParameter) else None
+                if _low_cardinality(column) and isinstance(value, (str, bool)):
+                    _remember(info["constants"], column.name, [value])
+            elif node.operator in _RANGE_OPS and column.name not in info["ranges"]:
+                info["ranges"].append(column.name)
+    for clause in getattr(statement, "_order_by_clauses", ()):
+        column = _table_column(clause, table)
+        if column is not None:
+            info["order_by"].append(column.name)
+    if not is_count:
+        selected = [c.name for c in statement.selected_columns if _table_column(c, table) is not None]
+        info["selected"] = ["*"] if len(selected) >= len(froms[0].columns) else selected
+    return info
+
+
+# ==================== REGISTRO ====================
+
+class QueryStats:
+    """Formas de consulta del proceso (thread-safe)"""
+
+    def __init__(self, max_shapes: int = 500):
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self.shapes: Dict[str, QueryShape] = {}
+
+    def record(self, sql: str, params: Any, statement, elapsed_ms: float) -> None:
+        key = shape_key(sql)
+        with self._lock:
+            shape = self.shapes.get(key)
+            if shape is None:
+                if len(self.shapes) >= self.max_shapes:
+                    return
+                shape = QueryShape(sql=sql, params=_json_safe(params), **(describe(statement) or {}))
+                self.shapes[key] = shape
+            elif statement is not None and shape.constants and (
+                    shape.calls < CONSTANT_SAMPLE_CALLS or shape.calls % CONSTANT_SAMPLE_EVERY == 0):
+                # Otros valores de las columnas constantes (p.ej. session_type): si aparecen,
+                # la columna va en la clave del índice en lugar de en un predicado parcial
+                for column, values in (describe(statement) or {}).get("constants", {}).items():
+                    _remember(shape.constants, column, values)
+            shape.calls += 1
+            shape.total_ms += elapsed_ms
+            shape.max_ms = max(shape.max_ms, elapsed_ms)
+
+    def snapshot(self) -> Dict[str, QueryShape]:
+        with self._lock:
+            return {key: QueryShape(**asdict(shape)) for key, shape in self.shapes.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.shapes.clear()
+
+
+query_stats = QueryStats()
+
+
+def _json_safe(value):
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (bytes, memoryview)):
+        return {"$bytes": bytes(value).hex()}
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _driver_params(value):
+    """Inversa de _json_safe para ejecutar EXPLAIN con la muestra"""
+    if isinstance(value, dict):
+        if set(value) == {"$bytes"}:
+            return bytes.fromhex(value["$bytes"])
+        return {k: _driver_params(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return tuple(_driver_params(v) for v in value)
+    return value
+
+
+def _attach(engine: Engine, dump_dir: Optional[str], dump_seconds: float) -> None:
+    next_dump = [time.monotonic() + dump_seconds]
+
+    @event.listens_for(engine, "before_execute")
+    def _remember_statement(conn, clauseelement, multiparams, params, execution_options):
+        conn.info["query_stats_statement"] = clauseelement
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_stats_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_stats_started", None)
+        clause = conn.info.pop("query_stats_statement", None)
+        if started is None or executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        query_stats.record(statement, parameters, clause, (time.perf_counter() - started) * 1000)
+        if dump_dir and time.monotonic() >= next_dump[0]:
+            next_dump[0] = time.monotonic() + dump_seconds
+            dump(dump_dir)
+
+
+def dump(directory: str) -> Optional[str]:
+    """Volcar las formas del proceso a <directory>/shapes.<pid>.json (reemplazo atómico)"""
+    shapes = query_stats.snapshot()
+    if not shapes:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"shapes.{os.getpid()}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump([asdict(shape) for shape in shapes.values()], fh, ensure_ascii=False, default=str)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load(directory: Optional[str] = None) -> List[QueryShape]:
+    """Formas de todos los procesos (archivos de directory + las del proceso actual), por tiempo total"""
+    merged: Dict[str, QueryShape] = {}
+    sources = []
+    for path in glob.glob(os.path.join(directory, "shapes.*.json")) if directory else []:
+        if path.endswith(f"shapes.{os.getpid()}.json"):
+            continue
+        try:
+            with open(path, encoding="utf-8") as fh:
+                sources.extend(QueryShape(**item) for item in json.load(fh))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"[QUERY_STATS] {path} ilegible: {e}")
+    sources.extend(query_stats.snapshot().values())
+    for shape in sources:
+        key = shape_key(shape.sql)
+        if key in merged:
+            merged[key].merge(shape)
+        else:
+            merged[key] = shape
+    return sorted(merged.values(), key=lambda s: -s.total_ms)
+
+
+def init_app(app: Flask) -> None:
+    """Instrumentar los engines (primaria y réplica) si QUERY_STATS_ENABLED"""
+    if not app.config["QUERY_STATS_ENABLED"]:
+        return
+    query_stats.max_shapes = app.config["QUERY_STATS_MAX_SHAPES"]
+    dump_dir = app.config["QUERY_STATS_DIR"]
+    with app.app_context():
+        for engine in db.engines.values():
+            _attach(engine, dump_dir, app.config["QUERY_STATS_DUMP_SECONDS"])
+    atexit.register(dump, dump_dir)
+    logger.info(f"[QUERY_STATS] Instrumentación activa (volcado en {dump_dir})")
+
+
+# ==================== ÍNDICES ====================
+
+@dataclass
+class IndexInfo:
+    name: str
+    table: str
+    columns: List[str]
+    unique: bool = False
+    predicate: Optional[str] = None
+    constraint: bool = False  # PK / UNIQUE: no se propone eliminarlo
+
+
+@dataclass
+class Proposal:
+    name: str
+    table: str
+    columns: List[str]
+    include: List[str] = field(default_factory=list)
+    where: Optional[str] = None
+    reason: str = ""
+    shapes: List[str] = field(default_factory=list)
+
+    def ddl(self, dialect: str) -> str:
+        pg = dialect == "postgresql"
+        statement = (f"CREATE INDEX {'CONCURRENTLY ' if pg else ''}IF NOT EXISTS {self.name} "
+                     f"ON {self.table} ({', '.join(self.columns)})")
+        if self.include and pg:
+            statement += f" INCLUDE ({', '.join(self.include)})"
+        if self.where:
+            statement += f" WHERE {self.where}"
+        return statement
+
+
+@dataclass
+class Finding:
+    """Índice existente que conviene revisar (redundante o de baja selectividad)"""
+    index: str
+    table: str
+    reason: str
+    redundant: bool = False  # se puede eliminar sin perder planes (otro índice lo contiene)
+
+    def ddl(self, dialect: str) -> str:
+        return f"DROP INDEX {'CONCURRENTLY ' if dialect == 'postgresql' else ''}IF EXISTS {self.index}"
+
+
+def existing_indexes(engine: Engine) -> Dict[str, List[IndexInfo]]:
+    """Índices reales por tabla: PK, UNIQUE e índices (con su predicado si son parciales)"""
+    inspector = inspect(engine)
+    result: Dict[str, List[IndexInfo]] = {}
+    for table in inspector.get_table_names():
+        found: List[IndexInfo] = []
+        pk = inspector.get_pk_constraint(table)
+        if pk.get("constrained_columns"):
+            found.append(IndexInfo(pk.get("name") or f"{table}_pkey", table, pk["constrained_columns"],
+                                   unique=True, constraint=True))
+        for unique in inspector.get_unique_constraints(table):
+            found.append(IndexInfo(unique.get("name") or "", table, unique["column_names"],
+                                   unique=True, constraint=True))
+        for index in inspector.get_indexes(table):
+            if index.get("duplicates_constraint") or not index.get("column_names") or None in index["column_names"]:
+                continue
+            options = index.get("dialect_options", {})
+            predicate = options.get("postgresql_where") or options.get("sqlite_where")
+            if predicate is None and engine.dialect.name == "sqlite":
+                predicate = _sqlite_predicate(engine, index["name"])
+            found.append(IndexInfo(index["name"], table, index["column_names"], bool(index.get("unique")),
+                                   str(predicate) if predicate is not None else None))
+        result[table] = found
+    return result
+
+
+def _sqlite_predicate(engine: Engine, name: str) -> Optional[str]:
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :name"),
+                           {"name": name}).scalar()
+    match = re.search(r"\bWHERE\b(.+)$", sql or "", re.IGNORECASE | re.DOTALL)
+    return match.group(1).strip() if match else None
+
+
+def _fixed_by_predicate(predicate: str, shape: QueryShape) -> Optional[set]:
+    """Columnas de igualdad que el predicado parcial ya fija; None si el índice no aplica a la forma"""
+    normalized = predicate.replace('"', "").lower()
+    fixed = set()
+    for column, values in shape.constants.items():
+        if len(values) == 1 and re.search(rf"\b{column}\b\s*=\s*'?{re.escape(str(values[0]).lower())}'?", normalized):
+            fixed.add(column)
+    for column in shape.equality:
+        if re.search(rf"\b{column}\b\s+is\s+not\s+null", normalized):
+            fixed.add(f"{column}:not_null")
+    return fixed or None
+
+
+def serves(index: IndexInfo, shape: QueryShape) -> bool:
+    """El índice resuelve todos los filtros de igualdad de la forma (y el primer rango/orden si no hay filtros)"""
+    fixed: set = set()
+    if index.predicate:
+        fixed = _fixed_by_predicate(index.predicate, shape)
+        if fixed is None:
+            return False
+    required = [c for c in shape.equality if c not in fixed]
+    if not required and not fixed:
+        leading = (shape.ranges or shape.order_by)[:1]
+        return bool(leading) and index.columns[:1] == leading
+    return set(index.columns[:len(required)]) == set(required)
+
+
+def _literal(value) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _propose(shape: QueryShape) -> Optional[Proposal]:
+    partial = {c: v[0] for c, v in shape.constants.items() if len(v) == 1 and c in shape.equality}
+    key = [c for c in shape.equality if c not in partial]
+    trailing = shape.ranges[:1] or [c for c in shape.order_by if c not in key]
+    key += [c for c in trailing if c not in key]
+    if not key:
+        return None
+    include = []
+    if not shape.is_count and "*" not in shape.selected:
+        include = [c for c in shape.selected if c not in key]
+        if len(include) > MAX_INCLUDE_COLUMNS:
+            include = []
+    where = " AND ".join(f"{c} = {_literal(v)}" for c, v in partial.items()) or None
+    suffix = "".join(f"_{re.sub(r'[^a-z0-9]+', '', str(v).lower())}" for v in partial.values())
+    name = f"idx_{shape.table}_{'_'.join(key)}{suffix}"[:63]
+    reason = "igualdad " + ", ".join(shape.equality)
+    if trailing:
+        reason += f"; {'rango' if shape.ranges else 'orden'} {', '.join(trailing)}"
+    if where:
+        reason += f"; parcial: siempre {where}"
+    return Proposal(name, shape.table, key, include, where, reason)
+
+
+def _single_column_concern(engine: Engine, index: IndexInfo) -> Optional[str]:
+    """Índice de una columna poco útil: pocos valores distintos o casi todo NULL (estadísticas de Postgres)"""
+    table = db.metadata.tables.get(index.table)
+    column = table.c.get(index.columns[0]) if table is not None else None
+    if column is not None and _low_cardinality(column):
+        return LOW_SELECTIVITY
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        stats = conn.execute(text(
+            "SELECT s.n_distinct, s.null_frac, c.reltuples FROM pg_stats s "
+            "JOIN pg_class c ON c.relname = s.tablename AND c.relnamespace = current_schema()::regnamespace "
+            "WHERE s.schemaname = current_schema() AND s.tablename = :table AND s.attname = :column"
+        ), {"table": index.table, "column": index.columns[0]}).first()
+    # En tablas chicas las estadísticas no son representativas
+    if stats is None or stats.reltuples < PG_MIN_ROWS:
+        return None
+    if 0 < stats.n_distinct <= PG_LOW_DISTINCT:
+        return LOW_SELECTIVITY
+    if stats.null_frac >= PG_MOSTLY_NULL:
+        return (f"{stats.null_frac:.0%} NULL: un índice parcial WHERE {index.columns[0]} IS NOT NULL "
+                "sería mucho más chico")
+    return None
+
+
+def advise(shapes: List[QueryShape], engine: Optional[Engine] = None, min_calls: int = 1) -> Dict[str, List]:
+    """Propuestas de índices para las formas sin índice adecuado y hallazgos sobre los existentes"""
+    engine = engine or db.engine
+    indexes = existing_indexes(engine)
+    proposals: Dict[str, Proposal] = {}
+    for shape in shapes:
+        if not shape.table or shape.table not in indexes or shape.calls < min_calls:
+            continue
+        if not shape.equality and not shape.ranges and not shape.order_by:
+            continue
+        if any(serves(index, shape) for index in indexes[shape.table]):
+            continue
+        proposal = _propose(shape)
+        if proposal is None:
+            continue
+        existing = proposals.setdefault(proposal.name, proposal)
+        existing.shapes.append(shape_key(shape.sql)[:160])
+
+    findings: List[Finding] = []
+    for table, table_indexes in indexes.items():
+        for index in table_indexes:
+            if index.constraint or index.predicate:
+                continue
+            wider = next((other for other in table_indexes if other is not index and not other.predicate
+                          and len(other.columns) > len(index.columns)
+                          and other.columns[:len(index.columns)] == index.columns), None)
+            if wider is not None and not index.unique:
+                findings.append(Finding(index.name, table, f"redundante: prefijo de {wider.name} {tuple(wider.columns)}",
+                                        redundant=True))
+            elif len(index.columns) == 1:
+                concern = _single_column_concern(engine, index)
+                if concern:
+                    findings.append(Finding(index.name, table, concern))
+    return {"proposals": list(proposals.values()), "findings": findings}
+
+
+def apply(advice: Dict[str, List], engine: Optional[Engine] = None, drop: bool = True) -> List[str]:
+    """Crear los índices propuestos (y eliminar los redundantes); retorna el DDL ejecutado"""
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    statements = [p.ddl(dialect) for p in advice["proposals"]]
+    if drop:
+        statements += [f.ddl(dialect) for f in advice["findings"] if f.redundant]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+    return statements
+
+
+def explain(shape: QueryShape, engine: Optional[Engine] = None, analyze: bool = False) -> str:
+    """Plan de la forma con sus parámetros de muestra (EXPLAIN [ANALYZE] / EXPLAIN QUERY PLAN)"""
+    engine = engine or db.engine
+    if engine.dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN QUERY PLAN "
+    params = _driver_params(shape.params) if shape.params is not None else ()
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + shape.sql, params).all()
+    if engine.dialect.name == "postgresql":
+        return "\n".join(row[0] for row in rows)
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+# ==================== CLI ====================
+
+indexes_cli = AppGroup("indexes", help="Formas de consulta capturadas y revisión de índices")
+
+
+@indexes_cli.command("report")
+@click.option("--top", type=int, default=15, help="Formas a listar (por tiempo total)")
+@click.option("--min-calls", type=int, default=1, help="Ignorar formas con menos llamadas")
+@click.option("--explain", "with_plan", is_flag=True, help="Incluir EXPLAIN de cada forma")
+@click.option("--analyze", is_flag=True, help="EXPLAIN ANALYZE (ejecuta los SELECT)")
+@click.option("--json", "as_json", is_flag=True)
+def report_command(top: int, min_calls: int, with_plan: bool, analyze: bool, as_json: bool) -> None:
+    """Formas más costosas, propuestas de índices e índices a revisar"""
+    shapes = load(current_app.config["QUERY_STATS_DIR"])
+    advice = advise(shapes, min_calls=min_calls)
+    dialect = db.engine.dialect.name
+    if as_json:
+        click.echo(json.dumps({
+            "shapes": [dict(asdict(s), mean_ms=round(s.mean_ms, 3)) for s in shapes[:top]],
+            "proposals": [dict(asdict(p), ddl=p.ddl(dialect)) for p in advice["proposals"]],
+            "findings": [dict(asdict(f), ddl=f.ddl(dialect)) for f in advice["findings"]],
+        }, ensure_ascii=False, indent=2, default=str))
+        return
+    if not shapes:
+        click.echo("Sin formas capturadas (QUERY_STATS_ENABLED=true y tráfico real o scripts/index_bench.py)")
+    for shape in shapes[:top]:
+        click.echo(f"\n{shape.calls:>7} llamadas  {shape.total_ms:>9.1f} ms  media {shape.mean_ms:.2f} ms  "
+                   f"máx {shape.max_ms:.1f} ms  [{shape.table or 'join'}]")
+        click.echo(f"  {shape_key(shape.sql)[:220]}")
+        if shape.table:
+            click.echo(f"  igualdad={shape.equality} rango={shape.ranges} orden={shape.order_by} "
+                       f"{'count' if shape.is_count else f'lee={shape.selected}'} constantes={shape.constants}")
+        if with_plan or analyze:
+            try:
+                plan = explain(shape, analyze=analyze)
+            except Exception as e:
+                plan = f"(EXPLAIN falló: {e.__class__.__name__})"
+            click.echo("    " + plan.replace("\n", "\n    "))
+    click.echo("\n== Índices propuestos ==")
+    for proposal in advice["proposals"] or []:
+        click.echo(f"{proposal.ddl(dialect)};\n  -- {proposal.reason} ({len(proposal.shapes)} formas)")
+    if not advice["proposals"]:
+        click.echo("(ninguno: todas las formas tienen un índice que las resuelve)")
+    click.echo("\n== Índices a revisar ==")
+    for finding in advice["findings"]:
+        click.echo(f"{finding.ddl(dialect) + ';' if finding.redundant else finding.index}\n"
+                   f"  -- {finding.table}: {finding.reason}")
+    if not advice["findings"]:
+        click.echo("(ninguno)")
+
+
+@indexes_cli.command("reset")
+def reset_command() -> None:
+    """Descartar las formas capturadas (archivos de todos los procesos)"""
+    query_stats.reset()
+    removed = 0
+    for path in glob.glob(os.path.join(current_app.config["QUERY_STATS_DIR"], "shapes.*.json")):
+        os.remove(path)
+        removed += 1
+    click.echo(f"{removed} archivos eliminados")
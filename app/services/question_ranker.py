@@ -0,0 +1,183 @@
+"""
+Ranking local del banco de preguntas de clarificación
+Elige las preguntas del QUESTIONS_BANK que cubren los vacíos del pitch sin llamar al LLM
+"""
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.services.ai_service import IncubatorAI
+from app.services.embeddings import embed_text, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada pilar al priorizar vacíos (Golden Questions del SYSTEM_PROMPT primero:
+# dolor → problema, urgencia → mercado/nicho, transacción → ingresos)
+PILLAR_PRIORITY = {
+    "problem_statement": 3.0,
+    "target_market": 3.0,
+    "revenue_model": 3.0,
+    "value_proposition": 2.0,
+    "cost_analysis": 2.0,
+    "validation_strategy": 2.0,
+    "technical_feasibility": 1.0,
+    "risks_analysis": 1.0,
+    "scalability_potential": 1.0,
+}
+
+# Similitud coseno a partir de la cual dos preguntas se consideran la misma
+DUPLICATE_SIMILARITY = 0.6
+
+# Paráfrasis que el coseno no alcanza ("¿Cuál es tu mercado objetivo?" frente a "¿Cuál es el
+# mercado objetivo específico y su tamaño estimado?"): fracción de las palabras de contenido
+# de la pregunta más corta presentes en la otra, con un mínimo de palabras para no decidir por una
+CONTENT_OVERLAP = 0.8
+MIN_CONTENT_WORDS = 2
+
+# Palabras sin contenido (sin tildes): interrogativos, artículos, pronombres, preposiciones y verbos auxiliares
+STOPWORDS = frozenset("""
+    a al como con cual cuales cuando cuanto cuantos cuanta cuantas de del donde el ella ellos en
+    es esta este esto estas estos hay la las lo los mas mi mis o para por porque que quien quienes
+    se ser sera seran sin sobre son su sus te tiene tienes tu tus un una unos unas usaras vas y ya
+""".split())
+
+# Peso de la similitud pitch↔pregunta frente a la cobertura de vacíos
+RELEVANCE_WEIGHT = 0.5
+
+
+@lru_cache(maxsize=4)
+def _bank_matrix(bank: Tuple[str, ...]) -> Tuple[np.ndarray, Tuple[Tuple[str, ...], ...]]:
+    """Vectores y pilares del banco (calculados una sola vez por proceso)"""
+    vectors = np.vstack([embed_text(q) for q in bank])
+    pillars = tuple(tuple(IncubatorAI.detect_affected_pillars(q)) for q in bank)
+    return vectors, pillars
+
+
+def detect_gaps(raw_idea: str) -> List[str]:
+    """Pilares que el pitch no menciona, ordenados por prioridad"""
+    covered = set(IncubatorAI.detect_affected_pillars(raw_idea))
+    gaps = [field for field in IncubatorAI.PILLAR_FIELDS if field not in covered]
+    return sorted(gaps, key=lambda f: -PILLAR_PRIORITY[f])
+
+
+def content_words(text: str) -> FrozenSet[str]:
+    """Palabras de contenido normalizadas, sin stopwords y sin la "s" final del plural"""
+    words = (word for word in normalize_text(text).split() if word not in STOPWORDS)
+    return frozenset(word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words)
+
+
+def content_overlap(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Fracción de las palabras de contenido del conjunto menor presentes en el otro"""
+    shorter = min(len(a), len(b))
+    if shorter < MIN_CONTENT_WORDS:
+        return 0.0
+    return len(a & b) / shorter
+
+
+def _matches_any(vector: np.ndarray, words: FrozenSet[str], vectors: List[np.ndarray],
+                 words_list: List[FrozenSet[str]], threshold: float = DUPLICATE_SIMILARITY) -> bool:
+    """¿Es la misma pregunta que alguna previa? Por similitud vectorial o por palabras de contenido"""
+    if vectors and (np.vstack(vectors) @ vector).max() >= threshold:
+        return True
+    return any(content_overlap(words, other) >= CONTENT_OVERLAP for other in words_list)
+
+
+def is_duplicate(question: str, previous: List[str], threshold: float = DUPLICATE_SIMILARITY) -> bool:
+    """Comparar por similitud vectorial y por palabras de contenido (no por string normalizado)"""
+    if not previous:
+        return False
+    vector = embed_text(question)
+    if not vector.any():
+        return True
+    return _matches_any(vector, content_words(question), [embed_text(q) for q in previous],
+                        [content_words(q) for q in previous], threshold)
+
+
+def dedupe_questions(questions: List[str], previous: List[str] = None) -> List[str]:
+    """Eliminar preguntas vacías o casi idénticas (entre sí o respecto de previous)"""
+    kept: List[str] = []
+    vectors: List[np.ndarray] = [embed_text(q) for q in (previous or [])]
+    words_list: List[FrozenSet[str]] = [content_words(q) for q in (previous or [])]
+    for question in questions:
+        vector = embed_text(question or "")
+        if not vector.any():
+            continue
+        words = content_words(question)
+        if _matches_any(vector, words, vectors, words_list):
+            continue
+        kept.append(question)
+        vectors.append(vector)
+        words_list.append(words)
+    return kept
+
+
+def rank_bank(raw_idea: str, bank: List[str] = None, asked: List[str] = None) -> List[Tuple[str, float, Tuple[str, ...]]]:
+    """
+    Ordenar el banco por relevancia para el pitch: cobertura ponderada de vacíos
+    más similitud pitch↔pregunta. Excluye preguntas ya hechas (por similitud).
+    """
+    bank = tuple(bank or IncubatorAI.QUESTIONS_BANK)
+    vectors, pillars = _bank_matrix(bank)
+    gaps = set(detect_gaps(raw_idea))
+
+    gap_scores = np.array([sum(PILLAR_PRIORITY[p] for p in qp if p in gaps) for qp in pillars])
+    relevance = vectors @ embed_text(raw_idea)
+    scores = gap_scores + RELEVANCE_WEIGHT * relevance
+
+    asked_vectors = [embed_text(q) for q in asked or []]
+    asked_words = [content_words(q) for q in asked or []]
+    ranked = []
+    for i in np.argsort(-scores, kind="stable"):
+        if _matches_any(vectors[i], content_words(bank[i]), asked_vectors, asked_words):
+            continue
+        ranked.append((bank[i], float(scores[i]), pillars[i]))
+    return ranked
+
+
+def select_questions(raw_idea: str, num_questions: int = 3, min_coverage: float = 0.66) -> Optional[List[str]]:
+    """
+    Elegir localmente `num_questions` preguntas del banco que cubran los vacíos prioritarios.
+
+    Returns:
+        Lista de preguntas, o None si la cobertura de los vacíos más importantes
+        es baja (en ese caso conviene recurrir al LLM).
+    """
+    gaps = detect_gaps(raw_idea)
+    if not gaps:
+        return None
+
+    candidates = rank_bank(raw_idea)
+    selected: List[str] = []
+    covered = set()
+    while len(selected) < num_questions and candidates:
+        # Selección voraz: en cada paso la pregunta con mayor ganancia marginal sobre vacíos aún no cubiertos
+        def marginal(item):
+            question, score, question_pillars = item
+            base = sum(PILLAR_PRIORITY[p] for p in question_pillars if p in gaps)
+            gain = sum(PILLAR_PRIORITY[p] for p in question_pillars if p in gaps and p not in covered)
+            return gain + (score - base)
+
+        best = max(candidates, key=marginal)
+        candidates.remove(best)
+        question, _, question_pillars = best
+        if not any(p in gaps and p not in covered for p in question_pillars):
+            break
+        if is_duplicate(question, selected):
+            continue
+        selected.append(question)
+        covered.update(question_pillars)
+
+    top_gaps = gaps[:num_questions]
+    coverage = sum(PILLAR_PRIORITY[g] for g in top_gaps if g in covered) / sum(PILLAR_PRIORITY[g] for g in top_gaps)
+    if len(selected) < num_questions or coverage < min_coverage:
+        logger.info(f"[RANKER] Cobertura local baja ({coverage:.0%}, {len(selected)} preguntas): se usa LLM")
+        return None
+    return selected
+
+
+def next_unasked_question(raw_idea: str, asked: List[str]) -> Optional[str]:
+    """Mejor pregunta del banco que aún no se ha hecho (por similitud)"""
+    ranked = rank_bank(raw_idea, asked=asked)
+    return ranked[0][0] if ranked else None
@@ -0,0 +1,503 @@
+"""
+Re-evaluación por lotes de planes existentes con una nueva versión de prompt o modelo
+Al cambiar SYSTEM_PROMPT, las instrucciones o el esquema del plan, o el modelo, los
+viability_score guardados dejan de ser comparables entre sí. `flask rescore run` recorre los
+proyectos con plan (keyset por id), vuelve a generar cada plan con UN solo modelo (sin fallback:
+todos los puntajes de una versión salen del mismo modelo) y guarda el resultado en
+plan_evaluations bajo IncubatorAI.scoring_version(). El plan vigente no cambia hasta
+`flask rescore promote`, que lo reemplaza en lotes cortos.
+
+  - modo sync: llamadas concurrentes (RESCORE_CONCURRENCY) que usan a lo sumo RESCORE_RPM_SHARE
+    del RPM del modelo en este proceso, para dejar cuota al tráfico en vivo; un 429 pausa el
+    modelo y el proyecto se reintenta sin contar como fallo
+  - modo batch (Gemini con google.genai): jobs de la Batch API de RESCORE_BATCH_JOB_SIZE
+    proyectos, hasta RESCORE_MAX_BATCH_JOBS en curso; no consumen el RPM de la app
+
+Checkpoint: cada página (o job enviado/recogido) se confirma junto con el cursor y los jobs en
+curso en rescore_runs, así que una ejecución interrumpida (Ctrl-C, --max-requests,
+--max-seconds, --no-wait) se retoma con el mismo comando. Al llegar al final se repasa una vez
+desde el inicio: planes creados después en proyectos antiguos, fallidos descartados con
+--retry-failed y evaluaciones obsoletas descartadas al promover.
+
+    flask rescore run --model gemini-2.5-flash        # auto: batch si el modelo lo soporta
+    flask rescore run --mode sync --max-requests 500
+    flask rescore status
+    flask rescore promote <versión>
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, Project, BusinessPlan, ChatSession, ChatMessage, PlanEvaluation, RescoreRun
+from app.services.ai_service import IncubatorAI, QuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+# Intentos por proyecto ante errores que no son de cuota (timeouts, 5xx, JSON inválido)
+MAX_ATTEMPTS = 3
+QUOTA_POLL_SECONDS = 0.5
+PROMOTE_BATCH_SIZE = 100
+MAX_ERROR_LENGTH = 2000
+
+
+@dataclass
+class RescoreProgress:
+    """Resultado de una ejecución de `flask rescore run`"""
+    version: str
+    evaluated: int = 0
+    failed: int = 0
+    requests: int = 0
+    jobs_submitted: int = 0
+    completed: bool = False
+    stopped: Optional[str] = None  # motivo de la detención antes de terminar
+
+    def summary(self) -> str:
+        state = "completa" if self.completed else f"detenida ({self.stopped})"
+        return (f"{self.version}: {self.evaluated} evaluados, {self.failed} fallidos, {self.requests} requests, "
+                f"{self.jobs_submitted} jobs enviados; corrida {state}")
+
+
+class _Budget:
+    """Presupuesto de la ejecución (requests al modelo y tiempo), compartido entre hilos"""
+
+    def __init__(self, max_requests: Optional[int], max_seconds: Optional[float]):
+        self._lock = threading.Lock()
+        self.remaining = max_requests
+        self.used = 0
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    def exhausted(self) -> Optional[str]:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "--max-seconds"
+        if self.remaining is not None and self.remaining <= 0:
+            return "--max-requests"
+        return None
+
+    def reserve(self, count: int = 1) -> int:
+        """Reservar hasta `count` requests; retorna los concedidos (0 = presupuesto agotado)"""
+        with self._lock:
+            if self.exhausted():
+                return 0
+            granted = count if self.remaining is None else min(count, self.remaining)
+            if self.remaining is not None:
+                self.remaining -= granted
+            self.used += granted
+            return granted
+
+    def refund(self, count: int) -> None:
+        with self._lock:
+            if self.remaining is not None:
+                self.remaining += count
+            self.used -= count
+
+
+def start_run(model_name: str, mode: str) -> RescoreRun:
+    """Corrida de la versión actual del prompt con model_name (la existente se retoma)"""
+    version = IncubatorAI.scoring_version(model_name)
+    run = RescoreRun.query.filter_by(version=version).first()
+    if run is None:
+        db.session.add(RescoreRun(version=version, model=model_name, mode=mode))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # otra ejecución la creó en paralelo
+        run = RescoreRun.query.filter_by(version=version).one()
+    run.mode = mode
+    if run.status != "running":
+        run.status = "running"  # puede haber planes nuevos desde la última ejecución
+        run.finished_at = None
+    db.session.commit()
+    return run
+
+
+def _pending_page(version: str, cursor: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """(project_id, raw_idea) de proyectos con plan y sin evaluación de la versión, después del cursor"""
+    evaluated = select(PlanEvaluation.id).where(
+        PlanEvaluation.project_id == Project.id, PlanEvaluation.version == version
+    ).exists()
+    query = (
+        select(Project.id, Project.raw_idea)
+        .join(BusinessPlan, BusinessPlan.project_id == Project.id)
+        .where(~evaluated)
+        .order_by(Project.id)
+        .limit(limit)
+    )
+    if cursor is not None:
+        query = query.where(Project.id > cursor)
+    rows = [tuple(row) for row in db.session.execute(query)]
+    db.session.rollback()  # sin transacción abierta mientras se espera al modelo
+    return rows
+
+
+def _clarifications(project_ids: List[str]) -> Dict[str, str]:
+    """Conversación de clarificación por proyecto, en el mismo formato que usa la ruta del chat"""
+    rows = db.session.execute(
+        select(ChatSession.project_id, ChatMessage.role, ChatMessage.content)
+        .join(ChatMessage, ChatMessage.session_id == ChatSession.id)
+        .where(ChatSession.project_id.in_(project_ids), ChatSession.session_type == "clarification")
+        .order_by(ChatSession.project_id, ChatMessage.created_at, ChatMessage.id)
+    )
+    lines: Dict[str, List[str]] = {}
+    for project_id, role, content in rows:
+        lines.setdefault(project_id, []).append(f"{role.upper()}: {content}")
+    db.session.rollback()
+    return {project_id: "\n".join(text) for project_id, text in lines.items()}
+
+
+def _prompts(ai: IncubatorAI, rows: List[Tuple[str, str]]) -> Tuple[Dict[str, str], Dict[str, object]]:
+    """Prompts por proyecto y proyectos rechazados por la sanitización (no se envían al modelo)"""
+    contexts = _clarifications([project_id for project_id, _ in rows])
+    prompts: Dict[str, str] = {}
+    rejected: Dict[str, object] = {}
+    for project_id, raw_idea in rows:
+        try:
+            prompts[project_id] = ai.business_plan_prompt(raw_idea, contexts.get(project_id))
+        except ValueError as e:
+            rejected[project_id] = e
+    return prompts, rejected
+
+
+def _save(run: RescoreRun, results: Dict[str, object], **checkpoint) -> Tuple[int, int]:
+    """
+    Guardar resultados (plan o excepción por proyecto) y el checkpoint de la corrida en la
+    misma transacción. Retorna (evaluados, fallidos) nuevos.
+    """
+    ids = list(results)
+    existing = {
+        evaluation.project_id: evaluation
+        for evaluation in PlanEvaluation.query.filter(PlanEvaluation.version == run.version,
+                                                      PlanEvaluation.project_id.in_(ids))
+    } if ids else {}
+    previous = dict(db.session.execute(
+        select(BusinessPlan.project_id, BusinessPlan.viability_score).where(BusinessPlan.project_id.in_(ids))
+    ).all()) if ids else {}
+    evaluated = failed = 0
+    for project_id, result in results.items():
+        evaluation = existing.get(project_id)
+        was_failed = evaluation is not None and evaluation.error is not None
+        if evaluation is None:
+            evaluation = PlanEvaluation(project_id=project_id, version=run.version, model=run.model)
+            db.session.add(evaluation)
+        evaluation.previous_score = previous.get(project_id)
+        evaluation.created_at = datetime.utcnow()
+        if isinstance(result, Exception):
+            evaluation.error = f"{type(result).__name__}: {result}"[:MAX_ERROR_LENGTH]
+            failed += 0 if was_failed else 1
+            continue
+        evaluation.error = None
+        evaluation.plan = result
+        evaluation.viability_score = result.get("viability_score")
+        evaluation.recommendation = result.get("recommendation")
+        evaluation.pillar_scores = result.get("pillar_scores")
+        evaluated += 1
+        failed -= 1 if was_failed else 0
+    run.evaluated += evaluated
+    run.failed += failed
+    for name, value in checkpoint.items():
+        setattr(run, name, value)
+    db.session.commit()
+    return evaluated, failed
+
+
+def _score(ai: IncubatorAI, model_name: str, prompt: str, rpm_share: float, budget: _Budget) -> Optional[object]:
+    """Plan o excepción de un proyecto; None si se agotó el presupuesto antes de intentarlo"""
+    attempts = 0
+    while True:
+        while not ai.acquire_quota(model_name, rpm_share):
+            if budget.exhausted():
+                return None
+            time.sleep(QUOTA_POLL_SECONDS)
+        if not budget.reserve():
+            return None
+        try:
+            return ai.score_business_plan(model_name, prompt)
+        except QuotaExceeded:
+            logger.warning(f"[QUOTA] {model_name} en pausa durante la re-evaluación")
+            continue
+        except Exception as e:
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                return e
+            time.sleep(2 ** attempts)
+
+
+def _run_sync(ai: IncubatorAI, run: RescoreRun, budget: _Budget, progress: RescoreProgress) -> None:
+    config = current_app.config
+    cursor, wrapped = run.cursor, run.cursor is None
+    with ThreadPoolExecutor(max_workers=config["RESCORE_CONCURRENCY"], thread_name_prefix="rescore") as executor:
+        while True:
+            rows = _pending_page(run.version, cursor, config["RESCORE_PAGE_SIZE"])
+            if not rows:
+                if wrapped:
+                    progress.completed = True
+                    return
+                cursor, wrapped = None, True  # repaso final desde el inicio
+                continue
+            prompts, results = _prompts(ai, rows)
+            futures = {
+                executor.submit(_score, ai, run.model, prompt, config["RESCORE_RPM_SHARE"], budget): project_id
+                for project_id, prompt in prompts.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+            # El cursor avanza hasta el último proyecto sin huecos: los no intentados quedan pendientes
+            for project_id, _ in rows:
+                if results.get(project_id) is None:
+                    break
+                cursor = project_id
+            done = {project_id: result for project_id, result in results.items() if result is not None}
+            evaluated, failed = _save(run, done, cursor=cursor)
+            progress.evaluated += evaluated
+            progress.failed += failed
+            progress.requests = budget.used
+            if len(done) < len(rows):
+                progress.stopped = budget.exhausted() or "presupuesto agotado"
+                return
+
+
+def _collect_jobs(ai: IncubatorAI, run: RescoreRun, progress: RescoreProgress) -> None:
+    for job in list(run.pending_jobs or []):
+        try:
+            results = ai.collect_plan_batch(job["name"])
+        except Exception as e:
+            # Job fallido/expirado: sus proyectos quedan como fallidos (--retry-failed los reenvía)
+            logger.error(f"[RESCORE] {e}")
+            results = {}
+        if results is None:
+            continue
+        missing = Exception(f"Sin resultado en el job {job['name']}")
+        results = {project_id: results.get(project_id, missing) for project_id in job["ids"]}
+        remaining = [pending for pending in run.pending_jobs if pending["name"] != job["name"]]
+        evaluated, failed = _save(run, results, pending_jobs=remaining)
+        progress.evaluated += evaluated
+        progress.failed += failed
+        logger.info(f"[RESCORE] Job {job['name']} recogido: {evaluated} evaluados, {failed} fallidos")
+
+
+def _run_batch(ai: IncubatorAI, run: RescoreRun, budget: _Budget, progress: RescoreProgress, wait: bool) -> None:
+    config = current_app.config
+    cursor, wrapped = run.cursor, run.cursor is None
+    exhausted = False
+    while True:
+        _collect_jobs(ai, run, progress)
+        while not exhausted and len(run.pending_jobs or []) < config["RESCORE_MAX_BATCH_JOBS"]:
+            size = budget.reserve(config["RESCORE_BATCH_JOB_SIZE"])
+            if not size:
+                progress.stopped = budget.exhausted()
+                break
+            page = _pending_page(run.version, cursor, size)
+            if not page:
+                budget.refund(size)
+                if not wrapped:
+                    cursor, wrapped = None, True
+                    continue
+                exhausted = True
+                break
+            cursor = page[-1][0]
+            # Los proyectos de jobs en curso aún no tienen evaluación: no reenviarlos en el repaso
+            in_flight = {project_id for job in run.pending_jobs or [] for project_id in job["ids"]}
+            rows = [row for row in page if row[0] not in in_flight]
+            budget.refund(size - len(rows))
+            if not rows:
+                continue
+            prompts, rejected = _prompts(ai, rows)
+            jobs = list(run.pending_jobs or [])
+            if prompts:
+                name = ai.submit_plan_batch(run.model, prompts, f"rescore {run.version}")
+                jobs.append({"name": name, "ids": list(prompts)})
+                progress.jobs_submitted += 1
+                progress.requests += len(prompts)
+            _, failed = _save(run, rejected, cursor=cursor, pending_jobs=jobs)
+            progress.failed += failed
+
+        if not run.pending_jobs:
+            progress.completed = exhausted
+            return
+        if not wait:
+            progress.stopped = f"{len(run.pending_jobs)} jobs en curso (--no-wait)"
+            return
+        if budget.deadline is not None and time.monotonic() >= budget.deadline:
+            progress.stopped = "--max-seconds"
+            return
+        time.sleep(config["RESCORE_POLL_SECONDS"])
+
+
+def discard_failed(version: str) -> int:
+    """Borrar las evaluaciones fallidas de la versión: el próximo repaso las vuelve a intentar"""
+    with db.engine.begin() as conn:
+        deleted = conn.execute(
+            delete(PlanEvaluation).where(PlanEvaluation.version == version, PlanEvaluation.error.isnot(None))
+        ).rowcount
+    run = RescoreRun.query.filter_by(version=version).first()
+    if run is not None:
+        run.failed = max(0, run.failed - deleted)
+        run.cursor = None
+        db.session.commit()
+    return deleted
+
+
+def rescore(model_name: str, mode: str = "auto", retry_failed: bool = False, max_requests: Optional[int] = None,
+            max_seconds: Optional[float] = None, wait: bool = True) -> RescoreProgress:
+    """Ejecutar (o retomar) la re-evaluación de la versión actual del prompt con model_name"""
+    ai = IncubatorAI(current_app.config["GEMINI_API_KEY"])
+    if mode == "auto":
+        mode = "batch" if ai.supports_batch(model_name) else "sync"
+    elif mode == "batch" and not ai.supports_batch(model_name):
+        raise ValueError(f"{model_name} no admite la Batch API (requiere google.genai y un modelo Gemini)")
+    run = start_run(model_name, mode)
+    if retry_failed:
+        logger.info(f"[RESCORE] {discard_failed(run.version)} evaluaciones fallidas se reintentarán")
+    progress = RescoreProgress(version=run.version)
+    budget = _Budget(max_requests, max_seconds)
+    started = time.monotonic()
+    # Jobs de una ejecución anterior en modo batch se recogen aunque ahora se use sync
+    if run.pending_jobs and mode == "sync":
+        _collect_jobs(ai, run, progress)
+    if mode == "batch":
+        _run_batch(ai, run, budget, progress, wait)
+    else:
+        _run_sync(ai, run, budget, progress)
+    if progress.completed and not run.pending_jobs:
+        run.status = "completed"
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+    logger.info(f"[RESCORE] {progress.summary()} en {time.monotonic() - started:.1f}s")
+    return progress
+
+
+def promote(version: str, batch_size: int = PROMOTE_BATCH_SIZE, force: bool = False) -> Dict[str, int]:
+    """
+    Reemplazar los planes vigentes por las evaluaciones de la versión, en lotes cortos (el
+    tráfico en vivo solo espera por las filas del lote). Una evaluación anterior a la última
+    actualización del plan (p.ej. pilares regenerados en el chat) es obsoleta: se descarta y el
+    próximo `flask rescore run` la vuelve a evaluar.
+    """
+    run = RescoreRun.query.filter_by(version=version).first()
+    if run is None:
+        raise ValueError(f"No hay corrida para la versión {version}")
+    if run.status == "running" and not force:
+        raise ValueError(f"La corrida {version} no terminó ({run.evaluated} evaluados): usar --force para promover igual")
+
+    counts = {"promoted": 0, "stale": 0}
+    last_id = None
+    while True:
+        query = PlanEvaluation.query.filter(PlanEvaluation.version == version, PlanEvaluation.error.is_(None))
+        if last_id is not None:
+            query = query.filter(PlanEvaluation.project_id > last_id)
+        evaluations = query.order_by(PlanEvaluation.project_id).limit(batch_size).all()
+        if not evaluations:
+            break
+        last_id = evaluations[-1].project_id
+        plans = {plan.project_id: plan for plan in BusinessPlan.query.filter(
+            BusinessPlan.project_id.in_([evaluation.project_id for evaluation in evaluations]))}
+        for evaluation in evaluations:
+            plan = plans.get(evaluation.project_id)
+            if plan is None or plan.scoring_version == version:
+                continue
+            if plan.updated_at and evaluation.created_at and plan.updated_at > evaluation.created_at:
+                db.session.delete(evaluation)
+                counts["stale"] += 1
+                continue
+            sources = plan.pillar_sources
+            plan.apply_plan(evaluation.plan)
+            plan.pillar_sources = sources  # mismos turnos del usuario: se conserva la trazabilidad
+            plan.scoring_version = version
+            counts["promoted"] += 1
+        db.session.commit()
+
+    if counts["stale"]:
+        run.evaluated = max(0, run.evaluated - counts["stale"])
+        run.status = "running"
+        run.cursor = None
+    else:
+        run.status = "promoted"
+        run.promoted_at = datetime.utcnow()
+    db.session.commit()
+    logger.info(f"[RESCORE] Versión {version}: {counts['promoted']} planes promovidos, {counts['stale']} obsoletos")
+    return counts
+
+
+def runs_summary() -> List[Dict]:
+    """Corridas con su avance y la deriva de puntajes respecto del plan vigente al evaluar"""
+    drift = {
+        version: (count, mean_delta, mean_abs_delta)
+        for version, count, mean_delta, mean_abs_delta in db.session.execute(
+            select(PlanEvaluation.version, func.count(),
+                   func.avg(PlanEvaluation.viability_score - PlanEvaluation.previous_score),
+                   func.avg(func.abs(PlanEvaluation.viability_score - PlanEvaluation.previous_score)))
+            .where(PlanEvaluation.error.is_(None))
+            .group_by(PlanEvaluation.version)
+        )
+    }
+    summary = []
+    for run in RescoreRun.query.order_by(RescoreRun.started_at.desc()):
+        count, mean_delta, mean_abs_delta = drift.get(run.version, (0, None, None))
+        summary.append({
+            "version": run.version, "model": run.model, "mode": run.mode, "status": run.status,
+            "evaluated": run.evaluated, "failed": run.failed, "pending_jobs": len(run.pending_jobs or []),
+            "mean_delta": round(float(mean_delta), 1) if mean_delta is not None else None,
+            "mean_abs_delta": round(float(mean_abs_delta), 1) if mean_abs_delta is not None else None,
+            "started_at": run.started_at, "updated_at": run.updated_at,
+        })
+    return summary
+
+
+# ==================== CLI ====================
+
+rescore_cli = AppGroup("rescore", help="Re-evaluación por lotes de planes con una nueva versión de prompt/modelo")
+
+
+@rescore_cli.command("run")
+@click.option("--model", default=IncubatorAI.MODEL_PRIORITY[0], show_default=True,
+              help="modelo único para toda la versión")
+@click.option("--mode", type=click.Choice(["auto", "sync", "batch"]), default="auto", show_default=True)
+@click.option("--retry-failed", is_flag=True, help="volver a intentar las evaluaciones fallidas")
+@click.option("--max-requests", type=int, help="requests al modelo en esta ejecución (cuota diaria)")
+@click.option("--max-seconds", type=float, help="detenerse tras este tiempo (se retoma después)")
+@click.option("--no-wait", is_flag=True, help="modo batch: enviar/recoger jobs y salir sin esperar")
+def run_command(model: str, mode: str, retry_failed: bool, max_requests: Optional[int],
+                max_seconds: Optional[float], no_wait: bool) -> None:
+    """Evaluar los planes pendientes de la versión actual (retoma la corrida existente)"""
+    try:
+        progress = rescore(model, mode, retry_failed, max_requests, max_seconds, wait=not no_wait)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(progress.summary())
+
+
+@rescore_cli.command("status")
+def status_command() -> None:
+    """Corridas por versión: avance, jobs en curso y deriva media de los puntajes"""
+    click.echo(f"Versión actual ({IncubatorAI.MODEL_PRIORITY[0]}): "
+               f"{IncubatorAI.scoring_version(IncubatorAI.MODEL_PRIORITY[0])}")
+    for run in runs_summary():
+        drift = "" if run["mean_delta"] is None else \
+            f", deriva media {run['mean_delta']:+.1f} (|{run['mean_abs_delta']:.1f}|)"
+        click.echo(f"  {run['version']} [{run['mode']}] {run['status']}: {run['evaluated']} evaluados, "
+                   f"{run['failed']} fallidos, {run['pending_jobs']} jobs en curso{drift}")
+
+
+@rescore_cli.command("promote")
+@click.argument("version")
+@click.option("--batch-size", type=int, default=PROMOTE_BATCH_SIZE, show_default=True)
+@click.option("--force", is_flag=True, help="promover aunque la corrida no haya terminado")
+def promote_command(version: str, batch_size: int, force: bool) -> None:
+    """Reemplazar los planes vigentes por las evaluaciones de VERSION"""
+    try:
+        counts = promote(version, batch_size, force)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{counts['promoted']} planes promovidos, {counts['stale']} evaluaciones obsoletas descartadas")
+    if counts["stale"]:
+        click.echo("Volver a ejecutar flask rescore run y promover de nuevo para completar la versión")
@@ -0,0 +1,242 @@
+"""
+Búsqueda full-text sobre proyectos y planes de negocio del usuario
+Postgres: columna projects.search_vector (tsvector, configuración 'spanish', índice GIN
+idx_projects_search) con pesos título A, idea B y plan C. SQLite (desarrollo): tabla virtual
+FTS5 projects_fts. search_projects() abstrae ambos motores y devuelve resultados ordenados
+por relevancia con los términos resaltados.
+
+El índice se mantiene en la misma transacción que la escritura: al insertar o modificar el
+título/idea de un Project o el texto de su BusinessPlan se recalcula la entrada del proyecto.
+Los borrados por ORM (y la purga GDPR vía remove_projects) eliminan la entrada.
+
+    flask search reindex    # reconstruir el índice completo (backfill)
+"""
+from typing import Iterable, List, NamedTuple, Optional
+import logging
+import re
+import time
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, event, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from app.models import db, Project, BusinessPlan
+
+logger = logging.getLogger(__name__)
+
+PG_TEXT_CONFIG = "spanish"
+PLAN_TEXT_FIELDS = BusinessPlan.PILLAR_FIELDS + ("overall_assessment",)
+# Delimitadores de resaltado: caracteres de control que no aparecen en el texto del usuario;
+# tras escapar el HTML se reemplazan por <mark>
+_HL_START, _HL_STOP = "\x02", "\x03"
+MAX_QUERY_LENGTH = 200
+REINDEX_BATCH_SIZE = 500
+
+_PLAN_TEXT_SQL = "concat_ws(' ', " + ", ".join(f"nullif(bp.{field}, '')" for field in PLAN_TEXT_FIELDS) + ")"
+
+_PG_REINDEX = text(f"""
+    UPDATE projects SET search_vector =
+        setweight(to_tsvector('{PG_TEXT_CONFIG}', coalesce(projects.title, '')), 'A') ||
+        setweight(to_tsvector('{PG_TEXT_CONFIG}', coalesce(projects.raw_idea, '')), 'B') ||
+        setweight(to_tsvector('{PG_TEXT_CONFIG}', coalesce(
+            (SELECT {_PLAN_TEXT_SQL} FROM business_plans bp WHERE bp.project_id = projects.id), ''
+        )), 'C')
+    WHERE projects.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+_PG_SEARCH = text(f"""
+    WITH query AS (SELECT websearch_to_tsquery('{PG_TEXT_CONFIG}', :q) AS q),
+    hits AS (
+        SELECT p.id, p.title, p.raw_idea, ts_rank_cd(p.search_vector, query.q) AS rank
+        FROM projects p, query
+        WHERE p.user_id = :user_id AND p.search_vector @@ query.q
+        ORDER BY rank DESC, p.updated_at DESC
+        LIMIT :limit
+    )
+    SELECT hits.id AS project_id, hits.rank,
+        ts_headline('{PG_TEXT_CONFIG}', hits.title, query.q, :title_options) AS title,
+        ts_headline('{PG_TEXT_CONFIG}', concat_ws(' … ', hits.raw_idea, nullif({_PLAN_TEXT_SQL}, '')), query.q,
+                    :snippet_options) AS snippet
+    FROM hits CROSS JOIN query
+    LEFT JOIN business_plans bp ON bp.project_id = hits.id
+    ORDER BY hits.rank DESC
+""")
+_PG_TITLE_OPTIONS = f'HighlightAll=true, StartSel="{_HL_START}", StopSel="{_HL_STOP}"'
+_PG_SNIPPET_OPTIONS = (f'StartSel="{_HL_START}", StopSel="{_HL_STOP}", MaxFragments=2, '
+                       'MinWords=6, MaxWords=18, FragmentDelimiter=" … "')
+
+_SQLITE_CREATE = text(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5("
+    "project_id UNINDEXED, user_id UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2')"
+)
+_SQLITE_SEARCH = text("""
+    SELECT project_id, -bm25(projects_fts, 0.0, 0.0, 10.0, 1.0) AS rank,
+        highlight(projects_fts, 2, char(2), char(3)) AS title,
+        snippet(projects_fts, 3, char(2), char(3), ' … ', 18) AS snippet
+    FROM projects_fts
+    WHERE projects_fts MATCH :q AND user_id = :user_id
+    ORDER BY rank DESC
+    LIMIT :limit
+""")
+
+
+class SearchHit(NamedTuple):
+    project_id: str
+    rank: float
+    title: Markup
+    snippet: Markup
+
+
+def _highlighted(value: Optional[str]) -> Markup:
+    """Texto con el HTML escapado y los términos encontrados en <mark>"""
+    escaped = str(escape(value or ""))
+    return Markup(escaped.replace(_HL_START, "<mark>").replace(_HL_STOP, "</mark>"))
+
+
+def _fts5_query(query: str) -> str:
+    """Términos como frases literales (sin sintaxis FTS5 del usuario); el último como prefijo"""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def search_projects(user_id: str, query: str, limit: int = 20, session=None) -> List[SearchHit]:
+    """Proyectos del usuario que coinciden con query, por relevancia (session: p.ej. db_routing.reader())"""
+    query = (query or "").strip()[:MAX_QUERY_LENGTH]
+    if not query:
+        return []
+    session = session or db.session
+    if session.get_bind().dialect.name == "postgresql":
+        rows = session.execute(_PG_SEARCH, {
+            "q": query, "user_id": user_id, "limit": limit,
+            "title_options": _PG_TITLE_OPTIONS, "snippet_options": _PG_SNIPPET_OPTIONS,
+        })
+    else:
+        match = _fts5_query(query)
+        if not match:
+            return []
+        rows = session.execute(_SQLITE_SEARCH, {"q": match, "user_id": user_id, "limit": limit})
+    # project_id: uuid del driver en Postgres (consulta textual, sin el tipo GUID del modelo)
+    return [SearchHit(str(row.project_id), float(row.rank), _highlighted(row.title), _highlighted(row.snippet))
+            for row in rows]
+
+
+# ==================== MANTENIMIENTO DEL ÍNDICE ====================
+
+def reindex_projects(connection: Connection, project_ids: Iterable[str]) -> None:
+    """Recalcular la entrada de cada proyecto (en la conexión/transacción de la escritura)"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+    if connection.dialect.name == "postgresql":
+        connection.execute(_PG_REINDEX, {"ids": project_ids})
+        return
+    plan_columns = [getattr(BusinessPlan, field) for field in PLAN_TEXT_FIELDS]
+    rows = connection.execute(
+        select(Project.id, Project.user_id, Project.title, Project.raw_idea, *plan_columns)
+        .outerjoin(BusinessPlan, BusinessPlan.project_id == Project.id)
+        .where(Project.id.in_(project_ids))
+    ).all()
+    _delete_fts(connection, project_ids)
+    if rows:
+        connection.execute(
+            text("INSERT INTO projects_fts (project_id, user_id, title, body) VALUES (:id, :user_id, :title, :body)"),
+            [{"id": row[0], "user_id": row[1], "title": row[2] or "",
+              "body": " ".join(part for part in row[3:] if part)} for row in rows],
+        )
+
+
+def _delete_fts(connection: Connection, project_ids: List[str]) -> None:
+    connection.execute(
+        text("DELETE FROM projects_fts WHERE project_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": project_ids},
+    )
+
+
+def remove_projects(project_ids: List[str]) -> None:
+    """
+    Quitar proyectos del índice tras un borrado masivo (purga GDPR). En Postgres el vector
+    vive en la fila de projects y desaparece con ella.
+    """
+    if project_ids and db.engine.dialect.name == "sqlite":
+        with db.engine.begin() as conn:
+            _delete_fts(conn, project_ids)
+
+
+def _changed(target, fields: Iterable[str]) -> bool:
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Project, "after_insert")
+@event.listens_for(Project, "after_update")
+def _index_project(mapper, connection, target) -> None:
+    if _changed(target, ("title", "raw_idea")):
+        reindex_projects(connection, [target.id])
+
+
+@event.listens_for(BusinessPlan, "after_insert")
+@event.listens_for(BusinessPlan, "after_update")
+def _index_plan(mapper, connection, target) -> None:
+    if _changed(target, PLAN_TEXT_FIELDS):
+        reindex_projects(connection, [target.project_id])
+
+
+@event.listens_for(BusinessPlan, "after_delete")
+def _unindex_plan(mapper, connection, target) -> None:
+    reindex_projects(connection, [target.project_id])
+
+
+@event.listens_for(Project, "after_delete")
+def _unindex_project(mapper, connection, target) -> None:
+    if connection.dialect.name == "sqlite":
+        _delete_fts(connection, [target.id])
+
+
+def init_app(app: Flask) -> None:
+    """SQLite: crear la tabla FTS5 si falta (Postgres: columna e índice vienen de migrations/006)"""
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            return
+        with db.engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'projects_fts'")).first():
+                return
+            conn.execute(_SQLITE_CREATE)
+        if inspect(db.engine).has_table("projects"):
+            rebuild()
+
+
+def rebuild(batch_size: int = REINDEX_BATCH_SIZE) -> int:
+    """Reindexar todos los proyectos por lotes de id (transacciones cortas); retorna proyectos indexados"""
+    total = 0
+    last_id = None
+    while True:
+        with db.engine.begin() as conn:
+            batch = select(Project.id).order_by(Project.id).limit(batch_size)
+            if last_id is not None:
+                batch = batch.where(Project.id > last_id)
+            ids = list(conn.execute(batch).scalars())
+            if not ids:
+                break
+            reindex_projects(conn, ids)
+        total += len(ids)
+        last_id = ids[-1]
+    return total
+
+
+# ==================== CLI ====================
+
+search_cli = AppGroup("search", help="Índice de búsqueda full-text de proyectos")
+
+
+@search_cli.command("reindex")
+@click.option("--batch-size", type=int, default=REINDEX_BATCH_SIZE)
+def reindex_command(batch_size: int) -> None:
+    """Reconstruir el índice de todos los proyectos"""
+    started = time.monotonic()
+    total = rebuild(batch_size)
+    click.echo(f"{total} proyectos indexados en {time.monotonic() - started:.1f}s")
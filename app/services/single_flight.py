@@ -0,0 +1,123 @@
+"""
+Single-flight para operaciones de IA costosas
+Requests idénticos concurrentes esperan el resultado del primero en lugar de repetir la llamada
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de sondeo de pg_try_advisory_lock
+LOCK_POLL_SECONDS = 0.2
+
+
+class _Flight:
+    """Llamada en curso: los seguidores esperan el evento y leen el resultado del líder"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+_flights: Dict[Tuple[str, str, str], _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def input_hash(*parts: str) -> str:
+    """Hash estable del input de la operación"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:32]
+
+
+def _advisory_key(scope: str, operation: str) -> int:
+    """Clave bigint (con signo) para pg_advisory_lock"""
+    digest = hashlib.blake2b(f"{scope}:{operation}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@contextmanager
+def advisory_lock(scope: str, operation: str, timeout: Optional[float] = None):
+    """
+    Lock entre workers sobre (scope, operation) con pg_advisory_lock en una conexión dedicada.
+    En motores sin advisory locks (SQLite en desarrollo/testing) es un no-op.
+
+    Raises:
+        TimeoutError: si el lock no se obtiene antes de timeout
+    """
+    if db.engine.dialect.name != "postgresql":
+        yield
+        return
+
+    key = _advisory_key(scope, operation)
+    connection = db.engine.connect()
+    try:
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar():
+            if expires_at is not None and time.monotonic() >= expires_at:
+                raise TimeoutError(f"Lock {operation} de {scope} ocupado por otro worker")
+            time.sleep(LOCK_POLL_SECONDS)
+        # El lock es de sesión: cerrar la transacción para no dejar la conexión "idle in transaction"
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            connection.commit()
+    finally:
+        connection.close()
+
+
+def do(scope: str, operation: str, payload_hash: str, fn: Callable[[], Any],
+       timeout: Optional[float] = None) -> Any:
+    """
+    Ejecutar fn una sola vez por (scope, operation, payload_hash) entre hilos del proceso;
+    entre workers, las ejecuciones de (scope, operation) se serializan con un advisory lock.
+    fn debe volver a leer el estado en BD (p.ej. si el plan ya existe) ya que otro worker
+    puede haber terminado la misma operación mientras se esperaba el lock.
+
+    Raises:
+        TimeoutError: si el resultado (o el lock) no llega antes de timeout
+    """
+    key = (scope, operation, payload_hash)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+        else:
+            flight.followers += 1
+
+    if not leader:
+        logger.info(f"[SINGLEFLIGHT] {operation} de {scope} ya en curso, esperando resultado")
+        if not flight.done.wait(timeout):
+            raise TimeoutError(f"{operation} de {scope} sigue en curso")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        with advisory_lock(scope, operation, timeout):
+            flight.result = fn()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+        if flight.followers:
+            logger.info(f"[SINGLEFLIGHT] {operation} de {scope}: {flight.followers} request(s) coalescidos")
@@ -0,0 +1,396 @@
+"""
+Generador de datos sintéticos para pruebas de escala (dashboard, chat, admin, índices)
+Llena el esquema de app/models.py con distribuciones sesgadas como las de producción:
+  - proyectos por usuario con cola de Pareto: la mayoría tiene 0-3 y unos pocos power users
+    acumulan cientos (sus dashboards y búsquedas son los casos caros)
+  - sesiones de clarificación/análisis/pivot según el estado del proyecto; una parte llega al
+    tope de MAX_CHAT_MESSAGES turnos del usuario y queda bloqueada
+  - planes de negocio para los proyectos completados y parte de los en análisis
+  - auditoría: registro, proyectos, planes y logins con cola larga (logs de miles de filas)
+Reproducible: la misma --seed y --until sobre la misma base producen las mismas filas (ids
+UUIDv7 derivados de la semilla y de created_at, textos tomados de un pool de la semilla).
+
+Carga masiva sin ORM: COPY en Postgres (psycopg2) y executemany de Core en el resto, todas
+las tablas por lotes (padres primero) en transacciones cortas. Como las inserciones no pasan
+por los eventos del ORM, al terminar se ejecuta ANALYZE y la CLI reconstruye el índice de
+búsqueda (salvo --no-search); los rollups de analítica se recalculan aparte.
+
+    flask data generate --users 100000 --seed 7      # ~13M filas
+    flask analytics refresh --full
+
+Las cuentas generadas (user<n>@synthetic.test) usan la contraseña SYNTHETIC_PASSWORD.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import io
+import json
+import logging
+import random
+import time
+import uuid
+
+import bcrypt
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Engine
+
+from app.models import db, User, BusinessPlan
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_PASSWORD = "synthetic-password"
+BATCH_SIZE = 5000
+# Ids por tabla que se conservan (muestreo uniforme) para las cargas de consultas
+SAMPLE_SIZE = 1000
+# Textos distintos por tipo; se reutilizan (generar cada texto domina el tiempo de carga)
+TEXT_POOL_SIZE = 4000
+# Padres antes que hijos
+TABLES = ("users", "projects", "business_plans", "chat_sessions", "chat_messages", "audit_logs")
+
+WORDS = (
+    "cliente", "mercado", "producto", "servicio", "ventas", "costo", "precio", "margen", "canal",
+    "proveedor", "logística", "plataforma", "aplicación", "suscripción", "comisión", "pyme",
+    "emprendimiento", "delivery", "turismo", "agrícola", "minería", "educación", "salud",
+    "energía", "solar", "reciclaje", "café", "artesanal", "orgánico", "software", "datos",
+    "inventario", "marketing", "digital", "local", "regional", "Santiago", "Valparaíso",
+    "Concepción", "competencia", "inversión", "capital", "riesgo", "crecimiento", "validación",
+    "encuesta", "piloto", "usuarios", "demanda", "oferta", "ingresos", "mensual", "anual",
+    "estrategia", "escalable", "franquicia", "exportación", "importación", "regulación",
+    "permiso", "equipo", "socio", "financiamiento", "CORFO", "subsidio", "tecnología",
+)
+STATUS_WEIGHTS = {"ambiguous": 0.15, "ready": 0.25, "in_analysis": 0.2, "completed": 0.4}
+
+
+@dataclass
+class Profile:
+    """Forma de las distribuciones; los valores por defecto imitan la base de producción"""
+    days: int = 730  # antigüedad máxima de las cuentas
+    until: Optional[datetime] = None  # fin de la actividad (por defecto, hoy a las 00:00 UTC)
+    inactive_share: float = 0.3  # cuentas que nunca crean un proyecto
+    projects_alpha: float = 1.3  # Pareto de proyectos por cuenta activa (menor = cola más pesada)
+    max_projects: int = 2000
+    capped_share: float = 0.35  # sesiones que llegan al tope de mensajes
+    pivot_share: float = 0.1  # proyectos completados con sesión de pivot
+    plan_share_in_analysis: float = 0.5
+    logins_alpha: float = 1.1  # Pareto de logins por cuenta
+    logins_scale: int = 5
+    max_logins: int = 50000
+    reset_token_share: float = 0.01
+    admin_share: float = 0.001
+    seller_share: float = 0.02
+    status_weights: Dict[str, float] = field(default_factory=lambda: dict(STATUS_WEIGHTS))
+
+
+@dataclass
+class GenerationResult:
+    """Filas insertadas por tabla y muestras de ids (users, projects, sessions, tokens)"""
+    rows: Dict[str, int]
+    seconds: float
+    samples: Dict[str, List[str]]
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+
+def _uuid7(when: datetime, rng: random.Random) -> str:
+    """UUIDv7 como models.new_id(), con timestamp y bits aleatorios reproducibles"""
+    millis = int((when - datetime(1970, 1, 1)).total_seconds() * 1000)
+    rand = rng.getrandbits(74)
+    value = ((millis & 0xFFFF_FFFF_FFFF) << 80) | (0x7 << 76) | ((rand >> 62) & 0xFFF) << 64 \
+        | (0b10 << 62) | (rand & 0x3FFF_FFFF_FFFF_FFFF)
+    return str(uuid.UUID(int=value))
+
+
+def _rut(number: int) -> str:
+    """RUT chileno con dígito verificador (módulo 11)"""
+    total, factor = 0, 2
+    for digit in reversed(str(number)):
+        total += int(digit) * factor
+        factor = 2 if factor == 7 else factor + 1
+    check = 11 - total % 11
+    return f"{number}-{'0' if check == 11 else 'K' if check == 10 else check}"
+
+
+def _copy_value(value: Any) -> str:
+    """Valor en el formato de texto de COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_supported(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+
+
+def _write_copy(engine: Engine, batches: Dict[str, List[dict]]) -> None:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for name, rows in batches.items():
+            columns = list(rows[0])
+            buffer = io.StringIO("".join("\t".join(_copy_value(row[c]) for c in columns) + "\n" for row in rows))
+            cursor.copy_expert(f"COPY {name} ({', '.join(columns)}) FROM STDIN", buffer)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def _write_executemany(engine: Engine, batches: Dict[str, List[dict]]) -> None:
+    with engine.begin() as conn:
+        for name, rows in batches.items():
+            conn.execute(db.metadata.tables[name].insert(), rows)
+
+
+class _Generator:
+    """Estado de una generación: RNG, lotes pendientes, conteos y muestras"""
+
+    def __init__(self, engine: Engine, seed: int, offset: int, profile: Profile, max_messages: int,
+                 batch_size: int, progress: Optional[Callable[[Dict[str, int]], None]]):
+        self.engine = engine
+        # La posición de inicio entra en la semilla: volver a generar sobre la misma base no repite ids
+        self.rng = random.Random(f"synthetic:{seed}:{offset}")
+        self.sample_rng = random.Random(f"synthetic-sample:{seed}:{offset}")
+        self.offset = offset
+        self.profile = profile
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.progress = progress
+        self.write = _write_copy if _copy_supported(engine) else _write_executemany
+        # Fecha fija, no el reloj: la misma semilla genera las mismas filas durante todo el día
+        self.now = profile.until or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        self.pending: Dict[str, List[dict]] = {name: [] for name in TABLES}
+        self.rows: Dict[str, int] = {name: 0 for name in TABLES}
+        self.samples: Dict[str, List[str]] = {"users": [], "projects": [], "sessions": [], "tokens": []}
+        self._seen: Dict[str, int] = {}
+        self.password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode("utf-8"),
+                                           bcrypt.gensalt(rounds=12)).decode("utf-8")
+        self.questions = [self._sentence(8, 25) + "?" for _ in range(TEXT_POOL_SIZE)]
+        self.answers = [self._sentence(5, 60) + "." for _ in range(TEXT_POOL_SIZE)]
+        self.paragraphs = [self._sentence(30, 90) + "." for _ in range(TEXT_POOL_SIZE)]
+
+    def _sentence(self, shortest: int, longest: int) -> str:
+        words = self.rng.choices(WORDS, k=self.rng.randint(shortest, longest))
+        return " ".join(words).capitalize()
+
+    def _sample(self, key: str, value: str) -> None:
+        """Reservoir sampling: muestra uniforme sin guardar todos los ids"""
+        seen = self._seen[key] = self._seen.get(key, 0) + 1
+        bucket = self.samples[key]
+        if len(bucket) < SAMPLE_SIZE:
+            bucket.append(value)
+        else:
+            slot = self.sample_rng.randrange(seen)
+            if slot < SAMPLE_SIZE:
+                bucket[slot] = value
+
+    def _between(self, start: datetime, end: datetime) -> datetime:
+        return start + timedelta(seconds=int((end - start).total_seconds() * self.rng.random()))
+
+    def _add(self, table: str, row: dict) -> None:
+        self.pending[table].append(row)
+
+    def flush(self, force: bool = False) -> None:
+        # Todas las tablas a la vez, padres primero (las FKs se verifican por sentencia)
+        if not force and max(len(rows) for rows in self.pending.values()) < self.batch_size:
+            return
+        batches = {name: rows for name, rows in self.pending.items() if rows}
+        if not batches:
+            return
+        self.write(self.engine, batches)
+        for name, rows in batches.items():
+            self.rows[name] += len(rows)
+        self.pending = {name: [] for name in TABLES}
+        if self.progress:
+            self.progress(dict(self.rows))
+
+    def _audit(self, user_id: str, action: str, resource_type: str, resource_id: Optional[str],
+               when: datetime) -> None:
+        self._add("audit_logs", {
+            "id": _uuid7(when, self.rng), "user_id": user_id, "action": action, "resource_type": resource_type,
+            "resource_id": resource_id, "consent_given": True, "ip_address": None, "user_agent": None,
+            "created_at": when,
+        })
+
+    def user(self, number: int) -> None:
+        rng, profile = self.rng, self.profile
+        # Cuentas más recientes más frecuentes (crecimiento)
+        created = self.now - timedelta(seconds=int(profile.days * 86400 * rng.random() ** 2))
+        user_id = _uuid7(created, rng)
+        token = str(uuid.UUID(int=rng.getrandbits(128), version=4)) if rng.random() < profile.reset_token_share else None
+        draw = rng.random()
+        role = "admin" if draw < profile.admin_share else "seller" if draw < profile.admin_share + profile.seller_share \
+            else "user"
+        self._add("users", {
+            "id": user_id, "email": f"user{number}@synthetic.test", "password_hash": self.password_hash,
+            "rut": _rut(10_000_000 + number), "first_name": "Usuario", "last_name": f"Sintético {number}",
+            "age": rng.randint(18, 75), "city": rng.choice(("Santiago", "Valparaíso", "Concepción", "Temuco",
+                                                             "Antofagasta", "La Serena")),
+            "role": role, "created_at": created, "last_project_creation": None, "is_active": rng.random() > 0.02,
+            "reset_token": token, "reset_token_expiry": self.now + timedelta(hours=1) if token else None,
+            "consent_given": True, "consent_timestamp": created, "consent_ip": "127.0.0.1", "consent_version": "1.0",
+            "scheduled_deletion": None,
+        })
+        self._sample("users", user_id)
+        if token:
+            self._sample("tokens", token)
+        self._audit(user_id, "user_registration", "user", user_id, created)
+
+        logins = min(profile.max_logins, int(profile.logins_scale * rng.paretovariate(profile.logins_alpha)))
+        for _ in range(logins):
+            self._audit(user_id, "login", "user", user_id, self._between(created, self.now))
+
+        if rng.random() >= profile.inactive_share:
+            projects = min(profile.max_projects, int(rng.paretovariate(profile.projects_alpha)))
+            for _ in range(projects):
+                self.project(user_id, self._between(created, self.now))
+        self.flush()
+
+    def project(self, user_id: str, created: datetime) -> None:
+        rng, profile = self.rng, self.profile
+        project_id = _uuid7(created, rng)
+        status = rng.choices(list(profile.status_weights), weights=list(profile.status_weights.values()))[0]
+        self._add("projects", {
+            "id": project_id, "user_id": user_id, "title": self._sentence(2, 6), "raw_idea": rng.choice(self.paragraphs),
+            "variability_score": round(rng.uniform(0, 100), 1), "requires_clarification": True, "status": status,
+            "created_at": created, "updated_at": created,
+        })
+        self._sample("projects", project_id)
+        self._audit(user_id, "create_project", "project", project_id, created)
+
+        at = created + timedelta(seconds=rng.randint(1, 120))
+        types = ["clarification"]
+        if status in ("in_analysis", "completed"):
+            types.append("analysis")
+        if status == "completed" and rng.random() < profile.pivot_share:
+            types.append("pivot")
+        for session_type in types:
+            at = self.session(project_id, session_type, at)
+
+        if status == "completed" or (status == "in_analysis" and rng.random() < profile.plan_share_in_analysis):
+            self.plan(user_id, project_id, at)
+
+    def session(self, project_id: str, session_type: str, created: datetime) -> datetime:
+        """Sesión con sus mensajes (pregunta del asistente + respuesta); retorna el último instante"""
+        rng = self.rng
+        capped = rng.random() < self.profile.capped_share
+        turns = self.max_messages if capped else rng.randint(1, max(1, self.max_messages - 1))
+        session_id = _uuid7(created, rng)
+        at = created
+        for _ in range(turns):
+            at += timedelta(seconds=rng.randint(2, 30))
+            self._add("chat_messages", {"id": _uuid7(at, rng), "session_id": session_id, "role": "assistant",
+                                        "content": rng.choice(self.questions), "created_at": at})
+            at += timedelta(seconds=rng.randint(15, 600))
+            self._add("chat_messages", {"id": _uuid7(at, rng), "session_id": session_id, "role": "user",
+                                        "content": rng.choice(self.answers), "created_at": at})
+        self._add("chat_sessions", {
+            "id": session_id, "project_id": project_id, "session_type": session_type, "message_count": turns,
+            "is_locked": capped, "created_at": created, "updated_at": at,
+        })
+        self._sample("sessions", session_id)
+        return at
+
+    def plan(self, user_id: str, project_id: str, generated: datetime) -> None:
+        rng = self.rng
+        score = round(100 * rng.betavariate(5, 3), 1)
+        recommendation = "viable" if score >= 65 else "needs_pivot" if score >= 40 else "not_viable"
+        plan_id = _uuid7(generated, rng)
+        row = {"id": plan_id, "project_id": project_id}
+        row.update({name: rng.choice(self.paragraphs) for name in BusinessPlan.PILLAR_FIELDS})
+        row.update({
+            "overall_assessment": rng.choice(self.paragraphs), "viability_score": score,
+            "recommendation": recommendation,
+            "pillar_scores": {name: round(rng.uniform(20, 95), 1) for name in BusinessPlan.PILLAR_FIELDS},
+            "pillar_sources": None, "generated_at": generated, "updated_at": generated,
+        })
+        self._add("business_plans", row)
+        self._audit(user_id, "generate_plan", "business_plan", plan_id, generated)
+
+
+def estimate_rows(users: int, profile: Optional[Profile] = None, max_messages: int = 10) -> int:
+    """Orden de magnitud de las filas a insertar (medias de las distribuciones, cola truncada)"""
+    profile = profile or Profile()
+    projects = (1 - profile.inactive_share) * profile.projects_alpha / (profile.projects_alpha - 1)
+    weights = profile.status_weights
+    sessions = 1 + weights["in_analysis"] + weights["completed"] * (1 + profile.pivot_share)
+    turns = profile.capped_share * max_messages + (1 - profile.capped_share) * max_messages / 2
+    logins = profile.logins_scale * min(profile.logins_alpha / (profile.logins_alpha - 1), 20)
+    per_project = 2 + sessions * (1 + 2 * turns) + 2 * (weights["completed"] + weights["in_analysis"] / 2)
+    return int(users * (2 + logins + projects * per_project))
+
+
+def generate(users: int, seed: int = 0, profile: Optional[Profile] = None, batch_size: int = BATCH_SIZE,
+             progress: Optional[Callable[[Dict[str, int]], None]] = None) -> GenerationResult:
+    """
+    Insertar `users` cuentas sintéticas con sus proyectos, planes, sesiones, mensajes y
+    auditoría (requiere app context). Se puede ejecutar varias veces sobre la misma base:
+    la numeración continúa desde las cuentas existentes.
+    """
+    started = time.monotonic()
+    offset = db.session.execute(select(func.count()).select_from(User)).scalar()
+    db.session.rollback()
+    generator = _Generator(db.engine, seed, offset, profile or Profile(),
+                           current_app.config["MAX_CHAT_MESSAGES"], batch_size, progress)
+    for number in range(offset, offset + users):
+        generator.user(number)
+    generator.flush(force=True)
+
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in TABLES:
+            conn.execute(text(f"ANALYZE {name}"))
+    result = GenerationResult(generator.rows, time.monotonic() - started, generator.samples)
+    logger.info(f"[SYNTH_DATA] {result.total_rows} filas en {result.seconds:.1f}s (seed {seed}, desde user{offset})")
+    return result
+
+
+# ==================== CLI ====================
+
+data_cli = AppGroup("data", help="Datos sintéticos para pruebas de escala")
+
+
+@data_cli.command("generate")
+@click.option("--users", type=int, default=10000, help="cuentas a generar (≈130 filas por cuenta)")
+@click.option("--seed", type=int, default=0)
+@click.option("--days", type=int, default=Profile.days, help="antigüedad máxima de las cuentas")
+@click.option("--until", type=click.DateTime(), help="fin de la actividad generada (por defecto hoy)")
+@click.option("--batch-size", type=int, default=BATCH_SIZE, help="filas por tabla en cada COPY/executemany")
+@click.option("--no-search", is_flag=True, help="no reconstruir el índice de búsqueda al terminar")
+@click.option("--yes", is_flag=True, help="no pedir confirmación")
+def generate_command(users: int, seed: int, days: int, until: Optional[datetime], batch_size: int,
+                     no_search: bool, yes: bool) -> None:
+    """Llenar la base con cuentas sintéticas y su actividad"""
+    profile = Profile(days=days, until=until)
+    estimate = estimate_rows(users, profile, current_app.config["MAX_CHAT_MESSAGES"])
+    target = db.engine.url.render_as_string(hide_password=True)
+    if not yes:
+        click.confirm(f"Insertar ~{estimate:,} filas sintéticas en {target}?", abort=True)
+
+    started = time.monotonic()
+
+    def report(rows: Dict[str, int]) -> None:
+        total = sum(rows.values())
+        click.echo(f"\r{rows['users']:,} cuentas, {total:,} filas "
+                   f"({total / max(time.monotonic() - started, 1e-6):,.0f} filas/s)", nl=False)
+
+    result = generate(users, seed, profile, batch_size, progress=report)
+    click.echo()
+    for name, count in result.rows.items():
+        click.echo(f"  {name:<16} {count:>12,}")
+    click.echo(f"{result.total_rows:,} filas en {result.seconds:.1f}s")
+    if not no_search:
+        from app.services import search
+        click.echo(f"{search.rebuild():,} proyectos indexados para búsqueda")
+    click.echo("Rollups de analítica: flask analytics refresh --full")
@@ -0,0 +1,170 @@
+"""
+Cache de identidad para Flask-Login
+El user_loader corre en cada request autenticado (páginas y AJAX) solo para exponer
+current_user.id / email / role. Se guardan esos campos en un LRU con TTL por proceso y
+la fila completa (datos personales, hash) se carga solo si una vista la necesita.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+import logging
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models import db, User, parse_id
+
+logger = logging.getLogger(__name__)
+
+# Ids modificados en la transacción en curso (se invalidan de nuevo al confirmar)
+_PENDING_KEY = "_user_cache_pending"
+
+
+class _Identity(NamedTuple):
+    """Campos de User necesarios en cada request"""
+    id: str
+    email: str
+    role: str
+    is_active: bool
+    created_at: Optional[datetime]
+    scheduled_deletion: Optional[datetime]
+
+
+IDENTITY_COLUMNS = tuple(getattr(User, field) for field in _Identity._fields)
+
+
+class UserIdentityCache:
+    """
+    LRU acotado en entradas con expiración por TTL. Entre workers la coherencia la da el
+    TTL; dentro del proceso, los cambios en User vía ORM invalidan la entrada al instante.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[_Identity]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, identity: _Identity) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[identity.id] = (time.monotonic() + self.ttl_seconds, identity)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserIdentityCache()
+
+
+class UserIdentity(UserMixin):
+    """
+    current_user liviano: id, email, role y estado de la cuenta sin tocar la BD.
+    Cualquier otro atributo o método de User (check_password, schedule_deletion, ...)
+    carga la fila completa una sola vez por request y se delega en ella.
+    """
+
+    def __init__(self, identity: _Identity):
+        self._identity = identity
+        self._user: Optional[User] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se invoca para atributos que no están en la instancia ni en la clase
+        identity = self.__dict__.get("_identity")
+        if identity is None:
+            raise AttributeError(name)
+        if name in _Identity._fields:
+            return getattr(identity, name)
+        return getattr(self.user, name)
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self._identity.is_active)
+
+    @property
+    def user(self) -> User:
+        """Fila completa de User (carga perezosa)"""
+        if self._user is None:
+            self._user = db.session.get(User, self._identity.id)
+        return self._user
+
+    def get_id(self) -> str:
+        return self._identity.id
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self._identity.id
+
+    def __hash__(self) -> int:
+        return hash(self._identity.id)
+
+    def __repr__(self) -> str:
+        return f"<UserIdentity {self._identity.email}>"
+
+
+def load_identity(user_id: str) -> Optional[UserIdentity]:
+    """user_loader de Flask-Login: identidad desde cache o con una consulta de columnas acotadas"""
+    identity = user_cache.get(user_id)
+    if identity is None:
+        if parse_id(user_id) is None:
+            return None
+        row = db.session.query(*IDENTITY_COLUMNS).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        identity = _Identity(*row)
+        user_cache.set(identity)
+    return UserIdentity(identity)
+
+
+# ==================== INVALIDACIÓN ====================
+# Contraseña, desactivación (schedule_deletion), cancel_deletion, cambio de rol: cualquier
+# UPDATE/DELETE de User vía ORM. Se invalida al hacer flush y de nuevo al confirmar, para que
+# un request concurrente no deje cacheado el valor previo al commit.
+# Los DELETE/UPDATE masivos (query.update, sweeper GDPR) deben llamar a user_cache.invalidate.
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target) -> None:
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_users(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
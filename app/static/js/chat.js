@@ -0,0 +1,171 @@
+// Chat de clarificación y de análisis (antes inline en chat/*.html).
+// La configuración por página viene en data-* del formulario #messageForm:
+//   data-session-id, data-max-messages, data-message-count,
+//   data-assistant-name, data-avatar-gradient, data-busy-label
+(() => {
+const form = document.getElementById('messageForm');
+const messageInput = document.getElementById('messageInput');
+const submitBtn = document.getElementById('submitBtn');
+const chatContainer = document.getElementById('chatContainer');
+const progressFill = document.getElementById('progressFill');
+const messageCounter = document.getElementById('messageCounter');
+
+const settings = form ? form.dataset : {};
+const maxMessages = parseInt(settings.maxMessages, 10) || 10;
+const initialCount = parseInt(settings.messageCount, 10) || 0;
+const assistantName = settings.assistantName || 'PreIncubadora AI';
+const avatarGradient = settings.avatarGradient || 'from-blue-500 to-blue-700';
+const idleButtonHtml = submitBtn ? submitBtn.innerHTML : '';
+const spinnerSvg = `<svg class="w-4 h-4 animate-spin" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg>`;
+
+const avatarHtml = (nameClass) => `
+    <div class="w-6 h-6 bg-gradient-to-br ${avatarGradient} rounded-lg flex items-center justify-center">
+        <svg class="w-3 h-3 text-white" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M13 10V3L4 14h7v7l9-11h-7z"></path>
+        </svg>
+    </div>
+    <span class="text-xs font-medium ${nameClass}"></span>
+`;
+
+const formatTime = (date) => {
+    const d = date instanceof Date ? date : new Date(date);
+    return d.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+};
+
+const createBubble = (role, content, timeLabel) => {
+    const isUser = role === 'user';
+    const wrapper = document.createElement('div');
+    wrapper.className = `flex ${isUser ? 'justify-end' : 'justify-start'}`;
+
+    const bubble = document.createElement('div');
+    bubble.className = `message-bubble ${isUser ? 'order-2' : 'order-1'}`;
+
+    if (!isUser) {
+        const header = document.createElement('div');
+        header.className = 'flex items-center space-x-2 mb-2';
+        header.innerHTML = avatarHtml('text-[#E4F3F8]');
+        header.querySelector('span').textContent = assistantName;
+        bubble.appendChild(header);
+    }
+
+    const body = document.createElement('div');
+    body.className = `p-4 rounded-2xl ${isUser ? 'bg-gradient-to-br from-blue-600 to-blue-700 rounded-br-md' : 'card-static rounded-bl-md'}`;
+    const text = document.createElement('p');
+    text.className = `text-sm ${isUser ? 'text-white' : 'text-[#E4F3F8]'} whitespace-pre-wrap leading-relaxed`;
+    text.textContent = content;
+    body.appendChild(text);
+    bubble.appendChild(body);
+
+    const time = document.createElement('p');
+    time.className = `text-xs text-slate-500 mt-2 ${isUser ? 'text-right' : ''}`;
+    time.textContent = timeLabel;
+    bubble.appendChild(time);
+
+    wrapper.appendChild(bubble);
+    return wrapper;
+};
+
+const createTyping = () => {
+    const wrapper = document.createElement('div');
+    wrapper.className = 'flex justify-start typing-holder';
+    const bubble = document.createElement('div');
+    bubble.className = 'message-bubble order-1';
+    bubble.innerHTML = `
+        <div class="flex items-center space-x-2 mb-2">${avatarHtml('text-slate-400')}</div>
+        <div class="p-4 rounded-2xl card-static rounded-bl-md typing-indicator">
+            <div class="typing-indicator"><span></span><span></span><span></span></div>
+        </div>
+    `;
+    bubble.querySelector('.mb-2 span').textContent = assistantName;
+    wrapper.appendChild(bubble);
+    return wrapper;
+};
+
+const scrollToBottom = () => {
+    if (chatContainer) {
+        chatContainer.scrollTo({ top: chatContainer.scrollHeight, behavior: 'smooth' });
+    }
+};
+
+const setFormState = (enabled) => {
+    messageInput.disabled = !enabled;
+    submitBtn.disabled = !enabled;
+    submitBtn.innerHTML = enabled
+        ? idleButtonHtml
+        : `${spinnerSvg}<span>${settings.busyLabel || 'Enviando...'}</span>`;
+};
+
+const updateCounters = (count) => {
+    if (progressFill) progressFill.style.width = `${Math.min((count / maxMessages) * 100, 100)}%`;
+    if (messageCounter) messageCounter.textContent = `${count}/${maxMessages} mensajes`;
+};
+
+form?.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const message = messageInput.value.trim();
+    if (!message) return;
+
+    setFormState(false);
+
+    // Render user message immediately
+    const userBubble = createBubble('user', message, formatTime(new Date()));
+    chatContainer.appendChild(userBubble);
+    scrollToBottom();
+
+    // Typing indicator
+    const typing = createTyping();
+    chatContainer.appendChild(typing);
+    scrollToBottom();
+
+    try {
+        const response = await fetch('/chat/send-message', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                session_id: settings.sessionId,
+                message: message
+            })
+        });
+
+        const data = await response.json();
+
+        typing.remove();
+
+        if (data.success) {
+            const assistantBubble = createBubble('assistant', data.response, formatTime(new Date()));
+            chatContainer.appendChild(assistantBubble);
+            updateCounters(data.message_count || initialCount + 1);
+
+            if (data.locked) {
+                setFormState(false);
+            } else {
+                setFormState(true);
+                messageInput.value = '';
+                messageInput.focus();
+            }
+            scrollToBottom();
+        } else {
+            setFormState(true);
+            messageInput.focus();
+            alert('Error: ' + (data.error || 'Unknown error'));
+            typing.remove();
+        }
+    } catch (error) {
+        typing.remove();
+        setFormState(true);
+        messageInput.focus();
+        alert('Error de conexión. Por favor intenta de nuevo.');
+    }
+});
+
+// Enviar con Enter (Shift+Enter para nueva línea)
+messageInput?.addEventListener('keydown', (e) => {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        e.preventDefault();
+        form.requestSubmit();
+    }
+});
+
+// Scroll al final en carga
+window.addEventListener('load', scrollToBottom);
+})();
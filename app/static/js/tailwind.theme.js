@@ -0,0 +1,33 @@
+// Tema de Tailwind compartido por el build (tailwind.config.js) y el fallback CDN de desarrollo
+(function (root) {
+    var theme = {
+        extend: {
+            colors: {
+                palette: {
+                    deep: '#005986',
+                    ice: '#E4F3F8',
+                    electric: '#00A2DF',
+                    amber: '#FFC300',
+                    cream: '#FFEB92'
+                }
+            },
+            fontFamily: {
+                'sans': ['Inter', 'system-ui', '-apple-system', 'BlinkMacSystemFont', 'Segoe UI', 'Roboto', 'sans-serif'],
+            },
+            boxShadow: {
+                'glow': '0 0 20px rgba(0, 89, 134, 0.25)',
+                'glow-sm': '0 0 10px rgba(0, 162, 223, 0.25)',
+                'card': '0 4px 10px -1px rgba(0, 0, 0, 0.18), 0 2px 6px -2px rgba(0, 0, 0, 0.12)',
+            },
+            animation: {
+                'pulse-slow': 'pulse 3s cubic-bezier(0.4, 0, 0.6, 1) infinite',
+                'float': 'float 6s ease-in-out infinite',
+            }
+        }
+    };
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = theme;
+    } else if (root.tailwind) {
+        root.tailwind.config = { theme: theme };
+    }
+})(this);
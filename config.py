@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from sqlalchemy.pool import NullPool
 
@@ -27,6 +28,61 @@ class Config:
     MAX_PROJECTS_PER_DAY = int(os.getenv("MAX_PROJECTS_PER_DAY", 2))
     MAX_CHAT_MESSAGES = int(os.getenv("MAX_CHAT_MESSAGES", 10))
     AI_AMBIGUITY_QUESTIONS = int(os.getenv("AI_AMBIGUITY_CLARIFICATION_QUESTIONS", 3))
+    # Motor de generación del plan: "monolithic" (un prompt) o "parallel" (9 pilares concurrentes)
+    AI_PLAN_ENGINE = os.getenv("AI_PLAN_ENGINE", "monolithic")
+    # Detección local de ideas casi duplicadas (reutiliza la evaluación de ambigüedad)
+    IDEA_DEDUP_ENABLED = os.getenv("IDEA_DEDUP_ENABLED", "true").lower() == "true"
+    IDEA_DEDUP_THRESHOLD = float(os.getenv("IDEA_DEDUP_THRESHOLD", 0.85))  # similitud coseno mínima
+    IDEA_INDEX_MAX_AGE = int(os.getenv("IDEA_INDEX_MAX_AGE", 3600))  # segundos antes de reconstruir el índice
+    # El índice se construye en un hilo de fondo: ningún request espera el escaneo de proyectos
+    IDEA_INDEX_BACKGROUND_BUILD = os.getenv("IDEA_INDEX_BACKGROUND_BUILD", "true").lower() == "true"
+    # Presupuesto de tiempo de IA por request (menor al timeout de 120s del worker de gunicorn)
+    AI_REQUEST_BUDGET_SECONDS = float(os.getenv("AI_REQUEST_BUDGET_SECONDS", 90))
+    # Cache de fragmentos HTML (LRU por proceso, acotado en bytes)
+    FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "true").lower() == "true"
+    FRAGMENT_CACHE_MAX_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+    # Cache de identidad del user_loader (id/email/rol por proceso); 0 entradas = deshabilitado
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+    USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+    # db.create_all() al arrancar (consulta el catálogo en cada proceso); en producción
+    # el esquema lo gestionan solo las migraciones SQL
+    DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "true").lower() == "true"
+    # Réplica de lectura opcional (vistas de solo lectura); las escrituras van a DATABASE_URL
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+    DB_STICKY_PRIMARY_SECONDS = float(os.getenv("DB_STICKY_PRIMARY_SECONDS", 10))  # lecturas a la primaria tras escribir
+    # Purga GDPR (flask gdpr sweep): filas por DELETE, cuentas por ronda, pausa entre lotes y
+    # espera máxima por locks en Postgres antes de reintentar el lote
+    GDPR_SWEEP_BATCH_SIZE = int(os.getenv("GDPR_SWEEP_BATCH_SIZE", 500))
+    GDPR_SWEEP_USER_BATCH = int(os.getenv("GDPR_SWEEP_USER_BATCH", 100))
+    GDPR_SWEEP_PAUSE_SECONDS = float(os.getenv("GDPR_SWEEP_PAUSE_SECONDS", 0.05))
+    GDPR_SWEEP_LOCK_TIMEOUT_MS = int(os.getenv("GDPR_SWEEP_LOCK_TIMEOUT_MS", 2000))
+    # Exportación de datos (derecho de acceso): filas por lectura del cursor, jobs simultáneos
+    # por proceso, carpeta de los zip generados y su vigencia
+    GDPR_EXPORT_BATCH_ROWS = int(os.getenv("GDPR_EXPORT_BATCH_ROWS", 500))
+    GDPR_EXPORT_MAX_JOBS = int(os.getenv("GDPR_EXPORT_MAX_JOBS", 1))
+    GDPR_EXPORT_DIR = os.getenv("GDPR_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "gdpr_exports"))
+    GDPR_EXPORT_TTL_HOURS = float(os.getenv("GDPR_EXPORT_TTL_HOURS", 24))
+    GDPR_EXPORT_STALE_SECONDS = float(os.getenv("GDPR_EXPORT_STALE_SECONDS", 120))
+    # Analítica de administración: antigüedad máxima de los rollups antes de un refresco
+    # incremental al abrir el dashboard, y ventana por defecto en días
+    ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", 300))
+    ANALYTICS_DEFAULT_DAYS = int(os.getenv("ANALYTICS_DEFAULT_DAYS", 30))
+    # Instrumentación de consultas para revisar índices (flask indexes report): formas de
+    # SELECT por proceso, volcadas a QUERY_STATS_DIR cada QUERY_STATS_DUMP_SECONDS
+    QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "false").lower() == "true"
+    QUERY_STATS_DIR = os.getenv("QUERY_STATS_DIR", os.path.join(tempfile.gettempdir(), "query_stats"))
+    QUERY_STATS_DUMP_SECONDS = float(os.getenv("QUERY_STATS_DUMP_SECONDS", 60))
+    QUERY_STATS_MAX_SHAPES = int(os.getenv("QUERY_STATS_MAX_SHAPES", 500))
+    # Re-evaluación por lotes de planes (flask rescore): proyectos por checkpoint, fracción del RPM
+    # de cada modelo que puede usar el proceso (el resto queda para el tráfico en vivo), llamadas
+    # concurrentes, y en modo batch proyectos por job, jobs en curso y espera entre consultas
+    RESCORE_PAGE_SIZE = int(os.getenv("RESCORE_PAGE_SIZE", 20))
+    RESCORE_RPM_SHARE = float(os.getenv("RESCORE_RPM_SHARE", 0.5))
+    RESCORE_CONCURRENCY = int(os.getenv("RESCORE_CONCURRENCY", 4))
+    RESCORE_BATCH_JOB_SIZE = int(os.getenv("RESCORE_BATCH_JOB_SIZE", 500))
+    RESCORE_MAX_BATCH_JOBS = int(os.getenv("RESCORE_MAX_BATCH_JOBS", 4))
+    RESCORE_POLL_SECONDS = float(os.getenv("RESCORE_POLL_SECONDS", 60))
     
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -53,6 +109,7 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "false").lower() == "true"
     # Validación opcional (omitida para evitar fallos en despliegues con variables tardías)
 
 
@@ -61,6 +118,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
+    # SQLite en memoria usa una sola conexión compartida: sin hilos de fondo sobre la BD
+    IDEA_INDEX_BACKGROUND_BUILD = False
 
 
 config = {
@@ -0,0 +1,150 @@
+"""
+Configuración de gunicorn para producción - PreIncubadora AI
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Todo se ajusta por variables de entorno:
+    GUNICORN_WORKER_CLASS   gthread (default) | gevent | sync
+    WEB_CONCURRENCY         workers (default según CPU y clase de worker)
+    GUNICORN_THREADS        threads por worker gthread (default 8)
+    GUNICORN_WORKER_CONNECTIONS  greenlets por worker gevent (default 200)
+    GUNICORN_PRELOAD        carga la app en el master antes del fork (default true)
+    GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER  reciclado de workers
+    GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT / GUNICORN_KEEPALIVE
+
+El tráfico dominante es I/O (llamadas a Gemini de hasta AI_REQUEST_BUDGET_SECONDS):
+con workers sync cada llamada bloquea un proceso completo, por eso el default es
+gthread (pocos procesos, varios hilos). gevent requiere `gevent` y `psycogreen`.
+
+Comparar configuraciones con el benchmark HTTP (una instancia por variante):
+    GUNICORN_WORKER_CLASS=sync    gunicorn -c gunicorn.conf.py -b :5001 main:app
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c gunicorn.conf.py -b :5002 main:app
+    python scripts/bench_http.py --target sync=http://localhost:5001 --target gthread=http://localhost:5002
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def _cpu_count() -> int:
+    """CPUs disponibles para este proceso (respeta cpuset/affinity en contenedores)"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+CPUS = _cpu_count()
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 200)
+
+if worker_class == "gevent":
+    # Parchear antes de que preload_app importe la app (ssl, sockets, threading)
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        logger.warning("[GUNICORN] psycogreen no instalado: las consultas a Postgres bloquearán el worker gevent")
+
+# ==================== SOCKET ====================
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+backlog = _env_int("GUNICORN_BACKLOG", 2048)
+
+# ==================== WORKERS ====================
+# sync: 2*CPU+1 procesos (regla clásica para carga mixta)
+# gthread: CPU+1 procesos (GIL por proceso) x N hilos para esperar a la IA
+# gevent: 1 proceso por CPU con cientos de greenlets
+
+if worker_class == "sync":
+    workers = _env_int("WEB_CONCURRENCY", 2 * CPUS + 1)
+    threads = 1
+elif worker_class == "gevent":
+    workers = _env_int("WEB_CONCURRENCY", CPUS)
+    threads = 1
+else:
+    workers = _env_int("WEB_CONCURRENCY", CPUS + 1)
+    threads = _env_int("GUNICORN_THREADS", 8)
+
+# Carga la app una vez en el master: arranque más rápido y páginas compartidas
+# copy-on-write entre workers (ver post_fork para los recursos no heredables)
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+
+# Reciclado contra crecimiento de memoria; el jitter evita que todos los
+# workers se reinicien a la vez
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", max(1, max_requests // 10))
+
+# ==================== TIMEOUTS ====================
+# timeout > AI_REQUEST_BUDGET_SECONDS (90s): el presupuesto de IA corta antes que el arbiter.
+# graceful_timeout deja terminar una llamada a la IA en curso al recargar/escalar.
+timeout = _env_int("GUNICORN_TIMEOUT", 120)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 95)
+# Mayor que el keepalive_timeout (60s) del upstream de nginx: nginx cierra primero
+keepalive = _env_int("GUNICORN_KEEPALIVE", 75)
+
+# Heartbeat de workers en memoria (evita bloqueos por overlay fs en Docker)
+worker_tmp_dir = os.getenv("GUNICORN_WORKER_TMP_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+# ==================== LOGGING ====================
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+# %(M)s = duración en ms, útil para comparar con el benchmark
+access_log_format = '%(h)s "%(r)s" %(s)s %(B)s %(M)sms "%(a)s"'
+
+# ==================== HOOKS ====================
+
+_boot_started = time.monotonic()
+
+
+def when_ready(server):
+    """Master listo (con preload, la app ya está importada): precalentar lo compartible"""
+    if preload_app:
+        try:
+            # Matriz de embeddings del banco de preguntas (lru_cache) y SDK de Gemini
+            # (import perezoso): se cargan una vez aquí y los workers los heredan
+            from app.services import ai_service, question_ranker
+            question_ranker.rank_bank("")
+            ai_service._gemini_sdk()
+        except Exception as e:
+            server.log.warning(f"[GUNICORN] Precalentamiento omitido: {e}")
+    per_worker = worker_connections if worker_class == "gevent" else threads
+    server.log.info(
+        f"[GUNICORN] {worker_class}: {workers} workers x {per_worker} "
+        f"(CPUs={CPUS}, preload={preload_app}, max_requests={max_requests}±{max_requests_jitter}) "
+        f"listo en {time.monotonic() - _boot_started:.2f}s"
+    )
+
+
+def post_fork(server, worker):
+    """
+    Recursos del master que no deben compartirse tras el fork: conexiones de BD.
+    dispose(close=False) descarta el pool heredado sin cerrar los sockets del master.
+    """
+    if not preload_app:
+        return
+    from app.models import db
+    flask_app = server.app.wsgi()
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    server.log.info(f"[GUNICORN] Worker {worker.pid} finalizado")
@@ -0,0 +1,122 @@
+-- =====================================================
+-- MIGRACIÓN BASE: ESQUEMA INICIAL - PreIncubadora AI
+-- Esquema de app/models.py previo a 001 (reemplaza schema.sql, que había divergido)
+-- Idempotente: en bases existentes no modifica nada
+-- Fecha: 2026-10-19
+-- =====================================================
+-- migrate: dialects=postgresql
+
+-- Tipos ENUM nativos (SQLAlchemy db.Enum)
+DO $$ BEGIN
+    CREATE TYPE user_role AS ENUM ('user', 'admin', 'seller');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+    CREATE TYPE project_status AS ENUM ('ambiguous', 'ready', 'in_analysis', 'completed');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+    CREATE TYPE recommendation_status AS ENUM ('viable', 'needs_pivot', 'not_viable');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+    CREATE TYPE session_type AS ENUM ('clarification', 'analysis', 'pivot');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+DO $$ BEGIN
+    CREATE TYPE message_role AS ENUM ('user', 'assistant');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+-- Usuarios (los campos GDPR y personales llegan en 001 y 002)
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR(36) PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    rut VARCHAR(12) NOT NULL,
+    role user_role,
+    created_at TIMESTAMP,
+    last_project_creation TIMESTAMP,
+    is_active BOOLEAN,
+    reset_token VARCHAR(255),
+    reset_token_expiry TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_rut ON users (rut);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_reset_token ON users (reset_token);
+
+-- Auditoría
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL REFERENCES users (id),
+    action VARCHAR(255) NOT NULL,
+    resource_type VARCHAR(50) NOT NULL,
+    resource_id VARCHAR(36),
+    consent_given BOOLEAN,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_audit_logs_user_id ON audit_logs (user_id);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_created_at ON audit_logs (created_at);
+CREATE INDEX IF NOT EXISTS idx_user_action ON audit_logs (user_id, action, created_at);
+
+-- Proyectos
+CREATE TABLE IF NOT EXISTS projects (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL REFERENCES users (id),
+    title VARCHAR(255) NOT NULL,
+    raw_idea TEXT NOT NULL,
+    variability_score FLOAT,
+    status project_status,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_projects_user_id ON projects (user_id);
+CREATE INDEX IF NOT EXISTS ix_projects_created_at ON projects (created_at);
+CREATE INDEX IF NOT EXISTS idx_user_created ON projects (user_id, created_at);
+
+-- Planes de negocio (pillar_scores/pillar_sources/updated_at llegan en 003)
+CREATE TABLE IF NOT EXISTS business_plans (
+    id VARCHAR(36) PRIMARY KEY,
+    project_id VARCHAR(36) NOT NULL UNIQUE REFERENCES projects (id),
+    problem_statement TEXT,
+    value_proposition TEXT,
+    target_market TEXT,
+    revenue_model TEXT,
+    cost_analysis TEXT,
+    technical_feasibility TEXT,
+    risks_analysis TEXT,
+    scalability_potential TEXT,
+    validation_strategy TEXT,
+    overall_assessment TEXT,
+    viability_score FLOAT,
+    recommendation recommendation_status,
+    generated_at TIMESTAMP
+);
+
+-- Chat
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id VARCHAR(36) PRIMARY KEY,
+    project_id VARCHAR(36) NOT NULL REFERENCES projects (id),
+    message_count INTEGER,
+    is_locked BOOLEAN,
+    session_type session_type,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_project_id ON chat_sessions (project_id);
+CREATE INDEX IF NOT EXISTS idx_project_created ON chat_sessions (project_id, created_at);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id VARCHAR(36) PRIMARY KEY,
+    session_id VARCHAR(36) NOT NULL REFERENCES chat_sessions (id),
+    role message_role NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id ON chat_messages (session_id);
+CREATE INDEX IF NOT EXISTS idx_session_created ON chat_messages (session_id, created_at);
@@ -3,6 +3,7 @@
 -- Ejecutar en Neon PostgreSQL Console
 -- Fecha: 2026-01-19
 -- =====================================================
+-- migrate: dialects=postgresql
 
 -- Agregar columnas GDPR/LPD a la tabla users
 ALTER TABLE users
@@ -3,6 +3,7 @@
 -- Agregar campos: nombre, apellido, edad, ciudad
 -- Fecha: 2026-01-19
 -- =====================================================
+-- migrate: dialects=postgresql
 
 -- Agregar columnas de datos personales
 ALTER TABLE users
@@ -0,0 +1,24 @@
+-- =====================================================
+-- MIGRACIÓN: REGENERACIÓN INCREMENTAL POR PILAR
+-- Agregar campos: pillar_scores, pillar_sources, updated_at
+-- Fecha: 2026-10-19
+-- =====================================================
+-- migrate: dialects=postgresql
+
+-- Sub-puntajes por pilar y trazabilidad de mensajes que alimentaron cada pilar
+ALTER TABLE business_plans
+ADD COLUMN IF NOT EXISTS pillar_scores JSON,
+ADD COLUMN IF NOT EXISTS pillar_sources JSON,
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+-- Planes existentes: updated_at parte desde la fecha de generación
+UPDATE business_plans
+SET updated_at = generated_at
+WHERE updated_at IS NULL;
+
+-- Verificar columnas creadas
+SELECT column_name, data_type, is_nullable, column_default
+FROM information_schema.columns
+WHERE table_name = 'business_plans'
+  AND column_name IN ('pillar_scores', 'pillar_sources', 'updated_at')
+ORDER BY column_name;
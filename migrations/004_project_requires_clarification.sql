@@ -0,0 +1,17 @@
+-- =====================================================
+-- MIGRACIÓN: DECISIÓN DE CLARIFICACIÓN POR PROYECTO
+-- Agregar campo: projects.requires_clarification
+-- Fecha: 2026-10-19
+-- =====================================================
+-- migrate: dialects=postgresql
+
+-- Resultado de evaluate_ambiguity, reutilizado por las ideas casi duplicadas.
+-- Proyectos existentes quedan en NULL: sin decisión guardada, la idea se evalúa de nuevo
+ALTER TABLE projects
+ADD COLUMN IF NOT EXISTS requires_clarification BOOLEAN;
+
+-- Verificar columna creada
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_name = 'projects'
+  AND column_name = 'requires_clarification';
@@ -0,0 +1,41 @@
+"""
+MIGRACIÓN: Rollups de analítica de administración
+Tablas analytics_daily / analytics_refreshes, chat_sessions.updated_at y los índices que usa
+el refresco incremental (app/services/analytics.py): updated_at para encontrar filas
+modificadas y la columna de día para recalcular solo esos días
+Fecha: 2026-10-19
+"""
+TRANSACTIONAL = False
+DIALECTS = {"postgresql"}
+
+
+def upgrade(ctx):
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_daily (
+            day DATE NOT NULL,
+            metric VARCHAR(40) NOT NULL,
+            bucket VARCHAR(40) NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, metric, bucket)
+        )
+    """)
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_refreshes (
+            id VARCHAR(36) PRIMARY KEY,
+            started_at TIMESTAMP NOT NULL,
+            is_full BOOLEAN NOT NULL DEFAULT FALSE,
+            days_refreshed INTEGER,
+            rows_scanned INTEGER,
+            duration_ms INTEGER
+        )
+    """)
+    ctx.create_index("ix_analytics_refreshes_started_at", "analytics_refreshes", ["started_at"])
+
+    ctx.execute("ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP")
+    ctx.backfill("chat_sessions", "updated_at = COALESCE(created_at, now())", "updated_at IS NULL")
+
+    ctx.create_index("idx_projects_updated", "projects", ["updated_at"])
+    ctx.create_index("idx_business_plans_updated", "business_plans", ["updated_at"])
+    ctx.create_index("idx_chat_sessions_updated", "chat_sessions", ["updated_at"])
+    ctx.create_index("idx_business_plans_generated", "business_plans", ["generated_at"])
+    ctx.create_index("idx_chat_sessions_created", "chat_sessions", ["created_at"])
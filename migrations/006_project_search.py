@@ -0,0 +1,30 @@
+"""
+MIGRACIÓN: Búsqueda full-text de proyectos
+projects.search_vector (tsvector 'spanish': título A, idea B, texto del plan C), backfill por
+lotes e índice GIN concurrente. La aplicación lo mantiene al guardar (app/services/search.py)
+Fecha: 2026-10-19
+"""
+TRANSACTIONAL = False
+DIALECTS = {"postgresql"}
+
+PLAN_FIELDS = (
+    "problem_statement", "value_proposition", "target_market", "revenue_model", "cost_analysis",
+    "technical_feasibility", "risks_analysis", "scalability_potential", "validation_strategy",
+    "overall_assessment",
+)
+
+
+def upgrade(ctx):
+    ctx.execute("ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector")
+    plan_text = "concat_ws(' ', " + ", ".join(f"bp.{field}" for field in PLAN_FIELDS) + ")"
+    ctx.backfill(
+        "projects",
+        "search_vector = "
+        "setweight(to_tsvector('spanish', coalesce(projects.title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(projects.raw_idea, '')), 'B') || "
+        "setweight(to_tsvector('spanish', coalesce("
+        f"(SELECT {plan_text} FROM business_plans bp WHERE bp.project_id = projects.id), '')), 'C')",
+        "search_vector IS NULL",
+        batch_size=500,
+    )
+    ctx.create_index("idx_projects_search", "projects USING gin", ["search_vector"])
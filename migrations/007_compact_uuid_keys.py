@@ -0,0 +1,208 @@
+"""
+MIGRACIÓN: Claves UUID compactas (uuid nativo en Postgres, BLOB de 16 bytes en SQLite)
+Las claves primarias y foráneas pasan de VARCHAR(36) a uuid (16 bytes): índices de PK/FK
+y compuestos (idx_session_created, idx_user_action, ...) más chicos y joins más baratos.
+
+Postgres, sin reescribir tablas ni bloquear escrituras durante la copia:
+  1. columna sombra <col>__uuid por cada clave, mantenida por un trigger en INSERT/UPDATE
+  2. backfill por lotes (<col>__uuid = <col>::uuid) y CHECK NOT NULL validado aparte
+  3. índices definitivos sobre las columnas sombra con CREATE INDEX CONCURRENTLY
+  4. corte en una transacción corta (lock_timeout, con reintentos): se eliminan las columnas
+     VARCHAR (y con ellas sus índices y FKs), se renombran las sombras y se adoptan los
+     índices como PK/UNIQUE; las FKs se recrean NOT VALID
+  5. VALIDATE CONSTRAINT de cada FK (no bloquea escrituras)
+Cada paso es idempotente: si algo falla, `flask db upgrade` retoma desde donde quedó.
+Aplicar ANTES de desplegar el código que declara las columnas como GUID (el código previo
+funciona con ambos esquemas). El espacio de las columnas eliminadas se recupera a medida que
+las filas se reescriben (o con pg_repack / VACUUM FULL en una ventana de mantenimiento).
+
+SQLite (bases de desarrollo existentes, tras `flask db stamp 006`): convierte los valores
+de texto a BLOB en el lugar; SQLite no tipa columnas y no requiere cambiar el esquema.
+Fecha: 2026-10-19
+"""
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+TRANSACTIONAL = False
+
+logger = logging.getLogger(__name__)
+
+# (tabla, columnas UUID); padres antes que hijos
+TABLES = [
+    ("users", ["id"]),
+    ("projects", ["id", "user_id"]),
+    ("business_plans", ["id", "project_id"]),
+    ("chat_sessions", ["id", "project_id"]),
+    ("chat_messages", ["id", "session_id"]),
+    ("audit_logs", ["id", "user_id"]),
+    ("analytics_refreshes", ["id"]),
+]
+FOREIGN_KEYS = [
+    ("projects", "user_id", "users"),
+    ("business_plans", "project_id", "projects"),
+    ("chat_sessions", "project_id", "projects"),
+    ("chat_messages", "session_id", "chat_sessions"),
+    ("audit_logs", "user_id", "users"),
+]
+UNIQUE = [("business_plans", "project_id", "business_plans_project_id_key")]
+# Índices secundarios que incluyen claves (mismos nombres y columnas que app/models.py)
+INDEXES = [
+    ("ix_projects_user_id", "projects", ["user_id"]),
+    ("idx_user_created", "projects", ["user_id", "created_at"]),
+    ("ix_chat_sessions_project_id", "chat_sessions", ["project_id"]),
+    ("idx_project_created", "chat_sessions", ["project_id", "created_at"]),
+    ("ix_chat_messages_session_id", "chat_messages", ["session_id"]),
+    ("idx_session_created", "chat_messages", ["session_id", "created_at"]),
+    ("ix_audit_logs_user_id", "audit_logs", ["user_id"]),
+    ("idx_user_action", "audit_logs", ["user_id", "action", "created_at"]),
+]
+KEY_COLUMNS = {"id", "user_id", "project_id", "session_id"}
+
+CUTOVER_LOCK_TIMEOUT_MS = 3000
+CUTOVER_ATTEMPTS = 10
+LOCK_NOT_AVAILABLE = "55P03"
+SQLITE_BATCH_SIZE = 1000
+
+
+def _shadow(column: str) -> str:
+    return f"{column}__uuid"
+
+
+def _shadow_columns(columns):
+    return [_shadow(c) if c in KEY_COLUMNS else c for c in columns]
+
+
+def _converted(ctx) -> bool:
+    return ctx.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'id'"
+    ).scalar() == "uuid"
+
+
+def _prepare(ctx) -> None:
+    """Columnas sombra, trigger de sincronización y CHECK NOT NULL (NOT VALID)"""
+    for table, columns in TABLES:
+        for column in columns:
+            ctx.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_shadow(column)} uuid")
+        assignments = " ".join(f"NEW.{_shadow(c)} := NEW.{c}::uuid;" for c in columns)
+        ctx.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}__uuid_sync() RETURNS trigger AS $$
+            BEGIN {assignments} RETURN NEW; END
+            $$ LANGUAGE plpgsql
+        """)
+        ctx.execute(f"DROP TRIGGER IF EXISTS uuid_sync ON {table}")
+        ctx.execute(
+            f"CREATE TRIGGER uuid_sync BEFORE INSERT OR UPDATE OF {', '.join(columns)} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}__uuid_sync()"
+        )
+        for column in columns:
+            name = f"{table}_{_shadow(column)}_not_null"
+            exists = ctx.execute("SELECT 1 FROM pg_constraint WHERE conname = :name", {"name": name}).scalar()
+            if not exists:
+                ctx.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+                            f"CHECK ({_shadow(column)} IS NOT NULL) NOT VALID")
+
+
+def _backfill(ctx) -> None:
+    for table, columns in TABLES:
+        assignments = ", ".join(f"{_shadow(c)} = {c}::uuid" for c in columns)
+        ctx.backfill(table, assignments, f"{_shadow('id')} IS NULL")
+        for column in columns:
+            ctx.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{_shadow(column)}_not_null")
+
+
+def _build_indexes(ctx) -> None:
+    for table, _ in TABLES:
+        ctx.create_index(f"{table}_pkey__uuid", table, [_shadow("id")], unique=True)
+    for table, column, constraint in UNIQUE:
+        ctx.create_index(f"{constraint}__uuid", table, [_shadow(column)], unique=True)
+    for name, table, columns in INDEXES:
+        ctx.create_index(f"{name}__uuid", table, _shadow_columns(columns))
+
+
+def _swap_statements():
+    """Corte: en una sola transacción, con todas las tablas bloqueadas"""
+    statements = [f"SET LOCAL lock_timeout = {CUTOVER_LOCK_TIMEOUT_MS}"]
+    statements.append(f"LOCK TABLE {', '.join(t for t, _ in TABLES)} IN ACCESS EXCLUSIVE MODE")
+    for table, _ in TABLES:
+        statements.append(f"DROP TRIGGER uuid_sync ON {table}")
+        statements.append(f"DROP FUNCTION {table}__uuid_sync()")
+    # Hijos primero: al eliminar la columna FK se eliminan su FK e índices y la PK del padre queda libre
+    for table, columns in reversed(TABLES):
+        for column in [c for c in columns if c != "id"] + ["id"]:
+            shadow = _shadow(column)
+            statements += [
+                f"ALTER TABLE {table} DROP COLUMN {column}",
+                f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {column}",
+                # SET NOT NULL no recorre la tabla: lo garantiza el CHECK ya validado
+                f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL",
+                f"ALTER TABLE {table} DROP CONSTRAINT {table}_{shadow}_not_null",
+            ]
+        statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_pkey__uuid")
+    for table, column, constraint in UNIQUE:
+        statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} UNIQUE USING INDEX {constraint}__uuid")
+    for name, _, _ in INDEXES:
+        statements.append(f"ALTER INDEX {name}__uuid RENAME TO {name}")
+    for table, column, parent in FOREIGN_KEYS:
+        statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey "
+                          f"FOREIGN KEY ({column}) REFERENCES {parent} (id) NOT VALID")
+    return statements
+
+
+def _cutover(ctx) -> None:
+    for attempt in range(1, CUTOVER_ATTEMPTS + 1):
+        try:
+            with ctx.engine.begin() as conn:
+                for statement in _swap_statements():
+                    conn.execute(text(statement))
+            logger.info("[MIGRATE] Corte a claves uuid completado")
+            return
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == CUTOVER_ATTEMPTS:
+                raise
+            logger.warning(f"[MIGRATE] Corte uuid: tablas en uso (intento {attempt}), reintentando")
+            time.sleep(min(2 ** attempt, 30))
+
+
+def _validate_foreign_keys(ctx) -> None:
+    for table, column, _ in FOREIGN_KEYS:
+        ctx.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_fkey")
+
+
+def _upgrade_sqlite(ctx) -> None:
+    """Valores TEXT → BLOB de 16 bytes (rowid por lotes; las bases nuevas ya nacen en BLOB)"""
+    for table, columns in TABLES:
+        if not ctx.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t", {"t": table}).first():
+            continue
+        for column in columns:
+            converted = 0
+            while True:
+                with ctx.engine.begin() as conn:
+                    rows = conn.execute(text(
+                        f"SELECT rowid, {column} FROM {table} WHERE typeof({column}) = 'text' LIMIT :n"
+                    ), {"n": SQLITE_BATCH_SIZE}).all()
+                    if not rows:
+                        break
+                    conn.execute(text(f"UPDATE {table} SET {column} = :value WHERE rowid = :rowid"),
+                                 [{"rowid": rowid, "value": uuid.UUID(value).bytes} for rowid, value in rows])
+                converted += len(rows)
+                if len(rows) < SQLITE_BATCH_SIZE:
+                    break
+            if converted:
+                logger.info(f"[MIGRATE] {table}.{column}: {converted} valores convertidos a BLOB")
+
+
+def upgrade(ctx):
+    if ctx.dialect == "sqlite":
+        _upgrade_sqlite(ctx)
+        return
+    if not _converted(ctx):
+        _prepare(ctx)
+        _backfill(ctx)
+        _build_indexes(ctx)
+        _cutover(ctx)
+    _validate_foreign_keys(ctx)
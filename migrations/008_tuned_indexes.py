@@ -0,0 +1,34 @@
+"""
+MIGRACIÓN: Índices ajustados a las consultas reales (flask indexes report)
+  - idx_chat_messages_user_turns: conteo de mensajes del usuario por sesión (límite del chat);
+    parcial WHERE role = 'user', sin las respuestas del asistente
+  - idx_chat_sessions_project_type: sesión de clarificación/análisis por (project_id, session_type);
+    reemplaza a ix_chat_sessions_project_id
+  - idx_users_reset_token: UNIQUE parcial WHERE reset_token IS NOT NULL (antes ix_users_reset_token
+    indexaba todas las cuentas, casi todas con NULL)
+  - se eliminan ix_projects_user_id, ix_chat_messages_session_id y ix_audit_logs_user_id: son
+    prefijo de idx_user_created, idx_session_created e idx_user_action y solo encarecían escrituras
+business_plans.project_id ya tiene índice por su UNIQUE.
+Fecha: 2026-10-19
+"""
+TRANSACTIONAL = False
+# En SQLite los índices salen de app/models.py con db.create_all() (y 000_baseline no corre)
+DIALECTS = {"postgresql"}
+
+REPLACED = (
+    "ix_chat_sessions_project_id",
+    "ix_users_reset_token",
+    "ix_projects_user_id",
+    "ix_chat_messages_session_id",
+    "ix_audit_logs_user_id",
+)
+
+
+def upgrade(ctx):
+    # Primero los nuevos: las consultas nunca quedan sin índice durante la migración
+    ctx.create_index("idx_chat_messages_user_turns", "chat_messages", ["session_id"], where="role = 'user'")
+    ctx.create_index("idx_chat_sessions_project_type", "chat_sessions", ["project_id", "session_type"])
+    ctx.create_index("idx_users_reset_token", "users", ["reset_token"], unique=True,
+                     where="reset_token IS NOT NULL")
+    for name in REPLACED:
+        ctx.drop_index(name)
@@ -0,0 +1,49 @@
+"""
+MIGRACIÓN: Re-evaluación por lotes de planes (flask rescore, app/services/rescoring.py)
+  - plan_evaluations: plan re-evaluado por (versión, proyecto), aparte del plan vigente
+  - rescore_runs: checkpoint de cada corrida (cursor por id, jobs de la Batch API en curso)
+  - business_plans.scoring_version: versión promovida del plan vigente (NULL = generado en
+    vivo); columna nullable sin default, no reescribe la tabla
+Fecha: 2026-10-19
+"""
+TRANSACTIONAL = False
+DIALECTS = {"postgresql"}
+
+
+def upgrade(ctx):
+    ctx.execute("ALTER TABLE business_plans ADD COLUMN IF NOT EXISTS scoring_version VARCHAR(80)")
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS plan_evaluations (
+            id UUID PRIMARY KEY,
+            project_id UUID NOT NULL REFERENCES projects (id),
+            version VARCHAR(80) NOT NULL,
+            model VARCHAR(64) NOT NULL,
+            viability_score FLOAT,
+            recommendation VARCHAR(20),
+            pillar_scores JSON,
+            plan JSON,
+            previous_score FLOAT,
+            error TEXT,
+            created_at TIMESTAMP,
+            CONSTRAINT uq_plan_evaluations_version_project UNIQUE (version, project_id)
+        )
+    """)
+    # Purga GDPR y cascada desde projects
+    ctx.create_index("ix_plan_evaluations_project_id", "plan_evaluations", ["project_id"])
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS rescore_runs (
+            id UUID PRIMARY KEY,
+            version VARCHAR(80) NOT NULL UNIQUE,
+            model VARCHAR(64) NOT NULL,
+            mode VARCHAR(10) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            cursor UUID,
+            pending_jobs JSON,
+            evaluated INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            started_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            promoted_at TIMESTAMP
+        )
+    """)
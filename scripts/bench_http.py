@@ -0,0 +1,212 @@
+"""
+Benchmark HTTP local para comparar perfiles de nginx (u otros despliegues)
+
+Lanza N clientes concurrentes con conexiones keep-alive contra uno o más
+targets y reporta throughput, latencias p50/p95/p99, bytes transferidos por
+respuesta (comprimidos) y ratio de HIT del microcache (cabecera X-Cache-Status).
+
+Comparar la configuración actual contra la anterior:
+
+    # nginx con la configuración previa en :8081; la nueva es la de docker-compose (:443)
+    git show HEAD~1:nginx.conf > /tmp/nginx.baseline.conf
+    docker run -d --rm --network <proyecto>_preincubadora_network -p 8081:443 \\
+        -v /tmp/nginx.baseline.conf:/etc/nginx/conf.d/default.conf:ro \\
+        -v $PWD/certbot/conf:/etc/letsencrypt:ro nginx:alpine
+
+    python scripts/bench_http.py --insecure \\
+        --target baseline=https://localhost:8081 --target actual=https://localhost:443 \\
+        --concurrency 32 --requests 2000
+
+Con --cookie "session=..." se mide el camino autenticado (sin microcache).
+Solo usa la librería estándar.
+"""
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import ssl
+import threading
+import time
+
+DEFAULT_PATHS = ["/", "/privacy", "/login", "/register"]
+
+
+@dataclass
+class PathResult:
+    """Resultados agregados de un path en un target"""
+    latencies_ms: List[float] = field(default_factory=list)
+    bytes_received: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    cache_status: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed_s: float = 0.0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_ms)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        total = sum(self.cache_status.values())
+        if not total:
+            return None
+        return self.cache_status.get("HIT", 0) / total
+
+
+class _Client:
+    """Conexión keep-alive por hilo (se reabre si el servidor la cierra)"""
+
+    def __init__(self, base_url: str, insecure: bool, headers: Dict[str, str]):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.https else 80)
+        self.headers = headers
+        self.context = ssl._create_unverified_context() if (self.https and insecure) else None
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=30, context=self.context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def get(self, path: str, retry: bool = True) -> Tuple[int, int, str]:
+        if self.conn is None:
+            self.conn = self._connect()
+        try:
+            self.conn.request("GET", path, headers=self.headers)
+            response = self.conn.getresponse()
+            # Cuerpo tal cual llega (comprimido): mide bytes reales en la red
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            # Conexión keep-alive cerrada por el servidor: un reintento con conexión nueva
+            self.close()
+            if not retry:
+                raise
+            return self.get(path, retry=False)
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        return response.status, len(body), response.getheader("X-Cache-Status", "")
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def bench_path(base_url: str, path: str, concurrency: int, total: int,
+               insecure: bool, headers: Dict[str, str]) -> PathResult:
+    """Ejecutar `total` GETs a `path` repartidos entre `concurrency` hilos"""
+    result = PathResult()
+    lock = threading.Lock()
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    def worker(count: int) -> None:
+        client = _Client(base_url, insecure, headers)
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    status, size, cache = client.get(path)
+                except Exception:
+                    with lock:
+                        result.errors += 1
+                    continue
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with lock:
+                    result.latencies_ms.append(elapsed_ms)
+                    result.bytes_received += size
+                    result.statuses[status] = result.statuses.get(status, 0) + 1
+                    if cache:
+                        result.cache_status[cache] = result.cache_status.get(cache, 0) + 1
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [n for n in per_worker if n]))
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+
+def _print_report(results: Dict[str, Dict[str, PathResult]], paths: List[str]) -> None:
+    header = f"{'target':<12} {'path':<28} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'B/resp':>8} {'hit':>6} {'err':>5}  status"
+    print(header)
+    print("-" * len(header))
+    for path in paths:
+        for name, per_path in results.items():
+            r = per_path[path]
+            avg_bytes = r.bytes_received / r.requests if r.requests else 0
+            hit = f"{r.hit_ratio:.0%}" if r.hit_ratio is not None else "-"
+            statuses = ",".join(f"{code}x{count}" for code, count in sorted(r.statuses.items()))
+            print(f"{name:<12} {path:<28} {r.rps:>9.1f} {r.percentile(50):>8.1f} {r.percentile(95):>8.1f} "
+                  f"{r.percentile(99):>8.1f} {avg_bytes:>8.0f} {hit:>6} {r.errors:>5}  {statuses}")
+        print()
+
+    names = list(results)
+    if len(names) >= 2:
+        base, *others = names
+        for other in others:
+            for path in paths:
+                b, o = results[base][path], results[other][path]
+                if b.rps and b.percentile(95):
+                    print(f"[BENCH] {other} vs {base} {path}: throughput x{o.rps / b.rps:.2f}, "
+                          f"p95 x{o.percentile(95) / b.percentile(95):.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark HTTP comparativo (nginx/gunicorn)")
+    parser.add_argument("--target", action="append", required=True,
+                        help="nombre=URL base (repetible); el primero es la referencia")
+    parser.add_argument("--path", action="append", dest="paths", help=f"path a medir (default: {DEFAULT_PATHS})")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests por path y target")
+    parser.add_argument("--warmup", type=int, default=20, help="requests de calentamiento por path")
+    parser.add_argument("--cookie", default="", help="cabecera Cookie (simula usuario autenticado)")
+    parser.add_argument("--no-gzip", action="store_true", help="no enviar Accept-Encoding: gzip")
+    parser.add_argument("--insecure", action="store_true", help="no verificar certificados TLS")
+    args = parser.parse_args()
+
+    targets = []
+    for spec in args.target:
+        name, sep, url = spec.partition("=")
+        targets.append((name, url) if sep else (urlsplit(spec).netloc, spec))
+    paths = args.paths or DEFAULT_PATHS
+
+    headers = {"User-Agent": "bench_http/1.0"}
+    if not args.no_gzip:
+        headers["Accept-Encoding"] = "gzip"
+    if args.cookie:
+        headers["Cookie"] = args.cookie
+
+    results: Dict[str, Dict[str, PathResult]] = {}
+    for name, url in targets:
+        results[name] = {}
+        for path in paths:
+            if args.warmup:
+                bench_path(url, path, min(args.concurrency, args.warmup), args.warmup, args.insecure, headers)
+            print(f"[BENCH] {name} {path} ({args.requests} req, c={args.concurrency})")
+            results[name][path] = bench_path(url, path, args.concurrency, args.requests, args.insecure, headers)
+    print()
+    _print_report(results, paths)
+
+    total_errors = sum(r.errors for per_path in results.values() for r in per_path.values())
+    if total_errors:
+        print(f"[BENCH] ⚠️ {total_errors} requests con error")
+
+
+if __name__ == "__main__":
+    main()
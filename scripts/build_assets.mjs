@@ -0,0 +1,86 @@
+// Build de assets estáticos: Tailwind purgado y minificado, fuentes autoalojadas y JS,
+// copiados a app/static/dist/ con hash de contenido + manifest.json (lo lee app/assets.py).
+//
+//   npm install && npm run build
+import { createHash } from 'node:crypto';
+import { execFileSync } from 'node:child_process';
+import { existsSync, mkdirSync, readFileSync, readdirSync, rmSync, writeFileSync } from 'node:fs';
+import { basename, dirname, extname, join, relative } from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { constants as zlibConstants, gzipSync } from 'node:zlib';
+
+const ROOT = join(dirname(fileURLToPath(import.meta.url)), '..');
+const STATIC = join(ROOT, 'app', 'static');
+const DIST = join(STATIC, 'dist');
+const FONT_URL = 'https://rsms.me/inter/font-files/InterVariable.woff2';
+const FONT_PATH = join(STATIC, 'fonts', 'InterVariable.woff2');
+// Texto precomprimido para `gzip_static` de nginx (woff2 ya va comprimido)
+const PRECOMPRESS = new Set(['.css', '.js', '.svg']);
+
+const hashed = (name, content) => {
+    const digest = createHash('sha256').update(content).digest('hex').slice(0, 12);
+    const ext = extname(name);
+    return `${basename(name, ext)}.${digest}${ext}`;
+};
+
+const emit = (manifest, source, content) => {
+    const target = hashed(source, content);
+    writeFileSync(join(DIST, target), content);
+    if (PRECOMPRESS.has(extname(source))) {
+        writeFileSync(join(DIST, `${target}.gz`), gzipSync(content, { level: zlibConstants.Z_BEST_COMPRESSION }));
+    }
+    manifest[source] = target;
+    return target;
+};
+
+async function ensureFont() {
+    if (existsSync(FONT_PATH)) return;
+    console.log(`[ASSETS] Descargando Inter: ${FONT_URL}`);
+    const response = await fetch(FONT_URL);
+    if (!response.ok) throw new Error(`No se pudo descargar la fuente (${response.status})`);
+    mkdirSync(dirname(FONT_PATH), { recursive: true });
+    writeFileSync(FONT_PATH, Buffer.from(await response.arrayBuffer()));
+}
+
+function buildCss() {
+    // El CLI de Tailwind resuelve los @import y purga contra `content` de tailwind.config.js
+    return execFileSync(
+        join(ROOT, 'node_modules', '.bin', 'tailwindcss'),
+        ['-c', join(ROOT, 'tailwind.config.js'), '-i', join(ROOT, 'assets', 'css', 'app.css'), '--minify'],
+        { cwd: ROOT, maxBuffer: 64 * 1024 * 1024 }
+    ).toString('utf8');
+}
+
+async function main() {
+    await ensureFont();
+    rmSync(DIST, { recursive: true, force: true });
+    mkdirSync(DIST, { recursive: true });
+    const manifest = {};
+
+    // Fuentes primero: el CSS referencia sus nombres con hash
+    for (const name of readdirSync(join(STATIC, 'fonts')).filter((f) => f.endsWith('.woff2'))) {
+        emit(manifest, `fonts/${name}`, readFileSync(join(STATIC, 'fonts', name)));
+    }
+
+    let css = buildCss();
+    css = css.replace(/url\((['"]?)\.\.\/fonts\/([^'")]+)\1\)/g, (match, quote, name) => {
+        const target = manifest[`fonts/${name}`];
+        if (!target) throw new Error(`Fuente referenciada pero no encontrada: ${name}`);
+        return `url(${target})`;
+    });
+    emit(manifest, 'css/app.css', css);
+
+    for (const name of readdirSync(join(STATIC, 'js')).filter((f) => f.endsWith('.js'))) {
+        emit(manifest, `js/${name}`, readFileSync(join(STATIC, 'js', name)));
+    }
+
+    writeFileSync(join(DIST, 'manifest.json'), JSON.stringify(manifest, null, 2) + '\n');
+    for (const [source, target] of Object.entries(manifest)) {
+        console.log(`[ASSETS] ${source} → ${relative(ROOT, join(DIST, target))}`);
+    }
+}
+
+main().catch((error) => {
+    console.error(`[ASSETS] ${error.message}`);
+    process.exit(1);
+});
@@ -0,0 +1,178 @@
+"""
+Benchmark de índices sobre un dataset sintético: antes/después de las propuestas del revisor
+
+Crea el esquema (db.create_all) en una base VACÍA y la llena con el generador de
+app/services/synthetic_data.py, o reutiliza una base ya cargada con `flask data generate`
+(--reuse). Ejecuta la carga de consultas calientes del chat, el dashboard y la recuperación de
+contraseña con la instrumentación activa (app/services/query_stats.py), aplica los índices
+propuestos (y elimina los redundantes) y repite la carga. Reporta media/p95 por consulta, el costo de inserción de
+mensajes y, en Postgres, el tamaño total de los índices.
+
+    python scripts/index_bench.py --users 2000                       # SQLite temporal
+    python scripts/index_bench.py --database-url postgresql+psycopg2://.../bench --users 20000
+    python scripts/index_bench.py --database-url postgresql+psycopg2://.../scale --reuse --no-apply
+
+--setup-sql parte de otro esquema de índices, p.ej. el anterior a migrations/007:
+    python scripts/index_bench.py \\
+        --setup-sql "DROP INDEX idx_chat_messages_user_turns" \\
+        --setup-sql "CREATE INDEX ix_chat_messages_session_id ON chat_messages (session_id)"
+"""
+from typing import Callable, Dict, List, Tuple
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, inspect  # noqa: E402
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _sample_ids(db, models, size: int) -> Dict[str, list]:
+    """Ids al azar de una base ya cargada (--reuse)"""
+    def sample(column, *criteria) -> list:
+        query = db.select(column).where(*criteria).order_by(db.func.random()).limit(size)
+        return list(db.session.execute(query).scalars())
+    return {
+        "users": sample(models.User.id),
+        "projects": sample(models.Project.id),
+        "sessions": sample(models.ChatSession.id),
+        "tokens": sample(models.User.reset_token, models.User.reset_token.isnot(None)),
+    }
+
+
+def _workload(models, ids: Dict[str, list]) -> List[Tuple[str, Callable[[random.Random], object]]]:
+    """Consultas calientes, con las mismas formas que app/routes.py y app/models.py"""
+    User, Project, BusinessPlan = models.User, models.Project, models.BusinessPlan
+    ChatSession, ChatMessage = models.ChatSession, models.ChatMessage
+    tokens = ids["tokens"] or [models.new_id()]
+    return [
+        ("mensajes_usuario_por_sesion", lambda r: ChatMessage.query.filter_by(
+            session_id=r.choice(ids["sessions"]), role="user").count()),
+        ("sesion_por_tipo", lambda r: ChatSession.query.filter_by(
+            project_id=r.choice(ids["projects"]), session_type=r.choice(("clarification", "analysis"))).first()),
+        ("usuario_por_reset_token", lambda r: User.query.filter_by(reset_token=r.choice(tokens)).first()),
+        ("plan_por_proyecto", lambda r: BusinessPlan.query.filter_by(project_id=r.choice(ids["projects"])).first()),
+        ("historial_chat", lambda r: ChatMessage.query.filter_by(session_id=r.choice(ids["sessions"]))
+            .order_by(ChatMessage.created_at.asc()).all()),
+        ("proyectos_del_usuario", lambda r: Project.query.filter_by(user_id=r.choice(ids["users"]))
+            .order_by(Project.created_at.desc()).all()),
+    ]
+
+
+def _run(db, models, workload, ids, iterations: int, seed: int) -> Dict[str, List[float]]:
+    rng = random.Random(seed)
+    timings: Dict[str, List[float]] = {name: [] for name, _ in workload}
+    for i in range(iterations):
+        for name, query in workload:
+            started = time.perf_counter()
+            query(rng)
+            timings[name].append((time.perf_counter() - started) * 1000)
+        if i % 100 == 0:
+            db.session.rollback()
+    # Escrituras: costo de mantener los índices de chat_messages por fila insertada
+    started = time.perf_counter()
+    for _ in range(iterations // 10 or 1):
+        session_id = rng.choice(ids["sessions"])
+        db.session.add_all([models.ChatMessage(session_id=session_id, role=role, content="bench")
+                            for role in ("user", "assistant")])
+        db.session.commit()
+    timings["insertar_mensaje (por fila)"] = [(time.perf_counter() - started) * 1000 / (2 * (iterations // 10 or 1))]
+    db.session.rollback()
+    return timings
+
+
+def _analyze(db) -> None:
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _index_bytes(db) -> int:
+    if db.engine.dialect.name != "postgresql":
+        return 0
+    with db.engine.connect() as conn:
+        return int(conn.exec_driver_sql(
+            "SELECT coalesce(sum(pg_indexes_size(c.oid)), 0) FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = current_schema() AND c.relkind = 'r'"
+        ).scalar())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de índices antes/después de las propuestas")
+    parser.add_argument("--database-url", help="base VACÍA (por defecto un SQLite temporal)")
+    parser.add_argument("--reuse", action="store_true", help="usar los datos ya cargados en --database-url")
+    parser.add_argument("--users", type=int, default=1000, help="cuentas sintéticas a generar")
+    parser.add_argument("--iterations", type=int, default=500, help="repeticiones de cada consulta por fase")
+    parser.add_argument("--setup-sql", action="append", default=[], help="DDL a ejecutar tras cargar los datos")
+    parser.add_argument("--no-apply", action="store_true", help="solo reportar propuestas, sin aplicarlas")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='index_bench_'), 'bench.db')}"
+    if args.reuse != bool(inspect(create_engine(url)).get_table_names()):
+        sys.exit(f"[INDEX_BENCH] {url.split('@')[-1]}: " + ("no tiene datos para --reuse" if args.reuse else
+                 "no está vacía (el benchmark crea y llena sus propias tablas; o usar --reuse)"))
+    os.environ.update(DATABASE_URL=url, DB_CREATE_ALL=str(not args.reuse).lower(), QUERY_STATS_ENABLED="true",
+                      QUERY_STATS_DIR=tempfile.mkdtemp(prefix="query_stats_"), QUERY_STATS_DUMP_SECONDS="3600")
+
+    from app import create_app
+    from app import models
+    from app.models import db
+    from app.services import query_stats, synthetic_data
+
+    app = create_app("production")
+    with app.app_context():
+        started = time.perf_counter()
+        ids = _sample_ids(db, models, synthetic_data.SAMPLE_SIZE) if args.reuse else synthetic_data.generate(args.users, args.seed).samples
+        counts = {t: db.session.execute(db.select(db.func.count()).select_from(db.metadata.tables[t])).scalar()
+                  for t in ("users", "projects", "chat_sessions", "chat_messages")}
+        print(f"[INDEX_BENCH] {db.engine.dialect.name}: datos en {time.perf_counter() - started:.1f}s  {counts}")
+        # Cerrar la transacción de lectura: en Postgres sus locks bloquearían el DDL de --setup-sql
+        db.session.rollback()
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for statement in args.setup_sql:
+                conn.exec_driver_sql(statement)
+        _analyze(db)
+
+        workload = _workload(models, ids)
+        query_stats.query_stats.reset()
+        size_before = _index_bytes(db)
+        before = _run(db, models, workload, ids, args.iterations, args.seed)
+        advice = query_stats.advise(query_stats.load())
+        dialect = db.engine.dialect.name
+
+        print("\n[INDEX_BENCH] Propuestas del revisor:")
+        for proposal in advice["proposals"]:
+            print(f"  {proposal.ddl(dialect)}\n      -- {proposal.reason}")
+        for finding in advice["findings"]:
+            print(f"  {finding.ddl(dialect) if finding.redundant else finding.index}\n      -- {finding.reason}")
+        if not advice["proposals"] and not advice["findings"]:
+            print("  (ninguna: el esquema actual ya resuelve todas las formas)")
+            return
+        if args.no_apply:
+            return
+
+        query_stats.apply(advice)
+        _analyze(db)
+        size_after = _index_bytes(db)
+        after = _run(db, models, workload, ids, args.iterations, args.seed)
+
+    print(f"\n{'consulta':<32} {'antes media':>12} {'p95':>8} {'después media':>14} {'p95':>8} {'x':>6}")
+    for name in before:
+        b_mean, a_mean = sum(before[name]) / len(before[name]), sum(after[name]) / len(after[name])
+        print(f"{name:<32} {b_mean:>10.3f}ms {_percentile(before[name], 95):>6.3f}ms "
+              f"{a_mean:>12.3f}ms {_percentile(after[name], 95):>6.3f}ms {b_mean / a_mean if a_mean else 0:>6.1f}")
+    if size_before:
+        print(f"\nTamaño de índices: {size_before / 1e6:.1f} MB → {size_after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Perfil de arranque de la aplicación: tiempos de import y de create_app
+
+Ejecuta create_app() en un proceso nuevo con `python -X importtime` y reporta:
+  - las fases de create_app (app.extensions["startup_timings"])
+  - los paquetes de nivel superior más costosos de importar (tiempo acumulado)
+  - si algún SDK de Gemini se importó durante el arranque (debería ser perezoso)
+
+    FLASK_ENV=production DATABASE_URL=... python scripts/startup_profile.py --top 15
+"""
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_MODULES = ("google.genai", "google.generativeai")
+
+_CHILD = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+app = create_app({config!r})
+timings = dict(app.extensions["startup_timings"])
+timings["total_process"] = time.perf_counter() - started
+print("@@TIMINGS@@" + json.dumps(timings))
+"""
+
+
+def _parse_importtime(stderr: str) -> Tuple[Dict[str, int], List[str]]:
+    """Acumulado (µs) por paquete raíz (incluye sus dependencias) y lista de módulos importados"""
+    cumulative: Dict[str, int] = {}
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumul, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append(name)
+        if "." not in name:
+            cumulative[name] = max(cumulative.get(name, 0), int(cumul))
+    return cumulative, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perfil de arranque (imports + create_app)")
+    parser.add_argument("--config", default=os.getenv("FLASK_ENV", "development"))
+    parser.add_argument("--top", type=int, default=10, help="paquetes más costosos a listar")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(config=args.config)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    timings_line = next((l for l in result.stdout.splitlines() if l.startswith("@@TIMINGS@@")), None)
+    if result.returncode != 0 or timings_line is None:
+        print(result.stderr[-4000:], file=sys.stderr)
+        sys.exit(f"[STARTUP] create_app('{args.config}') falló (código {result.returncode})")
+
+    timings = json.loads(timings_line[len("@@TIMINGS@@"):])
+    cumulative, modules = _parse_importtime(result.stderr)
+
+    print(f"[STARTUP] config={args.config}  proceso completo (intérprete incluido): {wall * 1000:.0f}ms")
+    for name, seconds in timings.items():
+        print(f"  {name:<16} {seconds * 1000:>8.1f} ms")
+
+    print(f"\n[STARTUP] Imports más costosos (acumulado, {len(modules)} módulos):")
+    for top, micros in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {top:<24} {micros / 1000:>8.1f} ms")
+
+    eager = [m for m in modules if m in SDK_MODULES]
+    if eager:
+        print(f"\n[STARTUP] ⚠️ SDK de Gemini importado en el arranque: {', '.join(eager)}")
+    else:
+        print("\n[STARTUP] SDK de Gemini no importado en el arranque (carga perezosa)")
+
+
+if __name__ == "__main__":
+    main()
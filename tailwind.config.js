@@ -0,0 +1,10 @@
+/** @type {import('tailwindcss').Config} */
+module.exports = {
+    // Solo se emiten las clases usadas en plantillas y JS
+    content: [
+        './app/templates/**/*.html',
+        './app/static/js/**/*.js',
+    ],
+    theme: require('./app/static/js/tailwind.theme.js'),
+    plugins: [],
+};
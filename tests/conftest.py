@@ -0,0 +1,71 @@
+"""
+Fixtures comunes: app con TestingConfig (SQLite en memoria, esquema vía db.create_all)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.models import db, User  # noqa: E402
+from app.services import ai_service  # noqa: E402
+
+
+class FakeClock:
+    """Reloj monotónico controlado por el test (ai_service.time.monotonic)"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def app():
+    app = create_app("testing")
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(app):
+    """Crear usuarios con RUT y email únicos"""
+    created = []
+
+    def make(**fields) -> User:
+        n = len(created) + 1
+        user = User(email=f"user{n}@example.com", rut=f"{n}-9", first_name="Test", last_name="User",
+                    age=30, city="Santiago", **fields)
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.commit()
+        created.append(user)
+        return user
+    return make
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ai_service.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = ai_service._ModelCircuitBreaker()
+    monkeypatch.setattr(ai_service, "_circuit_breaker", breaker)
+    yield breaker
+    # Termina el hilo de health check del breaker descartado
+    breaker._probe_generation += 1
+
+
+@pytest.fixture
+def quota(monkeypatch):
+    tracker = ai_service._ModelQuotaTracker()
+    monkeypatch.setattr(ai_service, "_quota_tracker", tracker)
+    return tracker
@@ -0,0 +1,94 @@
+"""
+Reparación de JSON truncado y validación del plan de negocio (IncubatorAI)
+"""
+import json
+
+import pytest
+
+from app.services.ai_service import IncubatorAI
+
+
+@pytest.fixture
+def ai():
+    # Sin cliente: solo se ejercitan métodos locales
+    return IncubatorAI.__new__(IncubatorAI)
+
+
+def full_plan(**overrides):
+    plan = {field: f"texto {field}" for field in IncubatorAI.PILLAR_FIELDS}
+    plan.update(overall_assessment="síntesis", viability_score=72, recommendation="viable")
+    plan.update(overrides)
+    return plan
+
+
+@pytest.mark.parametrize("payload, expected", [
+    ('{"a": "texto cort', {"a": "texto cort"}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "b"', {"a": 1}),
+    ('{"a": 1,', {"a": 1}),
+    ('{"a": {"b": [1, {"c": "x"', {"a": {"b": [1, {"c": "x"}]}}),
+    ('{"a": "comilla \\"escapada', {"a": 'comilla "escapada'}),
+])
+def test_repair_json_closes_truncated_payloads(payload, expected):
+    assert json.loads(IncubatorAI._repair_json(payload)) == expected
+
+
+def test_repair_json_drops_dangling_commas():
+    assert json.loads(IncubatorAI._repair_json('{"a": [1, 2,], "b": 3,}')) == {"a": [1, 2], "b": 3}
+
+
+def test_extract_json_payload_strips_markdown_and_noise():
+    text = 'Aquí va:\n```json\n{"variability_score": 40, "requires_clarification": false}\n```'
+    assert IncubatorAI._extract_json_payload(text) == {"variability_score": 40, "requires_clarification": False}
+
+
+def test_extract_json_payload_repairs_truncated_response():
+    assert IncubatorAI._extract_json_payload('{"questions": ["¿Precio?", "¿Cliente') == {
+        "questions": ["¿Precio?", "¿Cliente"]
+    }
+
+
+def test_extract_json_payload_rejects_empty_text():
+    with pytest.raises(json.JSONDecodeError):
+        IncubatorAI._extract_json_payload("")
+
+
+def test_validate_business_plan_normalizes_minor_deviations(ai):
+    plan = ai._validate_business_plan(full_plan(
+        viability_score="85/100", recommendation="Needs Pivot",
+        pillar_scores={"target_market": "140", "revenue_model": "60 puntos"},
+        problem_statement=["uno", "dos"], pivot_suggestions="B2B",
+    ))
+    assert plan["viability_score"] == 85.0
+    assert plan["recommendation"] == "needs_pivot"
+    assert plan["pillar_scores"]["target_market"] == 100.0
+    assert plan["pillar_scores"]["revenue_model"] == 60.0
+    # Pilar sin puntaje: hereda el viability_score
+    assert plan["pillar_scores"]["cost_analysis"] == 85.0
+    assert plan["problem_statement"] == "uno\ndos"
+    assert plan["pivot_suggestions"] == ["B2B"]
+
+
+def test_validate_business_plan_derives_unknown_recommendation(ai):
+    assert ai._validate_business_plan(full_plan(viability_score=30, recommendation="quizás"))["recommendation"] == "not_viable"
+    assert ai._validate_business_plan(full_plan(viability_score=55, recommendation=None))["recommendation"] == "needs_pivot"
+
+
+def test_validate_business_plan_fills_few_missing_pillars(ai):
+    data = full_plan()
+    del data["risks_analysis"], data["scalability_potential"]
+    plan = ai._validate_business_plan([data])  # lista de un elemento: se desenvuelve
+    assert plan["risks_analysis"] == "Por definir"
+    assert plan["target_market"] == "texto target_market"
+
+
+@pytest.mark.parametrize("data, message", [
+    ("texto", "no es un objeto"),
+    ({"problem_statement": "x", "viability_score": 50}, "Plan incompleto"),
+    (full_plan(viability_score=None), "sin viability_score"),
+    (full_plan(viability_score="alto"), "viability_score inválido"),
+])
+def test_validate_business_plan_rejects_unusable_payloads(ai, data, message):
+    with pytest.raises(ValueError, match=message):
+        ai._validate_business_plan(data)
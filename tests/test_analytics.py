@@ -0,0 +1,75 @@
+"""
+Codificadores de buckets y agregados de los rollups de analítica
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app.models import BusinessPlan, Project, db
+from app.services import analytics
+
+
+def test_categorical_maps_unknown_and_null_to_missing_bucket():
+    labels, encode = analytics._categorical(("viable", "needs_pivot"), "none")
+    assert labels == ("viable", "needs_pivot", "none")
+    values = np.array(["needs_pivot", None, "viable", "otro"], dtype=object)
+    assert encode(values).tolist() == [1, 2, 0, 2]
+    assert encode(np.array([], dtype=object)).tolist() == []
+
+
+def test_encode_viability_buckets_of_ten_with_closed_top_bucket():
+    values = np.array([0, 9.99, 10, 55, 99.9, 100, None, -5, 130], dtype=object)
+    assert analytics._encode_viability(values).tolist() == [0, 0, 1, 5, 9, 9, -1, 0, 9]
+
+
+def test_day_runs_groups_contiguous_days():
+    d = date(2026, 1, 1)
+    days = [d + timedelta(days=n) for n in (5, 0, 1, 2, 2, 7, 8)]
+    assert analytics._day_runs(days) == [
+        (d, d + timedelta(days=2)), (d + timedelta(days=5), d + timedelta(days=5)),
+        (d + timedelta(days=7), d + timedelta(days=8)),
+    ]
+    assert analytics._day_runs([]) == []
+
+
+def test_as_date_accepts_sqlite_text_and_dates():
+    assert analytics._as_date("2026-03-04") == date(2026, 3, 4)
+    assert analytics._as_date("2026-03-04 00:00:00") == date(2026, 3, 4)
+    assert analytics._as_date(date(2026, 3, 4)) == date(2026, 3, 4)
+
+
+def test_histogram_stats_uses_bucket_midpoints():
+    labels = ("0", "10", "20")
+    assert analytics._histogram_stats(labels, np.array([1, 0, 3]), 10) == {"mean": 20.0, "median": 25.0}
+    assert analytics._histogram_stats(labels, np.zeros(3, dtype=np.int64), 10) == {"mean": None, "median": None}
+
+
+def test_refresh_and_summary_count_by_day(app, make_user):
+    user = make_user()
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    for offset, status, score in ((0, "completed", 75), (0, "ambiguous", None), (1, "in_analysis", 45)):
+        project = Project(user_id=user.id, title="x", raw_idea="y", status=status,
+                          created_at=today - timedelta(days=offset))
+        db.session.add(project)
+        db.session.flush()
+        if score is not None:
+            db.session.add(BusinessPlan(project_id=project.id, viability_score=score,
+                                        recommendation=analytics.RECOMMENDATIONS[0 if score >= 70 else 1],
+                                        generated_at=today - timedelta(days=offset)))
+    db.session.commit()
+
+    analytics.refresh(full=True)
+    rows = {(r.day, r.metric, r.bucket): r.value for r in db.session.query(analytics.AnalyticsDaily)}
+    day = today.date()
+    assert rows[(day, "project_status", "completed")] == 1
+    assert rows[(day, "project_status", "ambiguous")] == 1
+    assert rows[(day - timedelta(days=1), "project_status", "in_analysis")] == 1
+    assert rows[(day, "viability_score", "70")] == 1
+    assert rows[(day - timedelta(days=1), "viability_score", "40")] == 1
+
+    data = analytics.summary(7)
+    assert data["projects"] == 3
+    assert [(stage["stage"], stage["reached"]) for stage in data["funnel"]] == [
+        ("ambiguous", 3), ("ready", 2), ("in_analysis", 2), ("completed", 1),
+    ]
+    assert data["viability_histogram"]["mean"] == 60.0
@@ -0,0 +1,109 @@
+"""
+Circuit breaker por modelo: closed → open → half-open y health check en segundo plano
+"""
+import threading
+import time
+
+
+def trip(breaker, model="m", failures=None):
+    for _ in range(failures or breaker.FAILURE_THRESHOLD):
+        breaker.record_failure(model, RuntimeError("503"))
+
+
+def wait_for(condition, seconds=2.0):
+    # time.monotonic está reemplazado por el reloj falso: se cuentan iteraciones
+    for _ in range(int(seconds / 0.01)):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_breaker_opens_after_consecutive_failures(clock, breaker):
+    trip(breaker, failures=breaker.FAILURE_THRESHOLD - 1)
+    assert breaker.allow("m")
+    breaker.record_failure("m", RuntimeError("timeout"))
+    assert not breaker.allow("m")
+    state = breaker.snapshot()["m"]
+    assert state["state"] == breaker.OPEN
+    assert state["trips"] == 1 and state["rejected"] == 1
+
+
+def test_breaker_success_resets_consecutive_failures(clock, breaker):
+    trip(breaker, failures=breaker.FAILURE_THRESHOLD - 1)
+    breaker.record_success("m")
+    breaker.record_failure("m", RuntimeError("503"))
+    assert breaker.allow("m")
+
+
+def test_breaker_half_open_allows_a_single_trial(clock, breaker):
+    trip(breaker)
+    clock.now += breaker.COOLDOWN_SECONDS
+    assert breaker.snapshot()["m"]["state"] == breaker.HALF_OPEN
+    assert breaker.allow("m")
+    assert not breaker.allow("m")
+    # Una prueba sin respuesta libera el half-open tras TRIAL_TIMEOUT_SECONDS
+    clock.now += breaker.TRIAL_TIMEOUT_SECONDS
+    assert breaker.allow("m")
+
+
+def test_breaker_half_open_success_closes(clock, breaker):
+    trip(breaker)
+    clock.now += breaker.COOLDOWN_SECONDS
+    assert breaker.allow("m")
+    breaker.record_success("m")
+    assert breaker.snapshot()["m"]["state"] == breaker.CLOSED
+    assert breaker.allow("m") and breaker.allow("m")
+
+
+def test_breaker_half_open_failure_doubles_cooldown_up_to_max(clock, breaker):
+    trip(breaker)
+    cooldown = breaker.COOLDOWN_SECONDS
+    while cooldown < breaker.MAX_COOLDOWN_SECONDS:
+        clock.now += cooldown
+        assert breaker.allow("m")
+        breaker.record_failure("m", RuntimeError("503"))
+        cooldown = min(cooldown * 2, breaker.MAX_COOLDOWN_SECONDS)
+        assert breaker.snapshot()["m"]["retry_in_seconds"] == cooldown
+    clock.now += cooldown
+    breaker.allow("m")
+    breaker.record_failure("m", RuntimeError("503"))
+    assert breaker.snapshot()["m"]["retry_in_seconds"] == breaker.MAX_COOLDOWN_SECONDS
+
+
+def test_hung_health_check_does_not_keep_models_out_of_rotation(clock, breaker):
+    breaker.PROBE_INTERVAL_SECONDS = 0.01
+    started, release = threading.Event(), threading.Event()
+
+    def hung_probe(model_name):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("timeout")
+
+    trip(breaker)
+    clock.now += breaker.COOLDOWN_SECONDS
+    breaker.start_probe(hung_probe)
+    assert started.wait(2)
+    # Mientras el health check está en curso, él decide
+    assert not breaker.allow("m")
+    # Colgado más de TRIAL_TIMEOUT_SECONDS: los requests de usuario vuelven a hacer de prueba
+    clock.now += breaker.TRIAL_TIMEOUT_SECONDS
+    assert breaker.allow("m")
+
+    # start_probe reemplaza el hilo colgado; su resultado tardío se descarta
+    hung_thread = breaker._probe_thread
+    breaker.start_probe(lambda model_name: None)
+    assert breaker._probe_thread is not hung_thread
+    assert wait_for(lambda: breaker.snapshot()["m"]["state"] == breaker.CLOSED)
+    release.set()
+    hung_thread.join(2)
+    assert not hung_thread.is_alive()
+    assert breaker.snapshot()["m"]["state"] == breaker.CLOSED
+
+
+def test_healthy_probe_is_not_restarted(clock, breaker):
+    breaker.PROBE_INTERVAL_SECONDS = 60
+    breaker.start_probe(lambda model_name: None)
+    thread = breaker._probe_thread
+    breaker.start_probe(lambda model_name: None)
+    assert breaker._probe_thread is thread
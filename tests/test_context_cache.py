@@ -0,0 +1,80 @@
+"""
+Registro de context caching: backoff ante errores transitorios, rechazos definitivos y timeout de la subida
+"""
+import pytest
+
+from app.services.ai_service import _ContextCacheRegistry
+
+
+class FakeCaches:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.caches = self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return type("Cached", (), {"name": outcome})()
+
+
+class APIError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def test_context_cache_transient_error_backs_off_and_retries(clock):
+    registry = _ContextCacheRegistry()
+    client = FakeCaches([APIError(503, "UNAVAILABLE"), "cachedContents/1"])
+    assert registry.get_or_create(client, "m", "prompt", 3600) is None
+    # Dentro del backoff no se vuelve a llamar al backend
+    assert registry.get_or_create(client, "m", "prompt", 3600) is None
+    assert len(client.calls) == 1
+    clock.now += registry.RETRY_BASE_SECONDS
+    assert registry.get_or_create(client, "m", "prompt", 3600) == "cachedContents/1"
+    assert registry.get_or_create(client, "m", "prompt", 3600) == "cachedContents/1"
+    assert len(client.calls) == 2
+
+
+def test_context_cache_backoff_grows_exponentially(clock):
+    registry = _ContextCacheRegistry()
+    client = FakeCaches([APIError(429, "RESOURCE_EXHAUSTED"), ConnectionError("reset"), "cachedContents/1"])
+    registry.get_or_create(client, "m", "prompt", 3600)
+    clock.now += registry.RETRY_BASE_SECONDS
+    registry.get_or_create(client, "m", "prompt", 3600)
+    clock.now += registry.RETRY_BASE_SECONDS
+    assert registry.get_or_create(client, "m", "prompt", 3600) is None
+    clock.now += registry.RETRY_BASE_SECONDS
+    assert registry.get_or_create(client, "m", "prompt", 3600) == "cachedContents/1"
+
+
+@pytest.mark.parametrize("error", [
+    APIError(400, "Cached content is too small. min_total_token_count=1024"),
+    APIError(404, "models/x is not found or is not supported for createCachedContent"),
+])
+def test_context_cache_definitive_rejection_is_permanent(clock, error):
+    registry = _ContextCacheRegistry()
+    client = FakeCaches([error, "cachedContents/1"])
+    assert registry.get_or_create(client, "m", "prompt", 3600) is None
+    clock.now += registry.RETRY_MAX_SECONDS * 10
+    assert registry.get_or_create(client, "m", "prompt", 3600) is None
+    assert len(client.calls) == 1
+
+
+def test_context_cache_create_has_a_timeout(clock):
+    registry = _ContextCacheRegistry()
+    client = FakeCaches(["cachedContents/1"])
+    registry.get_or_create(client, "m", "prompt", 3600)
+    assert client.calls[0]["config"]["http_options"] == {"timeout": int(registry.CREATE_TIMEOUT_SECONDS * 1000)}
+
+
+@pytest.mark.parametrize("attempt_timeout, expected_ms", [(4.0, 4000), (60.0, None)])
+def test_context_cache_create_uses_the_attempt_timeout(clock, attempt_timeout, expected_ms):
+    registry = _ContextCacheRegistry()
+    client = FakeCaches(["cachedContents/1"])
+    registry.get_or_create(client, "m", "prompt", 3600, timeout=attempt_timeout)
+    expected_ms = expected_ms or int(registry.CREATE_TIMEOUT_SECONDS * 1000)
+    assert client.calls[0]["config"]["http_options"] == {"timeout": expected_ms}
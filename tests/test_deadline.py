@@ -0,0 +1,83 @@
+"""
+Reparto del Deadline del request entre intentos y su relación con el circuit breaker
+"""
+import pytest
+
+from app.services.ai_service import Deadline, DeadlineExceeded, IncubatorAI
+
+
+@pytest.fixture
+def ai(monkeypatch):
+    # Sin cliente: los modelos se reemplazan por su nombre y la llamada por un stub
+    ai = IncubatorAI.__new__(IncubatorAI)
+    ai.current_model_index = 0
+    monkeypatch.setattr(ai, "_build_model", lambda name: name, raising=False)
+    ai.model = ai._initialize_model()
+    return ai
+
+
+def failing(error, timeouts=None):
+    def call(*args, timeout=None, **kwargs):
+        if timeouts is not None:
+            timeouts.append(timeout)
+        raise error
+    return call
+
+
+def test_expired_deadline_does_not_trip_breaker_or_spend_quota(ai, breaker, quota):
+    ai.deadline = Deadline(0)
+    for _ in range(breaker.FAILURE_THRESHOLD + 1):
+        with pytest.raises(DeadlineExceeded):
+            ai._generate_with_headroom("prompt")
+    assert all(state["failures"] == 0 for state in breaker.snapshot().values())
+    assert all(breaker.allow(model) for model in IncubatorAI.MODEL_PRIORITY)
+    assert sum(quota.snapshot().values()) == 0
+
+
+def test_model_failures_still_count_for_breaker(ai, breaker, quota, monkeypatch):
+    ai.deadline = Deadline(60)
+    monkeypatch.setattr(ai, "_call_named_model", failing(RuntimeError("503 Service Unavailable")), raising=False)
+    with pytest.raises(RuntimeError, match="503"):
+        ai._generate_with_headroom("prompt")
+    assert {state["failures"] for state in breaker.snapshot().values()} == {1}
+
+
+def test_attempts_share_the_request_deadline(ai, breaker, monkeypatch):
+    ai.deadline = Deadline(90)
+    timeouts = []
+    monkeypatch.setattr(ai, "_call_model", failing(RuntimeError("503"), timeouts), raising=False)
+    with pytest.raises(Exception):
+        ai._generate_with_fallback("prompt", max_retries=3)
+    assert len(timeouts) == 3
+    assert timeouts[0] == pytest.approx(30, abs=0.5)
+    assert all(timeout <= IncubatorAI.CALL_TIMEOUT_SECONDS for timeout in timeouts)
+
+
+def test_timeout_of_a_deadline_slice_does_not_count_for_breaker(ai, breaker, monkeypatch):
+    ai.deadline = Deadline(90)
+    monkeypatch.setattr(ai, "_call_model", failing(TimeoutError("The read operation timed out")), raising=False)
+    for _ in range(breaker.FAILURE_THRESHOLD + 1):
+        ai.current_model_index = 0
+        ai.deadline = Deadline(90)
+        with pytest.raises(Exception):
+            ai._generate_with_fallback("prompt", max_retries=3)
+    # 90s entre 3 intentos: 30s y 45s son partes del Deadline; el último ya recibe CALL_TIMEOUT_SECONDS
+    states = breaker.snapshot()
+    for model in IncubatorAI.MODEL_PRIORITY[:2]:
+        assert states[model]["failures"] == 0 and breaker.allow(model)
+
+
+def test_timeout_with_the_full_call_timeout_counts_for_breaker(ai, breaker, monkeypatch):
+    ai.deadline = None
+    monkeypatch.setattr(ai, "_call_model", failing(TimeoutError("timed out")), raising=False)
+    with pytest.raises(Exception):
+        ai._generate_with_fallback("prompt", max_retries=1)
+    assert breaker.snapshot()[IncubatorAI.MODEL_PRIORITY[0]]["failures"] == 1
+
+
+def test_non_timeout_error_of_a_deadline_slice_counts_for_breaker(ai, breaker, monkeypatch):
+    ai.deadline = Deadline(90)
+    monkeypatch.setattr(ai, "_call_model", failing(RuntimeError("500 Internal")), raising=False)
+    with pytest.raises(Exception):
+        ai._generate_with_fallback("prompt", max_retries=1)
+    assert breaker.snapshot()[IncubatorAI.MODEL_PRIORITY[0]]["failures"] == 1
@@ -0,0 +1,46 @@
+"""
+Exportación GDPR: contenido del zip y purga de archivos vencidos sin depender de nuevas exportaciones
+"""
+import io
+import json
+import os
+import time
+import zipfile
+
+from app.services import gdpr
+
+
+def age(path, hours):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def test_zip_export_contains_user_sections(app, make_user):
+    user = make_user()
+    buffer = io.BytesIO()
+    gdpr.write_export(user.id, "zip", buffer)
+    with zipfile.ZipFile(buffer) as archive:
+        names = archive.namelist()
+        assert "user.ndjson" in names
+        row = json.loads(archive.read("user.ndjson").splitlines()[0])
+    assert row["email"] == user.email and "password_hash" not in row
+
+
+def test_sweep_purges_expired_exports(app, tmp_path):
+    app.config.update(GDPR_EXPORT_DIR=str(tmp_path), GDPR_EXPORT_TTL_HOURS=24)
+    expired, fresh = tmp_path / "a_old.zip", tmp_path / "b_new.zip"
+    for path in (expired, fresh):
+        path.write_bytes(b"PK")
+    age(expired, 25)
+    gdpr.sweep(pause_seconds=0)
+    assert not expired.exists() and fresh.exists()
+
+
+def test_purge_exports_command(app, tmp_path):
+    app.config.update(GDPR_EXPORT_DIR=str(tmp_path), GDPR_EXPORT_TTL_HOURS=1)
+    expired = tmp_path / "a_old.zip.part"
+    expired.write_bytes(b"")
+    age(expired, 2)
+    result = app.test_cli_runner().invoke(args=["gdpr", "purge-exports"])
+    assert result.exit_code == 0 and "1 exportaciones vencidas borradas" in result.output
+    assert not expired.exists()
@@ -0,0 +1,102 @@
+"""
+Purga GDPR por lotes: orden de borrado, tamaño de lote, cuentas no vencidas y corte por tiempo
+"""
+from datetime import datetime, timedelta
+import time
+
+from app.models import AuditLog, BusinessPlan, ChatMessage, ChatSession, PlanEvaluation, Project, User, db
+from app.services import gdpr
+
+
+def add_activity(user, messages=5, audits=3):
+    project = Project(user_id=user.id, title="Idea", raw_idea="delivery de mascotas")
+    db.session.add(project)
+    db.session.flush()
+    session = ChatSession(project_id=project.id, session_type="clarification")
+    db.session.add_all([session, BusinessPlan(project_id=project.id, viability_score=60),
+                        PlanEvaluation(project_id=project.id, version="m:abc", model="m")])
+    db.session.flush()
+    db.session.add_all([ChatMessage(session_id=session.id, role="user", content=f"m{i}") for i in range(messages)])
+    db.session.add_all([AuditLog(user_id=user.id, action="login", resource_type="user") for _ in range(audits)])
+    db.session.commit()
+    return project
+
+
+def count(model):
+    return db.session.query(model).count()
+
+
+def test_sweep_purges_due_accounts_in_batches(app, make_user):
+    now = datetime.utcnow()
+    due = make_user(scheduled_deletion=now - timedelta(days=1))
+    later = make_user(scheduled_deletion=now + timedelta(days=10))
+    active = make_user()
+    for user in (due, later, active):
+        add_activity(user)
+
+    stats = gdpr.sweep(batch_size=2, pause_seconds=0)
+
+    assert stats.users == 1 and stats.remaining_users == 0 and not stats.stopped_early
+    assert stats.rows == {"chat_messages": 5, "chat_sessions": 1, "business_plans": 1, "plan_evaluations": 1,
+                          "projects": 1, "audit_logs": 3, "users": 1}
+    # 5 mensajes → lotes de 2, 2, 1; 3 auditorías → 2, 1; el resto un lote cada tabla
+    assert stats.batches == 3 + 1 + 1 + 1 + 1 + 2 + 1
+    db.session.expire_all()
+    assert {u.id for u in User.query} == {later.id, active.id}
+    assert count(Project) == 2 and count(ChatMessage) == 10 and count(AuditLog) == 6
+
+
+def test_sweep_exact_multiple_of_batch_needs_one_empty_batch(app, make_user):
+    user = make_user(scheduled_deletion=datetime.utcnow() - timedelta(hours=1))
+    add_activity(user, messages=4, audits=2)
+    stats = gdpr.sweep(batch_size=2, pause_seconds=0)
+    # chat_messages: 2, 2, 0; audit_logs: 2, 0
+    assert stats.batches == 3 + 1 + 1 + 1 + 1 + 2 + 1
+    assert stats.total_rows == 4 + 1 + 1 + 1 + 1 + 2 + 1
+
+
+def test_sweep_walks_users_in_groups(app, make_user):
+    past = datetime.utcnow() - timedelta(days=2)
+    for i in range(5):
+        add_activity(make_user(scheduled_deletion=past + timedelta(minutes=i)), messages=1, audits=1)
+    stats = gdpr.sweep(batch_size=100, user_batch=2, pause_seconds=0)
+    assert stats.users == 5 and stats.rows["users"] == 5
+    assert count(User) == 0 and count(ChatMessage) == 0
+
+
+def test_purge_stops_at_deadline_and_resumes(app, make_user):
+    cutoff = datetime.utcnow()
+    user = make_user(scheduled_deletion=cutoff - timedelta(days=1))
+    add_activity(user)
+    stats = gdpr.SweepStats()
+    finished = gdpr.purge_users([user.id], cutoff, stats, batch_size=2, pause_seconds=0,
+                                lock_timeout_ms=0, deadline=time.monotonic() - 1)
+    assert not finished and stats.total_rows == 0
+
+    resumed = gdpr.sweep(cutoff=cutoff, batch_size=2, pause_seconds=0)
+    assert resumed.users == 1 and count(User) == 0
+
+
+def test_cancelled_deletion_is_not_purged(app, make_user):
+    cutoff = datetime.utcnow()
+    user = make_user(scheduled_deletion=cutoff - timedelta(days=1))
+    add_activity(user)
+    user.cancel_deletion()
+    db.session.commit()
+    stats = gdpr.sweep(cutoff=cutoff, pause_seconds=0)
+    assert stats.users == 0 and stats.total_rows == 0
+    # Condiciones de _owned_rows: vuelven a exigir que la cuenta siga vencida
+    assert gdpr.pending_rows(cutoff) == {}
+    assert count(ChatMessage) == 5
+
+
+def test_sweep_deletes_export_files_of_purged_accounts(app, make_user, tmp_path):
+    app.config["GDPR_EXPORT_DIR"] = str(tmp_path)
+    cutoff = datetime.utcnow()
+    due = make_user(scheduled_deletion=cutoff - timedelta(days=1))
+    active = make_user()
+    for name in (f"{due.id}_job1.zip", f"{due.id}_job2.zip.part", f"{due.id}_job3.zip.failed",
+                 f"{active.id}_job4.zip"):
+        (tmp_path / name).write_bytes(b"PK")
+    gdpr.sweep(cutoff=cutoff, pause_seconds=0)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{active.id}_job4.zip"]
@@ -0,0 +1,42 @@
+"""
+Índice de ideas casi duplicadas: búsqueda LSH y altas/bajas durante la reconstrucción
+"""
+from app.models import Project, db
+from app.services import idea_index
+from app.services.idea_index import IdeaIndex, _IdeaIndexHolder
+
+
+def test_index_finds_near_duplicates_and_forgets_removed():
+    index = IdeaIndex()
+    index.add("a", "app de delivery para mascotas en santiago")
+    index.add("b", "software de riesgos para pymes")
+    matches = index.query("App de delivery para mascotas en Santiago!!", min_similarity=0.85)
+    assert [item_id for item_id, _ in matches] == ["a"]
+    assert index.remove("a") and not index.remove("a")
+    assert index.query("app de delivery para mascotas en santiago", min_similarity=0.85) == []
+    assert len(index) == 1
+
+
+def test_changes_during_build_are_replayed_on_publish():
+    holder = _IdeaIndexHolder()
+    holder._building = True
+    holder.add("new", "marketplace de arriendo de bicicletas")
+    holder.remove("gone")
+    built = IdeaIndex()
+    built.add("gone", "idea borrada durante la construcción")
+    built.built_at = 0.0
+    holder._publish(built)
+    assert holder.peek() is built and not holder._building
+    assert {item_id for item_id, _ in built.query("marketplace de arriendo de bicicletas")} == {"new"}
+    assert built.query("idea borrada durante la construcción", min_similarity=0.9) == []
+
+
+def test_find_near_duplicate_builds_inline_in_testing(app, make_user, monkeypatch):
+    monkeypatch.setattr(idea_index, "idea_index", _IdeaIndexHolder())
+    user = make_user()
+    project = Project(user_id=user.id, title="x", raw_idea="app de delivery para mascotas en santiago")
+    db.session.add(project)
+    db.session.commit()
+    found = idea_index.find_near_duplicate("App de delivery para mascotas en Santiago", threshold=0.85)
+    assert found is not None and found[0].id == project.id
+    assert idea_index.find_near_duplicate("software contable para pymes", threshold=0.85) is None
@@ -0,0 +1,63 @@
+"""
+Ids UUIDv7 compactos: new_id, parse_id y el tipo GUID (BLOB de 16 bytes en SQLite, uuid en Postgres)
+"""
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import models
+from app.models import GUID, Project, db, new_id, parse_id
+
+
+def test_new_id_is_uuid_v7_rfc_variant():
+    value = uuid.UUID(new_id())
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+
+
+def test_new_id_embeds_millisecond_timestamp(monkeypatch):
+    monkeypatch.setattr(models.time, "time_ns", lambda: 1_700_000_000_123_456_789)
+    assert uuid.UUID(new_id()).int >> 80 == 1_700_000_000_123
+
+
+def test_new_ids_sort_by_creation_time(monkeypatch):
+    ids = []
+    for millis in (1_700_000_000_000, 1_700_000_000_001, 1_700_000_060_000):
+        monkeypatch.setattr(models.time, "time_ns", lambda millis=millis: millis * 1_000_000)
+        ids.append(new_id())
+    assert ids == sorted(ids)
+    assert len({new_id() for _ in range(1000)}) == 1000
+
+
+def test_parse_id_canonicalizes_and_rejects_garbage():
+    value = new_id()
+    assert parse_id(value.upper()) == value
+    assert parse_id(value.replace("-", "")) == value
+    assert parse_id(uuid.UUID(value)) == value
+    for garbage in (None, "", "42", "not-a-uuid", "' OR 1=1 --"):
+        assert parse_id(garbage) is None
+
+
+def test_guid_binds_per_dialect():
+    value = new_id()
+    guid = GUID()
+    assert guid.process_bind_param(value, sqlite.dialect()) == uuid.UUID(value).bytes
+    assert guid.process_bind_param(value, postgresql.dialect()) == value
+    assert guid.process_bind_param(None, sqlite.dialect()) is None
+    assert guid.process_result_value(uuid.UUID(value).bytes, sqlite.dialect()) == value
+    assert guid.process_result_value(value, postgresql.dialect()) == value
+
+
+def test_guid_roundtrip_on_sqlite(app, make_user):
+    user = make_user()
+    project = Project(user_id=user.id, title="Idea", raw_idea="app de delivery")
+    db.session.add(project)
+    db.session.commit()
+    db.session.expire_all()
+
+    stored = db.session.execute(text("SELECT id, typeof(id) FROM projects")).one()
+    assert stored[1] == "blob" and len(stored[0]) == 16
+    loaded = db.session.get(Project, project.id)
+    assert loaded.id == project.id and isinstance(loaded.id, str)
+    assert Project.query.filter_by(user_id=user.id.upper()).one().id == project.id
@@ -0,0 +1,163 @@
+"""
+Runner de migraciones: descubrimiento, historial en schema_migrations, stamp y división de SQL
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.services import migrations
+from app.services.migrations import MigrationError
+
+
+@pytest.fixture
+def revisions_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "migrations"
+    directory.mkdir()
+    original = migrations.discover
+    monkeypatch.setattr(migrations, "discover", lambda directory=str(directory): original(directory))
+    return directory
+
+
+@pytest.fixture
+def engine(app, tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+
+
+def write(directory, filename, source):
+    (directory / filename).write_text(source, encoding="utf-8")
+
+
+def versions(engine):
+    return sorted(migrations.applied_versions(engine))
+
+
+def test_split_sql_respects_strings_comments_and_dollar_blocks():
+    source = """
+        -- comentario; con punto y coma
+        CREATE TABLE a (x TEXT DEFAULT 'a;b');
+        /* bloque; */ INSERT INTO a VALUES ('it''s; ok');
+        DO $$ BEGIN PERFORM 1; END $$;
+        SELECT 1
+    """
+    statements = migrations.split_sql(source)
+    assert len(statements) == 4
+    assert statements[0] == "CREATE TABLE a (x TEXT DEFAULT 'a;b')"
+    assert statements[1].endswith("VALUES ('it''s; ok')")
+    assert statements[2] == "DO $$ BEGIN PERFORM 1; END $$"
+
+
+def test_discover_orders_numerically_and_reads_directives(revisions_dir):
+    write(revisions_dir, "010_late.sql", "-- migrate: no-transaction\nSELECT 1;")
+    write(revisions_dir, "002_pg_only.sql", "-- migrate: dialects=postgresql\nSELECT 1;")
+    write(revisions_dir, "003_backfill.py", "TRANSACTIONAL = False\ndef upgrade(ctx):\n    pass\n")
+    write(revisions_dir, "notes.txt", "ignorado")
+    found = migrations.discover()
+    assert [r.version for r in found] == ["002", "003", "010"]
+    assert found[0].dialects == {"postgresql"} and not found[0].applies_to("sqlite")
+    assert not found[1].transactional and found[1].kind == "py"
+    assert not found[2].transactional
+
+
+def test_discover_rejects_duplicate_versions_and_unknown_directives(revisions_dir):
+    write(revisions_dir, "001_a.sql", "SELECT 1;")
+    write(revisions_dir, "001_b.sql", "SELECT 1;")
+    with pytest.raises(MigrationError, match="duplicada"):
+        migrations.discover()
+    (revisions_dir / "001_b.sql").unlink()
+    write(revisions_dir, "002_c.sql", "-- migrate: sin-lock\nSELECT 1;")
+    with pytest.raises(MigrationError, match="directiva desconocida"):
+        migrations.discover()
+
+
+def test_upgrade_applies_pending_in_order_and_records_history(revisions_dir, engine):
+    write(revisions_dir, "001_users.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY);")
+    write(revisions_dir, "002_pg_only.sql", "-- migrate: dialects=postgresql\nSELECT nope;")
+    write(revisions_dir, "003_email.py",
+          "def upgrade(ctx):\n    ctx.execute('ALTER TABLE users ADD COLUMN email TEXT')\n")
+
+    applied = migrations.upgrade(engine)
+    assert [r.version for r in applied] == ["001", "003"]
+    assert versions(engine) == ["001", "003"]
+    assert {c["name"] for c in inspect(engine).get_columns("users")} == {"id", "email"}
+    history = migrations.applied_versions(engine)["003"]
+    assert history["name"] == "email" and len(history["checksum"]) == 16
+
+    # Segunda pasada: nada pendiente
+    assert migrations.upgrade(engine) == []
+
+
+def test_upgrade_respects_target_and_dry_run(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY);")
+    write(revisions_dir, "002_b.sql", "CREATE TABLE b (id INTEGER);")
+    assert [r.version for r in migrations.upgrade(engine, dry_run=True)] == ["001", "002"]
+    assert versions(engine) == []
+    migrations.upgrade(engine, target="001")
+    assert versions(engine) == ["001"]
+    assert not inspect(engine).has_table("b")
+
+
+def test_failed_transactional_revision_is_not_recorded(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY);")
+    # DML: pysqlite no abre transacción para DDL (en Postgres el DDL también se revierte)
+    write(revisions_dir, "002_broken.sql", "INSERT INTO users (id) VALUES (1);\nSELECT * FROM missing_table;")
+    with pytest.raises(MigrationError, match="002_broken falló"):
+        migrations.upgrade(engine)
+    assert versions(engine) == ["001"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 0
+
+
+def test_upgrade_refuses_existing_schema_without_history(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY);")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY)"))
+    with pytest.raises(MigrationError, match="flask db stamp"):
+        migrations.upgrade(engine)
+
+
+def test_stamp_records_without_running_then_upgrade_continues(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY);")
+    write(revisions_dir, "002_b.sql", "SELECT nope_never_runs;")
+    write(revisions_dir, "003_c.sql", "CREATE TABLE c (id INTEGER);")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY)"))
+
+    stamped = migrations.stamp("002", engine)
+    assert [r.version for r in stamped] == ["001", "002"]
+    history = migrations.applied_versions(engine)["002"]
+    assert history["execution_ms"] is None
+    assert isinstance(history["applied_at"], datetime)
+    # Repetir el stamp no duplica filas
+    assert migrations.stamp("002", engine) == []
+
+    assert [r.version for r in migrations.upgrade(engine)] == ["003"]
+    assert inspect(engine).has_table("c")
+
+
+def test_backfill_requires_non_transactional_revision(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY, n INTEGER);")
+    write(revisions_dir, "002_fill.py",
+          "def upgrade(ctx):\n    ctx.backfill('users', 'n = 1', 'n IS NULL')\n")
+    with pytest.raises(MigrationError, match="TRANSACTIONAL = False"):
+        migrations.upgrade(engine)
+
+
+def test_backfill_updates_in_batches(revisions_dir, engine):
+    write(revisions_dir, "001_a.sql", "CREATE TABLE users (id INTEGER PRIMARY KEY, n INTEGER);")
+    write(revisions_dir, "002_fill.py",
+          "TRANSACTIONAL = False\n"
+          "def upgrade(ctx):\n"
+          "    for i in range(25):\n"
+          "        ctx.execute('INSERT INTO users (id) VALUES (:i)', {'i': i})\n"
+          "    ctx.backfill('users', 'n = id * 2', 'n IS NULL', batch_size=10)\n")
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM users WHERE n = id * 2")).scalar() == 25
+
+
+def test_project_revisions_upgrade_a_fresh_sqlite_database(engine):
+    # 000_baseline es solo Postgres: ninguna revisión posterior puede asumir sus tablas en SQLite
+    applied = migrations.upgrade(engine)
+    assert [r.version for r in applied] == [r.version for r in migrations.discover() if r.applies_to("sqlite")]
+    assert migrations.pending(engine) == []
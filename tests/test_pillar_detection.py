@@ -0,0 +1,18 @@
+"""
+Detección local de los pilares afectados por nueva información (regeneración incremental)
+"""
+import pytest
+
+from app.services.ai_service import IncubatorAI
+
+
+@pytest.mark.parametrize("text, pillars", [
+    ("Mi ventaja es la rapidez", ["value_proposition"]),
+    ("Somos dos personas en el equipo", ["technical_feasibility"]),
+    ("Las ventas serán a empresas medianas", ["target_market", "revenue_model"]),
+    ("Cobramos una suscripción mensual", ["revenue_model"]),
+    ("Queremos validarlo con entrevistas", ["validation_strategy"]),
+    ("Hola, gracias", []),
+])
+def test_detect_affected_pillars_matches_whole_words_and_stems(text, pillars):
+    assert IncubatorAI.detect_affected_pillars(text) == pillars
@@ -0,0 +1,36 @@
+"""
+Ranker local del banco de preguntas: deduplicación de paráfrasis y preguntas ya hechas
+"""
+from app.services import question_ranker
+from app.services.ai_service import IncubatorAI
+
+
+def test_is_duplicate_catches_paraphrase():
+    assert question_ranker.is_duplicate(
+        "¿Cuál es tu mercado objetivo?",
+        ["¿Cuál es el mercado objetivo específico y su tamaño estimado?"],
+    )
+
+
+def test_is_duplicate_keeps_different_questions():
+    assert not question_ranker.is_duplicate("¿Cuál es el precio promedio?", ["¿Quién es tu cliente objetivo?"])
+    assert not question_ranker.is_duplicate("¿Cuál es tu mercado?", [])
+
+
+def test_question_bank_has_no_internal_duplicates():
+    bank = IncubatorAI.QUESTIONS_BANK
+    assert question_ranker.dedupe_questions(bank) == bank
+
+
+def test_dedupe_questions_drops_empty_and_previous():
+    questions = ["¿Cuál es tu mercado objetivo?", "", "¿Cuál es el precio promedio y el margen?",
+                 "¿Cuál es el margen y el precio promedio?"]
+    kept = question_ranker.dedupe_questions(
+        questions, previous=["¿Cuál es el mercado objetivo específico y su tamaño estimado?"])
+    assert kept == ["¿Cuál es el precio promedio y el margen?"]
+
+
+def test_rank_bank_skips_asked_paraphrases():
+    asked = ["¿Cuál es tu mercado objetivo?"]
+    ranked = [question for question, _, _ in question_ranker.rank_bank("app de delivery", asked=asked)]
+    assert not any("mercado objetivo" in question for question in ranked)